@@ -3,13 +3,16 @@
 """
 Standard python import statements
 """
+import os
 
 """
 Custom python import statements
 """
 from arm.register import *
+from arm.register_loader import *
 
-class CLIDR_EL1(Register):
+class CLIDR_EL1(SchemaRegister):
+    __slots__ = ()
 
     ctype_name_value_dict = {0 : 'No cache',
                              1 : 'Instruction cache only',
@@ -17,119 +20,166 @@ class CLIDR_EL1(Register):
                              3 : 'Separate instruction and data caches',
                              4 : 'Unified cache'}
 
-    def __init__(self):
-        Register.__init__(self, {
-            'ICB'    : RegisterField(name='Inner Cache Boundary',
-                                     width=3, shift=30, value=0,
-                                     name_value_dict={0 : 'Not disclosed by this mechanism',
-                                                      1 : 'L1 cache is the highest Inner Cacheable level',
-                                                      2 : 'L2 cache is the highest Inner Cacheable level',
-                                                      3 : 'L3 cache is the highest Inner Cacheable level',
-                                                      4 : 'L4 cache is the highest Inner Cacheable level',
-                                                      5 : 'L5 cache is the highest Inner Cacheable level',
-                                                      6 : 'L6 cache is the highest Inner Cacheable level',
-                                                      7 : 'L7 cache is the highest Inner Cacheable level',
-                                     }),
-            'LoUU'   : RegisterField(name='Level of Unification Uniprocessor', width=3, shift=27, value=0, name_value_dict={}),
-            'LoC'    : RegisterField(name='Level of Coherence', width=3, shift=24, value=0, name_value_dict={}),
-            'LoUIS'  : RegisterField(name='Level of Unfication Inner Shareable', width=3, shift=21, value=0, name_value_dict={}),
-            'Ctype7' : RegisterField(name='Cache Type 7', width=3, shift=18, value=0,
-                                     name_value_dict=CLIDR_EL1.ctype_name_value_dict),
-            'Ctype6' : RegisterField(name='Cache Type 6', width=3, shift=15, value=0,
-                                     name_value_dict=CLIDR_EL1.ctype_name_value_dict),
-            'Ctype5' : RegisterField(name='Cache Type 5', width=3, shift=12, value=0,
-                                     name_value_dict=CLIDR_EL1.ctype_name_value_dict),
-            'Ctype4' : RegisterField(name='Cache Type 4', width=3, shift=9,  value=0,
-                                     name_value_dict=CLIDR_EL1.ctype_name_value_dict),
-            'Ctype3' : RegisterField(name='Cache Type 3', width=3, shift=6,  value=0,
-                                     name_value_dict=CLIDR_EL1.ctype_name_value_dict),
-            'Ctype2' : RegisterField(name='Cache Type 2', width=3, shift=3,  value=0,
-                                     name_value_dict=CLIDR_EL1.ctype_name_value_dict),
-            'Ctype1' : RegisterField(name='Cache Type 1', width=3, shift=0,  value=0,
-                                     name_value_dict=CLIDR_EL1.ctype_name_value_dict),
-        })
-
-class CCSIDR_EL1(Register):
-
-    def __init__(self):
-        Register.__init__(self, {
-            'LineSize'        : RegisterField(name='Cache Line Size',
-                                              width=3, shift=0, value=0,
-                                              name_value_dict={},
-                                              conversion_function=self.calc_cache_line_size_from_register_value),
-            'Associativity'   : RegisterField(name='Associativity of cache - 1',
-                                              width=10, shift=3, value=0,
-                                              name_value_dict={},
-                                              conversion_function=self.calc_associativity_from_register_value),
-            'NumSets'         : RegisterField(name='Number of sets - 1',
-                                              width=15, shift=13, value=0,
-                                              name_value_dict={},
-                                              conversion_function=self.calc_num_sets_from_register_value),
-        })
-
-    def calc_cache_line_size_from_register_value(self, field_value):
+    schema = RegisterSchema({
+        'ICB'    : RegisterFieldSchema.create(name='Inner Cache Boundary',
+                                              width=3, shift=30,
+                                              name_value_dict={0 : 'Not disclosed by this mechanism',
+                                                               1 : 'L1 cache is the highest Inner Cacheable level',
+                                                               2 : 'L2 cache is the highest Inner Cacheable level',
+                                                               3 : 'L3 cache is the highest Inner Cacheable level',
+                                                               4 : 'L4 cache is the highest Inner Cacheable level',
+                                                               5 : 'L5 cache is the highest Inner Cacheable level',
+                                                               6 : 'L6 cache is the highest Inner Cacheable level',
+                                                               7 : 'L7 cache is the highest Inner Cacheable level',
+                                              }),
+        'LoUU'   : RegisterFieldSchema.create(name='Level of Unification Uniprocessor', width=3, shift=27),
+        'LoC'    : RegisterFieldSchema.create(name='Level of Coherence', width=3, shift=24),
+        'LoUIS'  : RegisterFieldSchema.create(name='Level of Unfication Inner Shareable', width=3, shift=21),
+        'Ctype7' : RegisterFieldSchema.create(name='Cache Type 7', width=3, shift=18,
+                                              name_value_dict=ctype_name_value_dict),
+        'Ctype6' : RegisterFieldSchema.create(name='Cache Type 6', width=3, shift=15,
+                                              name_value_dict=ctype_name_value_dict),
+        'Ctype5' : RegisterFieldSchema.create(name='Cache Type 5', width=3, shift=12,
+                                              name_value_dict=ctype_name_value_dict),
+        'Ctype4' : RegisterFieldSchema.create(name='Cache Type 4', width=3, shift=9,
+                                              name_value_dict=ctype_name_value_dict),
+        'Ctype3' : RegisterFieldSchema.create(name='Cache Type 3', width=3, shift=6,
+                                              name_value_dict=ctype_name_value_dict),
+        'Ctype2' : RegisterFieldSchema.create(name='Cache Type 2', width=3, shift=3,
+                                              name_value_dict=ctype_name_value_dict),
+        'Ctype1' : RegisterFieldSchema.create(name='Cache Type 1', width=3, shift=0,
+                                              name_value_dict=ctype_name_value_dict),
+    })
+
+class CCSIDR_EL1(SchemaRegister):
+    __slots__ = ()
+
+    @staticmethod
+    def calc_cache_line_size_from_register_value(field_value):
         return pow(2, field_value + 4)
 
-    def calc_associativity_from_register_value(self, field_value):
+    @staticmethod
+    def calc_associativity_from_register_value(field_value):
         return (field_value + 1)
 
-    def calc_num_sets_from_register_value(self, field_value):
+    @staticmethod
+    def calc_num_sets_from_register_value(field_value):
         return (field_value + 1)
 
+    schema = RegisterSchema({
+        'LineSize'      : RegisterFieldSchema.create(name='Cache Line Size',
+                                                     width=3, shift=0,
+                                                     conversion_function=calc_cache_line_size_from_register_value.__func__),
+        'Associativity' : RegisterFieldSchema.create(name='Associativity of cache - 1',
+                                                     width=10, shift=3,
+                                                     conversion_function=calc_associativity_from_register_value.__func__),
+        'NumSets'       : RegisterFieldSchema.create(name='Number of sets - 1',
+                                                     width=15, shift=13,
+                                                     conversion_function=calc_num_sets_from_register_value.__func__),
+    })
+
     def cache_size(self):
-        return self.fields['LineSize'].get_value() * \
-                self.fields['Associativity'].get_value() * \
-                  self.fields['NumSets'].get_value()
-
-class ID_AA64MMFR0_EL1(Register):
-
-    def __init__(self):
-        Register.__init__(self, {
-            'PARange'        : RegisterField(name='Physical Address range supported',
-                                             width=4, shift=0, value=0,
-                                             name_value_dict={0 : '4GB',
-                                                              1 : '64GB',
-                                                              2 : '1TB',
-                                                              3 : '4TB',
-                                                              4 : '16TB',
-                                                              5 : '256TB',
-                                                              6 : '4PB',
-                                             }),
-
-            'ASIDBits'        : RegisterField(name='Number of ASID bits',
-                                             width=4, shift=4, value=0,
-                                             name_value_dict={0 : '8 bits',
-                                                              2 : '16 bits',
-                                             }),
-            'BigEnd'        : RegisterField(name='Mixed-endian configuration support',
-                                             width=4, shift=8, value=0,
-                                             name_value_dict={0 : 'No Mixed-endian support',
-                                                              1 : 'Mixed-endian support',
-                                             }),
-            'SNSMem'        : RegisterField(name='Secure versus Non-secure Memory distinction',
-                                             width=4, shift=12, value=0,
-                                             name_value_dict={0 : 'Does not support a distinction between Secure and Non-secure memory',
-                                                              1 : 'Does support a distinction between Secure and Non-secure memory',
-                                             }),
-            'BigEndEL0'        : RegisterField(name='Mixed-endian support at EL0 only',
-                                             width=4, shift=16, value=0,
-                                             name_value_dict={0 : 'No mixed-endian support at EL0',
-                                                              1 : 'Mixed-endian support at EL0',
-                                             }),
-            'TGran16'        : RegisterField(name='Support for 16KB memory translation granule size',
-                                             width=4, shift=16, value=0,
-                                             name_value_dict={0 : '16KB granule not supported',
-                                                              1 : '16KB granule supported',
-                                             }),
-            'TGran64'        : RegisterField(name='Support for 64KB memory translation granule size',
-                                             width=4, shift=24, value=0,
-                                             name_value_dict={0 : '64KB granule supported',
-                                                              1 : '64KB granule not supported',
-                                             }),
-            'TGran4'        : RegisterField(name='Support for 4KB memory translation granule size',
-                                             width=4, shift=28, value=0,
-                                             name_value_dict={0x0 : '4KB granule supported',
-                                                              0xf : '4KB granule not supported',
-                                             }),
-        })
+        return self.get_field('LineSize') * \
+                self.get_field('Associativity') * \
+                  self.get_field('NumSets')
+
+class ID_AA64MMFR0_EL1(SchemaRegister):
+    __slots__ = ()
+
+    schema = RegisterSchema({
+        'PARange'   : RegisterFieldSchema.create(name='Physical Address range supported',
+                                                 width=4, shift=0,
+                                                 name_value_dict={0 : '4GB',
+                                                                  1 : '64GB',
+                                                                  2 : '1TB',
+                                                                  3 : '4TB',
+                                                                  4 : '16TB',
+                                                                  5 : '256TB',
+                                                                  6 : '4PB',
+                                                 }),
+
+        'ASIDBits'  : RegisterFieldSchema.create(name='Number of ASID bits',
+                                                 width=4, shift=4,
+                                                 name_value_dict={0 : '8 bits',
+                                                                  2 : '16 bits',
+                                                 }),
+        'BigEnd'    : RegisterFieldSchema.create(name='Mixed-endian configuration support',
+                                                 width=4, shift=8,
+                                                 name_value_dict={0 : 'No Mixed-endian support',
+                                                                  1 : 'Mixed-endian support',
+                                                 }),
+        'SNSMem'    : RegisterFieldSchema.create(name='Secure versus Non-secure Memory distinction',
+                                                 width=4, shift=12,
+                                                 name_value_dict={0 : 'Does not support a distinction between Secure and Non-secure memory',
+                                                                  1 : 'Does support a distinction between Secure and Non-secure memory',
+                                                 }),
+        'BigEndEL0' : RegisterFieldSchema.create(name='Mixed-endian support at EL0 only',
+                                                 width=4, shift=16,
+                                                 name_value_dict={0 : 'No mixed-endian support at EL0',
+                                                                  1 : 'Mixed-endian support at EL0',
+                                                 }),
+        'TGran16'   : RegisterFieldSchema.create(name='Support for 16KB memory translation granule size',
+                                                 width=4, shift=16,
+                                                 name_value_dict={0 : '16KB granule not supported',
+                                                                  1 : '16KB granule supported',
+                                                 }),
+        'TGran64'   : RegisterFieldSchema.create(name='Support for 64KB memory translation granule size',
+                                                 width=4, shift=24,
+                                                 name_value_dict={0 : '64KB granule supported',
+                                                                  1 : '64KB granule not supported',
+                                                 }),
+        'TGran4'    : RegisterFieldSchema.create(name='Support for 4KB memory translation granule size',
+                                                 width=4, shift=28,
+                                                 name_value_dict={0x0 : '4KB granule supported',
+                                                                  0xf : '4KB granule not supported',
+                                                 }),
+    })
+
+class SCTLR_EL1(SchemaRegister):
+    __slots__ = ()
+
+    schema = RegisterSchema({
+        'M'       : RegisterFieldSchema.create(name='MMU enable for EL1&0 stage 1 address translation', width=1, shift=0),
+        'A'       : RegisterFieldSchema.create(name='Alignment check enable', width=1, shift=1),
+        'C'       : RegisterFieldSchema.create(name='Cacheability control for data accesses', width=1, shift=2),
+        'SA'      : RegisterFieldSchema.create(name='SP Alignment check enable', width=1, shift=3),
+        'SA0'     : RegisterFieldSchema.create(name='SP Alignment check enable for EL0', width=1, shift=4),
+        'CP15BEN' : RegisterFieldSchema.create(name='System instruction memory barrier enable', width=1, shift=5),
+        'EOS'     : RegisterFieldSchema.create(name='Exception Exit is Context Synchronizing', width=1, shift=11),
+        'I'       : RegisterFieldSchema.create(name='Cacheability control for instruction accesses', width=1, shift=12),
+        'nTWI'    : RegisterFieldSchema.create(name='Traps EL0 execution of WFI instructions', width=1, shift=16),
+        'nTWE'    : RegisterFieldSchema.create(name='Traps EL0 execution of WFE instructions', width=1, shift=18),
+        'WXN'     : RegisterFieldSchema.create(name='Write permission implies XN', width=1, shift=19),
+        'EIS'     : RegisterFieldSchema.create(name='Exception Entry is Context Synchronizing', width=1, shift=22),
+        'SPAN'    : RegisterFieldSchema.create(name='Set Privileged Access Never on exception to EL1', width=1, shift=23),
+        'E0E'     : RegisterFieldSchema.create(name='Endianness of data accesses at EL0', width=1, shift=24,
+                                               name_value_dict={0 : 'Little-endian',
+                                                                1 : 'Big-endian',
+                                               }),
+        'EE'      : RegisterFieldSchema.create(name='Endianness of data accesses at EL1', width=1, shift=25,
+                                               name_value_dict={0 : 'Little-endian',
+                                                                1 : 'Big-endian',
+                                               }),
+        'nTLSMD'  : RegisterFieldSchema.create(name='No Trap Load Multiple and Store Multiple to Device memory', width=1, shift=28),
+        'LSMAOE'  : RegisterFieldSchema.create(name='Load Multiple and Store Multiple Atomicity and Ordering Enable', width=1, shift=29),
+    })
+
+"""
+Registers defined in arm_registers.json are generated on first access
+by name, e.g. arm.arm_register.ID_AA64PFR0_EL1 or
+from arm.arm_register import ID_AA64PFR0_EL1. import * only imports the
+registers defined above.
+"""
+register_definitions = RegisterDefinitionLoader(
+    os.path.join(os.path.dirname(os.path.realpath(__file__)), 'arm_registers.json'),
+    os.environ.get('ARM_REGISTER_CACHE_DIR',
+                   os.path.join(os.path.dirname(os.path.dirname(os.path.realpath(__file__))), 'build', 'register_cache')),
+    module_name=__name__)
 
+def __getattr__(name):
+    #e.g. __all__, looked up by import *, or __path__
+    if name.startswith('__') and name.endswith('__'):
+        raise AttributeError(name)
+    register_class = register_definitions.load(name)
+    globals()[name] = register_class
+    return register_class
@@ -10,6 +10,8 @@ import textwrap
 import subprocess
 import os
 import struct
+import collections
+import unittest.mock
 
 """
 Custom python import statements
@@ -17,6 +19,11 @@ Custom python import statements
 from arm.register import *
 from arm.arm_register import *
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 class ARMRegisterTests(unittest.TestCase):
     def test_basic_register_get_set(self):
         clidr = CLIDR_EL1()
@@ -97,7 +104,152 @@ class ARMRegisterTests(unittest.TestCase):
         self.assertEqual(False, clidr.get_field_value_name('LoUU'))
         self.assertEqual('Not disclosed by this mechanism', clidr.get_field_value_name('ICB'))
 
+    def test_instances_share_schema(self):
+        first = CLIDR_EL1()
+        second = CLIDR_EL1(0x0a200023)
+        self.assertIs(first.schema, second.schema)
+        self.assertFalse(hasattr(second, '__dict__'))
+        self.assertEqual(0, first.get_field('Ctype1'))
+        self.assertEqual(3, second.get_field('Ctype1'))
+
+    def test_set_field_keeps_other_fields(self):
+        clidr = CLIDR_EL1(0x0a200023)
+        clidr.set_field('LoC', 5)
+        self.assertEqual(5, clidr.get_field('LoC'))
+        self.assertEqual(0x0d200023, clidr.value)
+        self.assertEqual(3, clidr.get_field('Ctype1'))
+        self.assertEqual(4, clidr.get_field('Ctype2'))
+
+    def test_get_value(self):
+        clidr = CLIDR_EL1()
+        clidr.set_field('Ctype1', 3)
+        clidr.set_field('Ctype2', 4)
+        clidr.set_field('LoUIS', 1)
+        clidr.set_field('LoC', 2)
+        clidr.set_field('LoUU', 1)
+        self.assertEqual(0x0a200023, clidr.get_value())
+        self.assertEqual(0x0a200023, CLIDR_EL1.pack(Ctype1=3, Ctype2=4, LoUIS=1, LoC=2, LoUU=1))
+        self.assertRaises(RegisterFieldOutOfBoundError, CLIDR_EL1.pack, ICB=8)
+
+class RegisterDecodeCacheTest(unittest.TestCase):
+    def test_snapshot(self):
+        snapshot = CCSIDR_EL1(0x700fe01a).snapshot()
+        self.assertEqual(CCSIDR_EL1, snapshot.register_class)
+        self.assertEqual(DecodedField('LineSize', 'Cache Line Size', 2, 64, None), snapshot.field('LineSize'))
+        self.assertEqual({'LineSize' : 64, 'Associativity' : 4, 'NumSets' : 128}, dict(snapshot.as_dict()))
+        self.assertEqual('Unified cache', CLIDR_EL1(0x0a200023).snapshot().field('Ctype2').value_name)
+        self.assertRaises(KeyError, snapshot.field, 'Ctype1')
+
+    def test_cache_hits_and_eviction(self):
+        cache = RegisterDecodeCache(maxsize=2)
+        first = cache.decode(CLIDR_EL1, 0x0a200023)
+        self.assertIs(first, CLIDR_EL1(0x0a200023).snapshot(cache))
+        self.assertEqual(first, CLIDR_EL1(0x0a200023).snapshot())
+        self.assertEqual((1, 1), (cache.cache_info().hits, cache.cache_info().misses))
+        self.assertEqual(0.5, cache.hit_rate())
+
+        #Same raw value, different register class
+        self.assertNotEqual(first, cache.decode(CCSIDR_EL1, 0x0a200023))
+        cache.decode(ID_AA64MMFR0_EL1, 0x1122)
+        self.assertEqual(2, cache.cache_info().currsize)
+        self.assertIsNot(first, cache.decode(CLIDR_EL1, 0x0a200023))
+
+        cache.clear()
+        self.assertEqual(0, cache.cache_info().currsize)
+
+    def test_snapshots_deduplicate(self):
+        cache = RegisterDecodeCache()
+        trace = [0x700fe01a, 0x701fe00a, 0x700fe01a, 0x700fe01a]
+        snapshots = collections.Counter(CCSIDR_EL1(value).snapshot(cache) for value in trace)
+        self.assertEqual(2, len(snapshots))
+        self.assertEqual(3, snapshots[cache.decode(CCSIDR_EL1, 0x700fe01a)])
+
+class RegisterDefinitionTest(unittest.TestCase):
+    def test_registers_from_definition_file(self):
+        import arm.arm_register
+        id_aa64pfr0_el1 = arm.arm_register.ID_AA64PFR0_EL1(0x2222)
+        self.assertEqual('AArch64 and AArch32', id_aa64pfr0_el1.get_field_value_name('EL3'))
+        self.assertEqual('Implemented', id_aa64pfr0_el1.get_field_value_name('FP'))
+        self.assertIs(arm.arm_register.ID_AA64PFR0_EL1, register_definitions.load('ID_AA64PFR0_EL1'))
+
+        from arm.arm_register import CTR_EL0
+        ctr_el0 = CTR_EL0(0x84448004)
+        self.assertEqual(64, ctr_el0.get_field('DminLine'))
+        self.assertEqual(64, ctr_el0.get_field('IminLine'))
+        self.assertEqual('Virtual Index, Physical Tag', ctr_el0.get_field_value_name('L1Ip'))
+
+    def test_dunder_names_not_loaded(self):
+        import arm.arm_register
+        with unittest.mock.patch.object(register_definitions, 'load') as load:
+            self.assertRaises(AttributeError, getattr, arm.arm_register, '__all__')
+            self.assertFalse(hasattr(arm.arm_register, '__path__'))
+        load.assert_not_called()
+
+    def test_all_definitions_load(self):
+        for name in register_definitions.names():
+            register_class = register_definitions.load(name)
+            self.assertEqual(0, register_class(0).get_value())
+
+class SCTLR_tests(unittest.TestCase):
+    def test_pack_mmu_config_init_value(self):
+        """
+        The value test_mmu_config_init writes to SCTLR_EL1 and SCTLR_EL2
+        """
+        self.assertEqual(0x30c50838, SCTLR_EL1.pack(SA=1, SA0=1, CP15BEN=1, EOS=1, nTWI=1, nTWE=1,
+                                                     EIS=1, SPAN=1, nTLSMD=1, LSMAOE=1))
+        sctlr = SCTLR_EL1(0x30c50838)
+        self.assertEqual(0, sctlr.get_field('M'))
+        sctlr.set_field('M', 1)
+        self.assertEqual(0x30c50839, sctlr.get_value())
+
+    @unittest.skipIf(numpy is None, 'requires numpy')
+    def test_encode_array(self):
+        values = SCTLR_EL1.encode_array({'M' : [0, 1, 0, 1],
+                                         'C' : numpy.array([0, 0, 1, 1]),
+                                         'EE' : [1, 1, 1, 1]})
+        self.assertEqual(numpy.uint64, values.dtype)
+        self.assertEqual([0x2000000, 0x2000001, 0x2000004, 0x2000005], values.tolist())
+        decoded = SCTLR_EL1.decode_array(values)
+        self.assertEqual([0, 1, 0, 1], decoded['M'].tolist())
+        self.assertEqual([0, 0, 1, 1], decoded['C'].tolist())
+        self.assertRaises(RegisterFieldOutOfBoundError, SCTLR_EL1.encode_array, {'M' : [0, 2]})
+
 class CCSIDR_tests(unittest.TestCase):
+    def test_cache_size(self):
+        ccsidr = CCSIDR_EL1(0x700fe01a)
+        self.assertEqual(64, ccsidr.get_field('LineSize'))
+        self.assertEqual(4, ccsidr.get_field('Associativity'))
+        self.assertEqual(128, ccsidr.get_field('NumSets'))
+        self.assertEqual(32768, ccsidr.cache_size())
+
+    @unittest.skipIf(numpy is None, 'requires numpy')
+    def test_decode_array(self):
+        values = numpy.array([0x700fe01a, 0x701fe00a, 0x0], dtype=numpy.uint64)
+        decoded = CCSIDR_EL1.decode_array(values)
+        self.assertEqual([64, 64, 16], decoded['LineSize'].tolist())
+        self.assertEqual([4, 2, 1], decoded['Associativity'].tolist())
+        self.assertEqual([128, 256, 1], decoded['NumSets'].tolist())
+        self.assertEqual([32768, 32768, 16],
+                         (decoded['LineSize'] * decoded['Associativity'] * decoded['NumSets']).tolist())
+        self.assertEqual([64, 64, 16], CCSIDR_EL1.decode_array([0x700fe01a, 0x701fe00a, 0x0])['LineSize'].tolist())
+
+    @unittest.skipIf(numpy is None, 'requires numpy')
+    def test_decode_buffer(self):
+        data = struct.pack('<2I', 0x0a200023, 0x49249249)
+        decoded = CLIDR_EL1.decode_array(data, dtype='<u4')
+        for index, value in enumerate([0x0a200023, 0x49249249]):
+            clidr = CLIDR_EL1(value)
+            for field in CLIDR_EL1.schema.fields:
+                self.assertEqual(clidr.get_field(field), decoded[field][index])
+
+        names = CLIDR_EL1.decode_array_names(data, dtype='<u4')
+        self.assertEqual(['Separate instruction and data caches', 'Instruction cache only'], names['Ctype1'].tolist())
+        self.assertEqual(['Unified cache', 'Instruction cache only'], names['Ctype2'].tolist())
+        self.assertEqual(['Not disclosed by this mechanism', 'L1 cache is the highest Inner Cacheable level'],
+                         names['ICB'].tolist())
+        self.assertEqual([None], CLIDR_EL1.decode_array_names(numpy.array([0x7]))['Ctype1'].tolist())
+        self.assertNotIn('LoC', names.dtype.names)
+
     def test_calc_cache_line_size(self):
         ccsidr = CCSIDR_EL1()
         self.assertEqual(16,  ccsidr.calc_cache_line_size_from_register_value(0))
@@ -10,12 +10,23 @@ import textwrap
 import subprocess
 import os
 import struct
+import functools
+import concurrent.futures
 
 """
 Custom python import statements
 """
 from arm.register import *
 from arm.arm_register import *
+from arm.result_cache import *
+from arm.incremental_build import *
+from arm.qemu_pool import *
+from arm.stress import *
+from arm.async_exec import *
+from arm.semihosting import *
+from arm.elf import *
+from arm.batch import *
+from arm.trace import *
 
 class OutputTestCase(unittest.TestCase):
     #FIXME: Move to common unittest infrastructure module
@@ -53,7 +64,149 @@ class ARMTestUtil(OutputTestCase):
     nm_linux_path      = '{}{}{}'.format(base_gcc_path, gcc_prefix, 'nm')
     strip_linux_path   = '{}{}{}'.format(base_gcc_path, gcc_prefix, 'strip')
 
+    _toolchain_versions = None
+
+    #Number of toolchain and qemu steps the running test executed
+    executed_steps = 0
+
+    def qemu_command(self, elf_file):
+        """
+        Returns:
+            The qemu command line which boots elf_file on a
+            raspi3 machine with semihosting enabled
+        """
+        return [self.qemu_system_aarch64_path,
+                '-semihosting',
+                '-machine', 'raspi3',
+                '-cpu', 'cortex-a53',
+                '-nographic',
+                '-kernel',
+                elf_file]
+
+    def run_qemu(self, elf_file, **kwargs):
+        """
+        Boot elf_file, killing qemu if it runs for longer than the
+        configured qemu_timeout
+
+        Args:
+            kwargs - as for run_blocking, stdout and stderr are
+                     captured unless given. input is escaped for the
+                     -nographic multiplexer, see escape_mux_input
+
+        Raises:
+            subprocess.TimeoutExpired: holding the output qemu wrote
+            until it was killed
+        """
+        kwargs.setdefault('stdout', subprocess.PIPE)
+        kwargs.setdefault('stderr', subprocess.PIPE)
+        if kwargs.get('input') is not None:
+            kwargs['input'] = escape_mux_input(kwargs['input'])
+        self.executed_steps += 1
+        return run_blocking(self.qemu_command(elf_file),
+                            timeout=self.config_data.get('qemu_timeout'),
+                            **kwargs)
+
+    def run_qemu_expecting_stderr(self, elf_file, expected_stderr, stop_on_match=False, **kwargs):
+        """
+        Boot elf_file, matching the semihosting output on stderr as it
+        arrives. qemu is killed and the test fails as soon as a byte
+        differs from expected_stderr.
+
+        Args:
+            stop_on_match - also kill qemu once all of expected_stderr
+                            arrived, for tests which don't check the
+                            returncode
+
+        Returns:
+            The subprocess.CompletedProcess
+        """
+        matcher = SemihostingOutputMatcher(expected_stderr)
+        stop_when = matcher.is_decided if stop_on_match else matcher.is_mismatched
+        completed_process = self.run_qemu(elf_file, on_stderr=matcher.feed, stop_when=stop_when, **kwargs)
+        self.assertFalse(matcher.is_mismatched(), matcher.diagnostics())
+        return completed_process
+
+    def run_qemu_batch(self, elf_file, vectors, input_size, output_size, batch_size=None):
+        """
+        Run vectors through a guest which calls run_batch, booting it
+        once per batch of at most batch_size vectors instead of once
+        per vector
+
+        Args:
+            vectors - a list of bytes-like input vectors of input_size
+                      bytes each
+            batch_size - defaults to the configured batch_size
+
+        Returns:
+            A list of the outputs of output_size bytes each, in the
+            order of vectors
+
+        Raises:
+            BatchProtocolError: if a boot didn't answer all its vectors
+        """
+        protocol = BatchProtocol(input_size, output_size)
+        batch_size = batch_size or self.config_data.get('batch_size', 4096)
+        outputs = []
+        for batch in split_batches(vectors, batch_size):
+            completed_process = self.run_qemu(elf_file, input=protocol.encode(batch))
+            try:
+                outputs += protocol.decode(completed_process.stderr, len(batch))
+            except BatchProtocolError as e:
+                raise BatchProtocolError('{} (returncode {})'.format(e, completed_process.returncode))
+        return outputs
+
+    def qemu_pool(self, elf_file):
+        """
+        Returns:
+            A QemuPool of warm qemu instances booting elf_file, for tests
+            which run the same guest repeatedly
+        """
+        self.executed_steps += 1
+        return QemuPool(self.qemu_command(elf_file), size=self.config_data.get('qemu_pool_size', 2))
+
+    def stress_run_qemu(self, elf_file, iterations, expected_returncode=None, expected_stderr=None):
+        """
+        Run elf_file iterations times, with as many runs in flight as
+        configured by stress_concurrency
+
+        Returns:
+            A StressReport
+        """
+        concurrency = self.config_data.get('stress_concurrency', 1)
+        self.executed_steps += 1
+        with QemuPool(self.qemu_command(elf_file), size=concurrency) as pool:
+            run_once = functools.partial(pool.run, timeout=self.config_data.get('qemu_timeout'))
+            return stress_run(run_once, iterations, concurrency,
+                              expected_returncode=expected_returncode,
+                              expected_stderr=expected_stderr)
+
+    @classmethod
+    def toolchain_versions(cls):
+        """
+        Returns:
+            A dictionary of tool paths to the first line of their
+            --version output. Only computed once per process.
+        """
+        if cls._toolchain_versions is None:
+            versions = {}
+            for tool_path in [cls.gcc_path, cls.as_path, cls.ld_path, cls.objdump_path,
+                              cls.nm_path, cls.strip_path, cls.qemu_system_aarch64_path]:
+                try:
+                    completed_process = subprocess.run([tool_path, '--version'],
+                                                       stdout=subprocess.PIPE,
+                                                       stderr=subprocess.DEVNULL)
+                    versions[tool_path] = completed_process.stdout.decode(errors='replace').split('\n')[0]
+                except OSError:
+                    versions[tool_path] = None
+            ARMTestUtil._toolchain_versions = versions
+        return cls._toolchain_versions
+
 class ARMInstructionTest(ARMTestUtil):
+    #The harness modules the tests run, their sources are part of the
+    #result cache key
+    helper_modules = ['arm.register', 'arm.register_loader', 'arm.arm_register', 'arm.result_cache',
+                      'arm.incremental_build', 'arm.qemu_pool', 'arm.stress', 'arm.async_exec',
+                      'arm.semihosting', 'arm.elf', 'arm.batch', 'arm.trace']
 
     @property
     def this_dir(self):
@@ -85,30 +238,204 @@ class ARMInstructionTest(ARMTestUtil):
     def obj_output_file(self):
         return os.path.join(self.output_dir, 'test.o')
 
+    @property
+    def stripped_obj_output_file(self):
+        return os.path.join(self.output_dir, 'test.stripped.o')
+
     @property
     def elf_output_file(self):
         return os.path.join(self.output_dir, 'test.elf')
 
+    @property
+    def builder(self):
+        return IncrementalBuilder(self.config_data['inspect_cache_dir'],
+                                  enabled=self.config_data.get('use_build_cache', False),
+                                  extra_key=self.toolchain_versions(),
+                                  runner=functools.partial(run_blocking,
+                                                           timeout=self.config_data.get('toolchain_timeout'),
+                                                           stdout=None,
+                                                           stderr=None))
+
+    def build_step(self, command, inputs, outputs, **kwargs):
+        """
+        Run a toolchain command, unless its outputs are up to date
+        with its inputs
+        """
+        self.executed_steps += 1
+        return self.builder.run(command, inputs, outputs, **kwargs)
+
+    def assemble(self):
+        return self.build_step([self.as_path, '-mcpu=cortex-a53', '-g', self.asm_source_file, '-o', self.obj_output_file],
+                               inputs=[self.asm_source_file],
+                               outputs=[self.obj_output_file])
+
+    @property
+    def runtime_source_file(self):
+        return os.path.join(self.this_dir, 'runtime', 'semihosting.asm')
+
+    @property
+    def runtime_obj_output_file(self):
+        return os.path.join(self.output_dir, 'semihosting.o')
+
+    def assemble_runtime(self):
+        """
+        Assemble the shared semihosting routines, e.g. write_buffer_to_stderr,
+        for tests which link them in
+        """
+        return self.build_step([self.as_path, '-mcpu=cortex-a53', '-g', self.runtime_source_file, '-o', self.runtime_obj_output_file],
+                               inputs=[self.runtime_source_file],
+                               outputs=[self.runtime_obj_output_file])
+
+    def build_concurrently(self, *steps):
+        """
+        Run independent build steps, e.g. self.assemble and
+        self.assemble_runtime, at the same time. Their commands overlap
+        in the one event loop behind run_blocking.
+
+        Returns:
+            The result of each step, in the order of steps
+        """
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(steps)) as executor:
+            futures = [executor.submit(step) for step in steps]
+            return [future.result() for future in futures]
+
+    def strip(self, strip_option, obj_file, stripped_obj_file):
+        return self.build_step([self.strip_path, strip_option, obj_file, '-o', stripped_obj_file],
+                               inputs=[obj_file],
+                               outputs=[stripped_obj_file])
+
+    def link(self, *obj_files, print_memory_usage=False):
+        command = [self.ld_path]
+        if print_memory_usage:
+            command += ['-M', '-print-memory-usage']
+        command += ['-T', self.linker_source_file] + list(obj_files) + ['-o', self.elf_output_file]
+        return self.build_step(command,
+                               inputs=[self.linker_source_file] + list(obj_files),
+                               outputs=[self.elf_output_file])
+
+    def objdump(self, artifact, *objdump_args, objdump_path=None):
+        """
+        Print the objdump output of artifact, which is memoized per
+        content of the artifact
+        """
+        objdump_path = objdump_path or self.objdump_path
+        self.executed_steps += 1
+        completed_process = self.builder.inspect([objdump_path] + list(objdump_args) + [artifact], artifact)
+        print(completed_process.stdout.decode(errors='replace'))
+        return completed_process
+
+    def read_elf(self, artifact):
+        """
+        Returns:
+            An ElfFile of artifact, to assert on its sections and symbols
+            without running objdump or nm
+        """
+        return ElfFile(artifact)
+
+    def nm(self, artifact):
+        self.executed_steps += 1
+        completed_process = self.builder.inspect([self.nm_path, artifact], artifact)
+        print(completed_process.stdout.decode(errors='replace'))
+        return completed_process
+
+    def append_trace(self, columns, dump):
+        """
+        Archive a register dump of the guest in the binary trace of this
+        test, see arm.trace
+
+        Args:
+            columns - the TraceColumns of the dump
+
+        Returns:
+            The path of the trace file
+        """
+        trace_dir = self.config_data.get('trace_dir', self.output_dir)
+        os.makedirs(trace_dir, exist_ok=True)
+        trace_file = os.path.join(trace_dir, '{}.trace'.format(self._testMethodName))
+        with TraceWriter(trace_file, columns) as trace:
+            trace.write_dump(dump)
+        return trace_file
+
+    @property
+    def result_cache(self):
+        if not self.config_data.get('use_result_cache', False):
+            return None
+        return ResultCache(self.config_data['result_cache_dir'])
+
+    def result_cache_key(self):
+        """
+        Hash of the test sources, this module, the helper_modules and
+        register definitions, the toolchain versions, the qemu command
+        line and the stress iteration count
+        """
+        return ResultCache.compute_key([self.asm_source_file,
+                                        self.c_source_file,
+                                        self.linker_source_file,
+                                        self.runtime_source_file,
+                                        os.path.realpath(__file__),
+                                        register_definitions.definition_file] +
+                                       [os.path.realpath(sys.modules[module].__file__)
+                                        for module in self.helper_modules],
+                                       {'toolchain' : self.toolchain_versions(),
+                                        'qemu' : self.qemu_command(self.elf_output_file),
+                                        'stress_iterations' : self.config_data.get('stress_iterations')})
+
     def addl_setUp(self):
         self.create_output_dir(self.output_dir)
+        self.cached_result_key = None
+        if self.result_cache:
+            self.cached_result_key = self.result_cache_key()
+            if self.result_cache.is_cached_pass(self.id(), self.cached_result_key):
+                self.skipTest('cached pass')
+
+    def run(self, result=None):
+        """
+        Record the test in the result cache if it passed. Tests which
+        ran no toolchain or qemu step, e.g. disabled ones, are not
+        recorded, so they are never reported as a cached pass. Neither
+        are tests run with a result which doesn't keep the outcomes of
+        the tests, e.g. by pytest.
+        """
+        def outcome_count(result):
+            try:
+                return len(result.errors) + len(result.failures) + len(result.skipped) + \
+                        len(result.expectedFailures) + len(result.unexpectedSuccesses)
+            except AttributeError:
+                return None
+
+        count_before = outcome_count(result) if result is not None else 0
+        self.cached_result_key = None
+        self.executed_steps = 0
+        result = super(ARMInstructionTest, self).run(result)
+        if (self.cached_result_key and self.executed_steps and count_before is not None and
+                outcome_count(result) == count_before):
+            self.result_cache.record_pass(self.id(), self.cached_result_key)
+        return result
 
     def test_gnu_arm_assembly_strip_debug_symbols(self):
 
         return
-        completed_process = subprocess.run([self.as_path, '-mcpu=cortex-a53', '-g', self.asm_source_file, '-o', self.obj_output_file]);
-        completed_process = subprocess.run([self.objdump_path, '-t', self.obj_output_file])
-        completed_process = subprocess.run([self.strip_path, '-g', self.obj_output_file])
-        completed_process = subprocess.run([self.objdump_path, '-t', self.obj_output_file])
-        #FIXME: Add assert statements
+        self.assemble()
+        self.objdump(self.obj_output_file, '-t')
+        self.strip('-g', self.obj_output_file, self.stripped_obj_output_file)
+        self.objdump(self.stripped_obj_output_file, '-t')
+        with self.read_elf(self.obj_output_file) as elf, self.read_elf(self.stripped_obj_output_file) as stripped_elf:
+            self.assertEqual(set(elf.symbols_by_name), set(stripped_elf.symbols_by_name))
+            self.assertFalse([section.name for section in stripped_elf.sections if section.name.startswith('.debug')])
 
     def test_gnu_arm_linker_simple_1(self):
 
         return
-        completed_process = subprocess.run([self.as_path, '-mcpu=cortex-a53', '-g', self.asm_source_file, '-o', self.obj_output_file]);
-        completed_process = subprocess.run([self.strip_path, '-d', self.obj_output_file])
-        completed_process = subprocess.run([self.ld_path, '-M', '-print-memory-usage', '-T', self.linker_source_file, self.obj_output_file, '-o', self.elf_output_file]);
-        completed_process = subprocess.run([self.objdump_path, '-t', '-d', self.elf_output_file])
-        #FIXME: Add assert statements
+        self.assemble()
+        self.strip('-d', self.obj_output_file, self.stripped_obj_output_file)
+        self.link(self.stripped_obj_output_file, print_memory_usage=True)
+        self.objdump(self.elf_output_file, '-t', '-d')
+        with self.read_elf(self.elf_output_file) as elf:
+            self.assertEqual(0x0, elf.entry)
+            self.assertEqual(0x0, elf.symbol_address('_Reset'))
+            self.assertEqual(STB_GLOBAL, elf.symbol('_Reset').binding)
+            self.assertEqual(0x20, elf.symbol_address('Reset_Handler'))
+            self.assertEqual(0x0, elf.section('.text').address)
 
     def test_qemu_ID_AA64PFR0_EL1(self):
         """
@@ -116,18 +443,10 @@ class ARMInstructionTest(ARMTestUtil):
         that all 4 exception levels are implemented.
         """
         return  #FIXME: Currently failing due to qemu returning 0x22, meaning only EL0 and EL1 implemented
-        completed_process = subprocess.run([self.as_path, '-mcpu=cortex-a53', '-g', self.asm_source_file, '-o', self.obj_output_file]);
-        completed_process = subprocess.run([self.ld_path, '-M', '-print-memory-usage', '-T', self.linker_source_file, self.obj_output_file, '-o', self.elf_output_file]);
-        completed_process = subprocess.run([self.objdump_path, '-t', '-d', self.elf_output_file])
-        completed_process = subprocess.run([self.qemu_system_aarch64_path,
-                                            '-semihosting',
-                                            '-machine', 'raspi3',
-                                            '-cpu', 'cortex-a53',
-                                            '-nographic',
-                                            '-kernel',
-                                            self.elf_output_file],
-                                           stdout=subprocess.PIPE,
-                                           stderr=subprocess.PIPE)
+        completed_process = self.assemble()
+        completed_process = self.link(self.obj_output_file, print_memory_usage=True)
+        completed_process = self.objdump(self.elf_output_file, '-t', '-d')
+        completed_process = self.run_qemu(self.elf_output_file)
         print(completed_process.stdout)
         print(completed_process.stderr)
         print(completed_process.returncode)
@@ -140,16 +459,9 @@ class ARMInstructionTest(ARMTestUtil):
         """
         return
 
-        completed_process = subprocess.run([self.as_path, '-mcpu=cortex-a53', '-g', self.asm_source_file, '-o', self.obj_output_file]);
-        completed_process = subprocess.run([self.ld_path, '-M', '-print-memory-usage', '-T', self.linker_source_file, self.obj_output_file, '-o', self.elf_output_file]);
-        completed_process = subprocess.run([self.qemu_system_aarch64_path,
-                                            '-semihosting',
-                                            '-machine', 'raspi3',
-                                            '-cpu', 'cortex-a53',
-                                            '-nographic',
-                                            '-kernel',
-                                            self.elf_output_file],
-                                           stdout=subprocess.PIPE)
+        completed_process = self.assemble()
+        completed_process = self.link(self.obj_output_file, print_memory_usage=True)
+        completed_process = self.run_qemu(self.elf_output_file, stderr=None)
         print(completed_process.stdout)
         print(completed_process.returncode)
         self.assertEqual(0x77, completed_process.returncode)
@@ -161,17 +473,9 @@ class ARMInstructionTest(ARMTestUtil):
         """
         return
 
-        completed_process = subprocess.run([self.as_path, '-mcpu=cortex-a53', '-g', self.asm_source_file, '-o', self.obj_output_file]);
-        completed_process = subprocess.run([self.ld_path, '-T', self.linker_source_file, self.obj_output_file, '-o', self.elf_output_file]);
-        completed_process = subprocess.run([self.qemu_system_aarch64_path,
-                                            '-semihosting',
-                                            '-machine', 'raspi3',
-                                            '-cpu', 'cortex-a53',
-                                            '-nographic',
-                                            '-kernel',
-                                            self.elf_output_file],
-                                           stdout=subprocess.PIPE,
-                                           stderr=subprocess.PIPE)
+        completed_process = self.assemble()
+        completed_process = self.link(self.obj_output_file)
+        completed_process = self.run_qemu_expecting_stderr(self.elf_output_file, b'\x88')
         print(completed_process.stdout)
         print('stderr is')
         print(completed_process.stderr)
@@ -186,17 +490,9 @@ class ARMInstructionTest(ARMTestUtil):
         """
         return
 
-        completed_process = subprocess.run([self.as_path, '-mcpu=cortex-a53', '-g', self.asm_source_file, '-o', self.obj_output_file]);
-        completed_process = subprocess.run([self.ld_path, '-T', self.linker_source_file, self.obj_output_file, '-o', self.elf_output_file]);
-        completed_process = subprocess.run([self.qemu_system_aarch64_path,
-                                            '-semihosting',
-                                            '-machine', 'raspi3',
-                                            '-cpu', 'cortex-a53',
-                                            '-nographic',
-                                            '-kernel',
-                                            self.elf_output_file],
-                                           stdout=subprocess.PIPE,
-                                           stderr=subprocess.PIPE)
+        completed_process = self.assemble()
+        completed_process = self.link(self.obj_output_file)
+        completed_process = self.run_qemu_expecting_stderr(self.elf_output_file, b'\x88\x88\x88\x88')
         print(completed_process.stdout)
         print('stderr is')
         print(completed_process.stderr)
@@ -211,17 +507,9 @@ class ARMInstructionTest(ARMTestUtil):
         """
         return
 
-        completed_process = subprocess.run([self.as_path, '-mcpu=cortex-a53', '-g', self.asm_source_file, '-o', self.obj_output_file]);
-        completed_process = subprocess.run([self.ld_path, '-T', self.linker_source_file, self.obj_output_file, '-o', self.elf_output_file]);
-        completed_process = subprocess.run([self.qemu_system_aarch64_path,
-                                            '-semihosting',
-                                            '-machine', 'raspi3',
-                                            '-cpu', 'cortex-a53',
-                                            '-nographic',
-                                            '-kernel',
-                                            self.elf_output_file],
-                                           stdout=subprocess.PIPE,
-                                           stderr=subprocess.PIPE)
+        completed_process = self.assemble()
+        completed_process = self.link(self.obj_output_file)
+        completed_process = self.run_qemu_expecting_stderr(self.elf_output_file, b'\x44\x33\x22\x11')
         print(completed_process.stdout)
         print('stderr is')
         print(completed_process.stderr)
@@ -236,18 +524,11 @@ class ARMInstructionTest(ARMTestUtil):
         """
         return
 
-        completed_process = subprocess.run([self.as_path, '-mcpu=cortex-a53', '-g', self.asm_source_file, '-o', self.obj_output_file]);
-        completed_process = subprocess.run([self.strip_path, '-d', 'test.o'])
-        completed_process = subprocess.run([self.ld_path, '-M', '-print-memory-usage', '-T', self.linker_source_file, self.obj_output_file, '-o', self.elf_output_file]);
-        completed_process = subprocess.run([self.objdump_path, '-t', '-d', self.elf_output_file])
-        completed_process = subprocess.run([self.qemu_system_aarch64_path,
-                                            '-semihosting',
-                                            '-machine', 'raspi3',
-                                            '-cpu', 'cortex-a53',
-                                            '-nographic',
-                                            '-kernel',
-                                            self.elf_output_file],
-                                           stdout=subprocess.PIPE)
+        completed_process = self.assemble()
+        completed_process = self.strip('-d', self.obj_output_file, self.stripped_obj_output_file)
+        completed_process = self.link(self.stripped_obj_output_file, print_memory_usage=True)
+        completed_process = self.objdump(self.elf_output_file, '-t', '-d')
+        completed_process = self.run_qemu(self.elf_output_file, stderr=None)
         print(completed_process.stdout)
         print(completed_process.returncode)
         self.assertEqual(3, completed_process.returncode)
@@ -259,17 +540,9 @@ class ARMInstructionTest(ARMTestUtil):
         """
         return
 
-        completed_process = subprocess.run([self.as_path, '-mcpu=cortex-a53', '-g', self.asm_source_file, '-o', self.obj_output_file]);
-        completed_process = subprocess.run([self.ld_path, '-T', self.linker_source_file, self.obj_output_file, '-o', self.elf_output_file]);
-        completed_process = subprocess.run([self.qemu_system_aarch64_path,
-                                            '-semihosting',
-                                            '-machine', 'raspi3',
-                                            '-cpu', 'cortex-a53',
-                                            '-nographic',
-                                            '-kernel',
-                                            self.elf_output_file],
-                                           stdout=subprocess.PIPE,
-                                           stderr=subprocess.PIPE)
+        completed_process = self.assemble()
+        completed_process = self.link(self.obj_output_file)
+        completed_process = self.run_qemu_expecting_stderr(self.elf_output_file, b'\x44\x33\x22\x11')
         print(completed_process.stdout)
         print('stderr is')
         print(completed_process.stderr)
@@ -283,19 +556,10 @@ class ARMInstructionTest(ARMTestUtil):
         """
         return
 
-        completed_process = subprocess.run([self.as_path, '-mcpu=cortex-a53', '-g', self.asm_source_file, '-o', self.obj_output_file]);
-        completed_process = subprocess.run([self.ld_path, '-T', self.linker_source_file, self.obj_output_file, '-o', self.elf_output_file]);
-        completed_process = subprocess.run([self.objdump_path, '-t', '-d', self.elf_output_file])
-        print(completed_process.stdout)
-        completed_process = subprocess.run([self.qemu_system_aarch64_path,
-                                            '-semihosting',
-                                            '-machine', 'raspi3',
-                                            '-cpu', 'cortex-a53',
-                                            '-nographic',
-                                            '-kernel',
-                                            self.elf_output_file],
-                                           stdout=subprocess.PIPE,
-                                           stderr=subprocess.PIPE)
+        completed_process = self.assemble()
+        completed_process = self.link(self.obj_output_file)
+        completed_process = self.objdump(self.elf_output_file, '-t', '-d')
+        completed_process = self.run_qemu_expecting_stderr(self.elf_output_file, b'\x00\x00\x00\x00')
         print('stdout is')
         print(completed_process.stdout)
         print('stderr is')
@@ -310,19 +574,11 @@ class ARMInstructionTest(ARMTestUtil):
         Initialize the mmu
         """
         return
-        completed_process = subprocess.run([self.as_path, '-mcpu=cortex-a53', '-g', self.asm_source_file, '-o', self.obj_output_file]);
-        completed_process = subprocess.run([self.ld_path, '-T', self.linker_source_file, self.obj_output_file, '-o', self.elf_output_file]);
-        completed_process = subprocess.run([self.objdump_path, '-t', '-d', self.elf_output_file])
-        print(completed_process.stdout)
-        completed_process = subprocess.run([self.qemu_system_aarch64_path,
-                                            '-semihosting',
-                                            '-machine', 'raspi3',
-                                            '-cpu', 'cortex-a53',
-                                            '-nographic',
-                                            '-kernel',
-                                            self.elf_output_file],
-                                           stdout=subprocess.PIPE,
-                                           stderr=subprocess.PIPE)
+        self.build_concurrently(self.assemble, self.assemble_runtime)
+        completed_process = self.link(self.obj_output_file, self.runtime_obj_output_file)
+        completed_process = self.objdump(self.elf_output_file, '-t', '-d')
+        completed_process = self.run_qemu_expecting_stderr(self.elf_output_file,
+                                                           bytes.fromhex('1ae00f700ae01f202300200a22110000'))
         print('stdout is')
         print(completed_process.stdout)
         print('stderr is')
@@ -333,10 +589,16 @@ class ARMInstructionTest(ARMTestUtil):
         self.assertEqual(0x77, completed_process.returncode)
         self.assertEqual('1ae00f700ae01f202300200a22110000', qemu_stderr)
 
-        swapped = struct.unpack('>i', struct.pack('<i', int(qemu_stderr[0:8], 16)))
-        print('ccsidr for cache level 1 is', '{:#010x}'.format(swapped[0]))
-        ccsidr = CCSIDR_EL1()
-        ccsidr.set_value(swapped[0])
+        trace_file = self.append_trace([('ccsidr_l1', 'CCSIDR_EL1', 4),
+                                        ('ccsidr_l2', 'CCSIDR_EL1', 4),
+                                        ('clidr', 'CLIDR_EL1', 4),
+                                        ('id_aa64mmfr0_el1', 'ID_AA64MMFR0_EL1', 4)],
+                                       completed_process.stderr)
+        with TraceReader(trace_file) as trace:
+            register_dump = dict(zip([column.name for column in trace.columns], trace.record(-1)))
+
+        print('ccsidr for cache level 1 is', '{:#010x}'.format(register_dump['ccsidr_l1']))
+        ccsidr = CCSIDR_EL1(register_dump['ccsidr_l1'])
         print('Cache Level 1 Line Size is', ccsidr.get_field('LineSize'), 'Bytes')
         print('Cache Level 1 Associativity is', ccsidr.get_field('Associativity'))
         print('Cache Level 1 Number of Sets is', ccsidr.get_field('NumSets'))
@@ -346,10 +608,8 @@ class ARMInstructionTest(ARMTestUtil):
         self.assertEqual(128, ccsidr.get_field('NumSets'))
         self.assertEqual(32768, ccsidr.cache_size())
 
-        swapped = struct.unpack('>i', struct.pack('<i', int(qemu_stderr[8:16], 16)))
-        print('ccsidr for cache level 2 is', '{:#010x}'.format(swapped[0]))
-        ccsidr = CCSIDR_EL1()
-        ccsidr.set_value(swapped[0])
+        print('ccsidr for cache level 2 is', '{:#010x}'.format(register_dump['ccsidr_l2']))
+        ccsidr = CCSIDR_EL1(register_dump['ccsidr_l2'])
         print('Cache Level 2 Line Size is', ccsidr.get_field('LineSize'), 'Bytes')
         print('Cache Level 2 Associativity is', ccsidr.get_field('Associativity'))
         print('Cache Level 2 Number of Sets is', ccsidr.get_field('NumSets'))
@@ -359,10 +619,8 @@ class ARMInstructionTest(ARMTestUtil):
         self.assertEqual(256, ccsidr.get_field('NumSets'))
         self.assertEqual(32768, ccsidr.cache_size())
 
-        swapped = struct.unpack('>i', struct.pack('<i', int(qemu_stderr[16:24], 16)))
-        print('clidr is', '{:#010x}'.format(swapped[0]))
-        clidr = CLIDR_EL1()
-        clidr.set_value(swapped[0])
+        print('clidr is', '{:#010x}'.format(register_dump['clidr']))
+        clidr = CLIDR_EL1(register_dump['clidr'])
         print('Cache Level 1 has', clidr.get_field_value_name('Ctype1'))
         print('Cache Level 2 has a', clidr.get_field_value_name('Ctype2'))
         print('LoUIS is', clidr.get_field('LoUIS'))
@@ -370,10 +628,8 @@ class ARMInstructionTest(ARMTestUtil):
         print('LoUU is', clidr.get_field('LoUU'))
         print('ICB is', clidr.get_field_value_name('ICB'))
 
-        swapped = struct.unpack('>i', struct.pack('<i', int(qemu_stderr[24:32], 16)))
-        print('id_aa64mmfr0_el1 is', '{:#010x}'.format(swapped[0]))
-        id_aa64mmfr0_el1 = ID_AA64MMFR0_EL1()
-        id_aa64mmfr0_el1.set_value(swapped[0])
+        print('id_aa64mmfr0_el1 is', '{:#010x}'.format(register_dump['id_aa64mmfr0_el1']))
+        id_aa64mmfr0_el1 = ID_AA64MMFR0_EL1(register_dump['id_aa64mmfr0_el1'])
         print('QEMU Raspi3 suports', id_aa64mmfr0_el1.get_field_value_name('PARange'), 'of Physical Memory')
         print('QEMU Raspi3 suports', id_aa64mmfr0_el1.get_field_value_name('ASIDBits'), 'of ASID')
         print('QEMU Raspi3 has', id_aa64mmfr0_el1.get_field_value_name('BigEnd'))
@@ -402,58 +658,58 @@ class ARMInstructionTest(ARMTestUtil):
         """
 
         return
-        completed_process = subprocess.run([self.as_path, '-mcpu=cortex-a53', '-g', self.asm_source_file, '-o', self.obj_output_file]);
-        completed_process = subprocess.run([self.ld_path, '-M', '-print-memory-usage', '-T', self.linker_source_file, self.obj_output_file, '-o', self.elf_output_file]);
-        completed_process = subprocess.run([self.objdump_path, '-t', '-d', self.elf_output_file])
-
-        for i in range(0, 100):
-            completed_process = subprocess.run([self.qemu_system_aarch64_path,
-                                                '-semihosting',
-                                                '-machine', 'raspi3',
-                                                '-cpu', 'cortex-a53',
-                                                '-nographic',
-                                                '-kernel',
-                                                self.elf_output_file],
-                                               stdout=subprocess.PIPE,
-                                               stderr=subprocess.PIPE)
-            print(completed_process.stdout)
-            print('stderr is')
-            print(completed_process.stderr)
-            print(completed_process.returncode)
-            self.assertEqual(0x77, completed_process.returncode)
-            self.assertEqual(b'\x04\x00\x00\x00', completed_process.stderr)
+        self.build_concurrently(self.assemble, self.assemble_runtime)
+        self.link(self.obj_output_file, self.runtime_obj_output_file, print_memory_usage=True)
+        self.objdump(self.elf_output_file, '-t', '-d')
+
+        report = self.stress_run_qemu(self.elf_output_file,
+                                      iterations=self.config_data.get('stress_iterations', 100),
+                                      expected_returncode=0x77,
+                                      expected_stderr=b'\x04\x00\x00\x00')
+        print(report.summary())
+        self.assertEqual(0, report.failures, report.summary())
 
     def test_pre_post_increment(self):
         return
-        completed_process = subprocess.run([self.gcc_linux_path, '-nostartfiles', '-nodefaultlibs', '-nostdlib', self.c_source_file,
-                                            '-o', self.elf_output_file],
+        completed_process = self.build_step([self.gcc_linux_path, '-nostartfiles', '-nodefaultlibs', '-nostdlib', self.c_source_file,
+                                             '-o', self.elf_output_file],
+                                            inputs=[self.c_source_file],
+                                            outputs=[self.elf_output_file],
                                             stdout=subprocess.PIPE,
                                             stderr=subprocess.PIPE);
         print(completed_process)
 
-        completed_process = subprocess.run([self.objdump_linux_path, '-t', '-d', self.elf_output_file])
-        print(completed_process.stdout)
+        completed_process = self.objdump(self.elf_output_file, '-t', '-d', objdump_path=self.objdump_linux_path)
 
     def test_set_bit(self):
-        completed_process = subprocess.run([self.as_path, '-mcpu=cortex-a53', '-g', self.asm_source_file, '-o', self.obj_output_file]);
-        completed_process = subprocess.run([self.ld_path, '-M', '-print-memory-usage', '-T', self.linker_source_file, self.obj_output_file, '-o', self.elf_output_file]);
-        completed_process = subprocess.run([self.objdump_path, '-t', '-d', self.elf_output_file])
-        completed_process = subprocess.run([self.qemu_system_aarch64_path,
-                                            '-semihosting',
-                                            '-machine', 'raspi3',
-                                            '-cpu', 'cortex-a53',
-                                            '-nographic',
-                                            '-kernel',
-                                            self.elf_output_file],
-                                           stdout=subprocess.PIPE,
-                                           stderr=subprocess.PIPE,
-                                           input=b'\x77')
+        completed_process = self.assemble()
+        completed_process = self.link(self.obj_output_file, print_memory_usage=True)
+        completed_process = self.objdump(self.elf_output_file, '-t', '-d')
+        completed_process = self.run_qemu_expecting_stderr(self.elf_output_file, b'\xab\xcd\xef\x12',
+                                                           stop_on_match=True, input=b'\x77')
         print(completed_process.stdout)
         print('stderr is')
         print(completed_process.stderr)
         print(completed_process.returncode)
         self.assertEqual(b'\xab\xcd\xef\x12', completed_process.stderr)
 
+    def test_set_bit_batch(self):
+        """
+        Verify setting every bit of a set of values, with all operands
+        streamed into a single boot of the guest
+        """
+        self.build_concurrently(self.assemble, self.assemble_runtime)
+        self.link(self.obj_output_file, self.runtime_obj_output_file, print_memory_usage=True)
+
+        operands = [(value, bit) for value in (0x0, 0xffffffffffffffff, 0x8000000000000001, 0xabcdef12)
+                                 for bit in range(64)]
+        outputs = self.run_qemu_batch(self.elf_output_file,
+                                      [struct.pack('<QQ', value, bit) for value, bit in operands],
+                                      input_size=16, output_size=8)
+        for (value, bit), output in zip(operands, outputs):
+            self.assertEqual(value | (1 << bit), struct.unpack('<Q', output)[0],
+                             'value {:#x} bit {}'.format(value, bit))
+
 def load_tests(loader, standard_tests, pattern):
     test_cases = [ARMInstructionTest]
     suite = unittest.TestSuite()
@@ -0,0 +1,172 @@
+#!/usr/bin/python3
+
+"""
+Standard python import statements
+"""
+import asyncio
+import subprocess
+import threading
+import os
+
+async def pump_stream(stream, chunks, callback, stop_when, stop_requested):
+    """
+    Read stream until EOF, keeping every chunk in chunks and passing
+    it to callback as soon as it arrives. Sets stop_requested once
+    stop_when returns True.
+    """
+    while True:
+        chunk = await stream.read(65536)
+        if not chunk:
+            return
+        chunks.append(chunk)
+        if callback:
+            callback(chunk)
+        if stop_when and stop_when():
+            stop_requested.set()
+
+async def feed_stdin(stdin, input):
+    try:
+        if input:
+            stdin.write(input)
+            await stdin.drain()
+    except (BrokenPipeError, ConnectionResetError):
+        pass
+    finally:
+        stdin.close()
+
+async def run_async(args, input=None, timeout=None, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                    on_stdout=None, on_stderr=None, stop_when=None):
+    """
+    Run a command with a deadline
+
+    Args:
+        args - the command line
+        input - bytes written to the stdin of the command, stdin is
+                /dev/null if None
+        timeout - seconds the command may run for, None for no limit
+        stdout, stderr - subprocess.PIPE to capture the stream, or None
+                         to leave it connected to ours
+        on_stdout, on_stderr - optional callables receiving each chunk
+                               of captured output as soon as it is read
+        stop_when - optional callable checked after every chunk of captured
+                    output, the command is killed as soon as it returns True
+
+    Returns:
+        A subprocess.CompletedProcess. If the command was stopped by
+        stop_when its returncode is the negative signal number.
+
+    Raises:
+        subprocess.TimeoutExpired: if the deadline passes. The command is
+        killed and the exception holds the output captured until then.
+    """
+    process = await asyncio.create_subprocess_exec(*args,
+                                                   stdin=subprocess.PIPE if input is not None else subprocess.DEVNULL,
+                                                   stdout=stdout,
+                                                   stderr=stderr)
+    stdout_chunks = []
+    stderr_chunks = []
+    stop_requested = asyncio.Event()
+    tasks = [process.wait()]
+    if input is not None:
+        tasks.append(feed_stdin(process.stdin, input))
+    if process.stdout:
+        tasks.append(pump_stream(process.stdout, stdout_chunks, on_stdout, stop_when, stop_requested))
+    if process.stderr:
+        tasks.append(pump_stream(process.stderr, stderr_chunks, on_stderr, stop_when, stop_requested))
+
+    def captured(stream, chunks):
+        return b''.join(chunks) if stream else None
+
+    all_done = asyncio.ensure_future(asyncio.gather(*tasks))
+    stopped = asyncio.ensure_future(stop_requested.wait())
+    try:
+        done, pending = await asyncio.wait([all_done, stopped], timeout=timeout,
+                                           return_when=asyncio.FIRST_COMPLETED)
+    except asyncio.CancelledError:
+        stopped.cancel()
+        all_done.cancel()
+        if process.returncode is None:
+            process.kill()
+        raise
+    stopped.cancel()
+    if all_done not in done:
+        all_done.cancel()
+        try:
+            await all_done
+        except asyncio.CancelledError:
+            pass
+        if process.returncode is None:
+            process.kill()
+        await process.wait()
+        if not stop_requested.is_set():
+            raise subprocess.TimeoutExpired(args, timeout,
+                                            output=captured(process.stdout, stdout_chunks),
+                                            stderr=captured(process.stderr, stderr_chunks))
+
+    return subprocess.CompletedProcess(args, process.returncode,
+                                       captured(process.stdout, stdout_chunks),
+                                       captured(process.stderr, stderr_chunks))
+
+#The (pid, loop) of the event loop thread of this process, see
+#shared_event_loop
+_shared_event_loop = None
+_shared_event_loop_lock = threading.Lock()
+
+def shared_event_loop():
+    """
+    Returns:
+        The event loop which runs the commands of run_blocking and
+        run_concurrently, in a daemon thread of this process. Commands
+        started from different threads all run in it and overlap.
+    """
+    global _shared_event_loop
+    with _shared_event_loop_lock:
+        #A forked child, e.g. a parallel test worker, needs its own thread
+        if _shared_event_loop is None or _shared_event_loop[0] != os.getpid():
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name='async_exec', daemon=True).start()
+            _shared_event_loop = (os.getpid(), loop)
+        return _shared_event_loop[1]
+
+def run_in_shared_event_loop(coroutine):
+    """
+    Run coroutine in the shared_event_loop and wait for its result
+    """
+    future = asyncio.run_coroutine_threadsafe(coroutine, shared_event_loop())
+    try:
+        return future.result()
+    except BaseException:
+        future.cancel()
+        raise
+
+def run_blocking(args, **kwargs):
+    """
+    Blocking wrapper of run_async, a drop in replacement for
+    subprocess.run with a timeout. Calls from different threads run
+    at the same time.
+    """
+    return run_in_shared_event_loop(run_async(args, **kwargs))
+
+def run_concurrently(steps, limit=None):
+    """
+    Run independent commands at the same time
+
+    Args:
+        steps - a list of (args, kwargs) tuples, kwargs as for run_async
+        limit - maximum number of commands running at the same time
+
+    Returns:
+        A list with a subprocess.CompletedProcess or the exception raised
+        by each step, in the order of steps
+    """
+    async def run_steps():
+        semaphore = asyncio.Semaphore(limit or len(steps) or 1)
+
+        async def run_step(args, kwargs):
+            async with semaphore:
+                return await run_async(args, **kwargs)
+
+        return await asyncio.gather(*[run_step(args, kwargs) for args, kwargs in steps],
+                                    return_exceptions=True)
+
+    return run_in_shared_event_loop(run_steps())
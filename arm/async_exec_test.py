@@ -0,0 +1,84 @@
+#!/usr/bin/python3
+
+"""
+Standard python import statements
+"""
+import unittest
+import subprocess
+import sys
+import gc
+import time
+import concurrent.futures
+
+"""
+Custom python import statements
+"""
+from arm.async_exec import *
+
+def python_command(program):
+    return [sys.executable, '-c', program]
+
+class AsyncExecTest(unittest.TestCase):
+    def test_run_captures_output(self):
+        completed_process = run_blocking(python_command('import sys; sys.stdout.write("out"); sys.stderr.write("err"); sys.exit(0x77)'),
+                                         timeout=10)
+        self.assertEqual(0x77, completed_process.returncode)
+        self.assertEqual(b'out', completed_process.stdout)
+        self.assertEqual(b'err', completed_process.stderr)
+
+    def test_run_with_input(self):
+        completed_process = run_blocking(python_command('import sys; sys.stderr.buffer.write(sys.stdin.buffer.read())'),
+                                         input=b'\x77', timeout=10)
+        self.assertEqual(b'\x77', completed_process.stderr)
+
+    def test_run_without_capture(self):
+        completed_process = run_blocking(python_command('pass'), stdout=None, stderr=None, timeout=10)
+        self.assertEqual(0, completed_process.returncode)
+        self.assertEqual(None, completed_process.stdout)
+        self.assertEqual(None, completed_process.stderr)
+
+    def test_streaming_callback(self):
+        chunks = []
+        completed_process = run_blocking(python_command('import sys; sys.stderr.write("abc")'),
+                                         on_stderr=chunks.append, timeout=10)
+        self.assertEqual(b'abc', b''.join(chunks))
+        self.assertEqual(b'abc', completed_process.stderr)
+
+    def test_timeout_reports_partial_output(self):
+        program = 'import sys, time; sys.stderr.write("partial"); sys.stderr.flush(); time.sleep(60)'
+        with self.assertNoLogs('asyncio'):
+            with self.assertRaises(subprocess.TimeoutExpired) as context:
+                run_blocking(python_command(program), timeout=2)
+            gc.collect()
+        self.assertEqual(b'partial', context.exception.stderr)
+        self.assertEqual(b'', context.exception.output)
+
+    def test_stop_when(self):
+        program = 'import sys, time; sys.stderr.write("stop"); sys.stderr.flush(); time.sleep(60)'
+        chunks = []
+        with self.assertNoLogs('asyncio'):
+            completed_process = run_blocking(python_command(program),
+                                             on_stderr=chunks.append,
+                                             stop_when=lambda: b''.join(chunks) == b'stop',
+                                             timeout=30)
+            gc.collect()
+        self.assertTrue(completed_process.returncode < 0)
+        self.assertEqual(b'stop', completed_process.stderr)
+
+    def test_run_concurrently(self):
+        steps = [(python_command('import sys; sys.exit({})'.format(i)), {'timeout' : 10}) for i in range(0, 4)]
+        steps.append((python_command('import time; time.sleep(60)'), {'timeout' : 1}))
+        results = run_concurrently(steps, limit=3)
+        self.assertEqual([0, 1, 2, 3], [result.returncode for result in results[:4]])
+        self.assertIsInstance(results[4], subprocess.TimeoutExpired)
+
+    def test_run_blocking_from_threads_overlaps(self):
+        start = time.monotonic()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=3) as executor:
+            futures = [executor.submit(run_blocking, python_command('import time; time.sleep(1)'), timeout=10)
+                       for i in range(0, 3)]
+            self.assertEqual([0, 0, 0], [future.result().returncode for future in futures])
+        self.assertLess(time.monotonic() - start, 2.5)
+
+if __name__ == '__main__':
+    unittest.main()
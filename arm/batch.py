@@ -0,0 +1,76 @@
+#!/usr/bin/python3
+
+"""
+Standard python import statements
+"""
+import struct
+
+class BatchProtocolError(Exception):
+    pass
+
+class BatchProtocol(object):
+    """
+    Framing of a batch of input vectors streamed to a guest running the
+    run_batch routine of arm/runtime/semihosting.asm, and of the outputs
+    it writes back, so that one boot of qemu processes many vectors.
+
+    Host to guest, on stdin (read with SYS_READ):
+        header  - magic and vector count, as two little-endian words
+        vectors - count vectors of input_size bytes each
+
+    Guest to host, on stderr (written with SYS_WRITE):
+        outputs - count outputs of output_size bytes each
+        trailer - the header echoed back once all vectors were run
+    """
+    magic = 0x48435442  # 'BTCH'
+    header_format = '<II'
+    header_size = struct.calcsize(header_format)
+
+    def __init__(self, input_size, output_size):
+        self.input_size = input_size
+        self.output_size = output_size
+
+    def encode(self, vectors):
+        """
+        Args:
+            vectors - a list of bytes-like input vectors of input_size
+                      bytes each
+
+        Returns:
+            The bytes to feed to the guest's stdin
+        """
+        for index, vector in enumerate(vectors):
+            if len(vector) != self.input_size:
+                raise BatchProtocolError('Vector {} is {} bytes, expected {}'.format(
+                    index, len(vector), self.input_size))
+        return struct.pack(self.header_format, self.magic, len(vectors)) + b''.join(vectors)
+
+    def decode(self, data, count):
+        """
+        Args:
+            data - the bytes written by the guest to stderr
+            count - the number of vectors which were sent
+
+        Returns:
+            A list of count outputs of output_size bytes each
+
+        Raises:
+            BatchProtocolError: if the guest didn't answer every vector,
+            e.g. because it crashed part way through the batch
+        """
+        outputs_size = count * self.output_size
+        expected_size = outputs_size + self.header_size
+        if len(data) != expected_size:
+            raise BatchProtocolError('Guest wrote {} bytes, expected {} for {} vectors'.format(
+                len(data), expected_size, count))
+        trailer = struct.unpack_from(self.header_format, data, outputs_size)
+        if trailer != (self.magic, count):
+            raise BatchProtocolError('Invalid batch trailer {}'.format(data[outputs_size:].hex()))
+        return [bytes(data[offset:offset + self.output_size])
+                for offset in range(0, outputs_size, self.output_size)]
+
+def split_batches(vectors, batch_size):
+    """
+    Split vectors into lists of at most batch_size vectors
+    """
+    return [vectors[start:start + batch_size] for start in range(0, len(vectors), batch_size)]
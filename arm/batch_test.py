@@ -0,0 +1,60 @@
+#!/usr/bin/python3
+
+"""
+Standard python import statements
+"""
+import unittest
+import struct
+
+"""
+Custom python import statements
+"""
+from arm.batch import *
+
+def run_guest(protocol, data, kernel):
+    """
+    Model of the guest's run_batch routine
+    """
+    magic, count = struct.unpack_from(protocol.header_format, data)
+    vectors = data[protocol.header_size:]
+    output = b''
+    for index in range(count):
+        output += kernel(vectors[index * protocol.input_size:(index + 1) * protocol.input_size])
+    return output + data[:protocol.header_size]
+
+def set_bit(vector):
+    value, bit = struct.unpack('<QQ', vector)
+    return struct.pack('<Q', value | (1 << bit))
+
+class BatchProtocolTest(unittest.TestCase):
+    def test_round_trip(self):
+        protocol = BatchProtocol(input_size=16, output_size=8)
+        operands = [(value, bit) for value in (0, 0x8000000000000001) for bit in range(64)]
+        data = protocol.encode([struct.pack('<QQ', value, bit) for value, bit in operands])
+        self.assertEqual(8 + 16 * len(operands), len(data))
+
+        outputs = protocol.decode(run_guest(protocol, data, set_bit), len(operands))
+        self.assertEqual([struct.pack('<Q', value | (1 << bit)) for value, bit in operands], outputs)
+
+    def test_empty_batch(self):
+        protocol = BatchProtocol(input_size=4, output_size=4)
+        data = protocol.encode([])
+        self.assertEqual([], protocol.decode(run_guest(protocol, data, None), 0))
+
+    def test_wrong_vector_size(self):
+        protocol = BatchProtocol(input_size=16, output_size=8)
+        self.assertRaises(BatchProtocolError, protocol.encode, [b'\x00' * 16, b'\x00' * 8])
+
+    def test_truncated_output(self):
+        protocol = BatchProtocol(input_size=16, output_size=8)
+        data = protocol.encode([b'\x00' * 16] * 3)
+        output = run_guest(protocol, data, set_bit)
+        self.assertRaises(BatchProtocolError, protocol.decode, output[:16], 3)
+        self.assertRaises(BatchProtocolError, protocol.decode, output[:-8] + b'\x00' * 8, 3)
+
+    def test_split_batches(self):
+        self.assertEqual([[0, 1, 2], [3, 4, 5], [6]], split_batches(list(range(7)), 3))
+        self.assertEqual([], split_batches([], 3))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,215 @@
+#!/usr/bin/python3
+
+"""
+Standard python import statements
+"""
+import collections
+import mmap
+import struct
+
+class ElfFormatError(Exception):
+    pass
+
+"""
+Section header types
+"""
+SHT_NULL     = 0
+SHT_PROGBITS = 1
+SHT_SYMTAB   = 2
+SHT_STRTAB   = 3
+SHT_NOBITS   = 8
+SHT_DYNSYM   = 11
+
+"""
+Special section indices
+"""
+SHN_UNDEF  = 0
+SHN_ABS    = 0xfff1
+SHN_COMMON = 0xfff2
+
+"""
+Symbol types and bindings
+"""
+STT_NOTYPE  = 0
+STT_OBJECT  = 1
+STT_FUNC    = 2
+STT_SECTION = 3
+STT_FILE    = 4
+
+STB_LOCAL  = 0
+STB_GLOBAL = 1
+STB_WEAK   = 2
+
+ElfSection = collections.namedtuple('ElfSection', ['index', 'name', 'type', 'flags', 'address',
+                                                   'offset', 'size', 'link', 'info', 'alignment', 'entsize'])
+
+ElfSymbol = collections.namedtuple('ElfSymbol', ['name', 'address', 'size', 'type', 'binding',
+                                                 'section_index', 'section_name'])
+
+class ElfFile(object):
+    """
+    Reader of ELF64 files, e.g. the test.o and test.elf files built by
+    the tests, which memory maps the file instead of running objdump/nm.
+
+    Sections and symbols are parsed once, on first access.
+    """
+    elf_header_format = 'HHIQQQIHHHHHH'
+    section_header_format = 'IIQQQQIIQQ'
+    symbol_format = 'IBBHQQ'
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        with open(file_path, 'rb') as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self.data)
+        self._sections = None
+        self._sections_by_name = None
+        self._symbols = None
+        self._symbols_by_name = None
+        try:
+            self.parse_header()
+        except (ElfFormatError, OSError, struct.error, ValueError):
+            self.close()
+            raise
+
+    def close(self):
+        self.view.release()
+        self.data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def parse_header(self):
+        if self.data[0:4] != b'\x7fELF':
+            raise ElfFormatError('{} is not an ELF file'.format(self.file_path))
+        if len(self.data) < 16 + struct.calcsize('<' + self.elf_header_format):
+            raise ElfFormatError('{} has a truncated ELF header'.format(self.file_path))
+        if self.data[4] != 2:
+            raise ElfFormatError('{} is not a 64-bit ELF file'.format(self.file_path))
+        if self.data[5] == 1:
+            self.byte_order = '<'
+        elif self.data[5] == 2:
+            self.byte_order = '>'
+        else:
+            raise ElfFormatError('{} has an invalid data encoding'.format(self.file_path))
+
+        (self.type, self.machine, self.version, self.entry, self.phoff, self.shoff,
+         self.flags, self.ehsize, self.phentsize, self.phnum, self.shentsize,
+         self.shnum, self.shstrndx) = self.unpack(self.elf_header_format, 16)
+
+    def unpack(self, fmt, offset):
+        return struct.unpack_from(self.byte_order + fmt, self.data, offset)
+
+    def string_at(self, string_table, offset):
+        start = string_table.offset + offset
+        end = self.data.find(b'\0', start, string_table.offset + string_table.size)
+        if end < 0:
+            raise ElfFormatError('Unterminated string in {}'.format(self.file_path))
+        return self.data[start:end].decode()
+
+    @property
+    def sections(self):
+        """
+        Returns:
+            A list of ElfSections, in section header order
+        """
+        if self._sections is None:
+            headers = [self.unpack(self.section_header_format, self.shoff + index * self.shentsize)
+                       for index in range(self.shnum)]
+            names_header = headers[self.shstrndx]
+            names = ElfSection(self.shstrndx, '', *names_header[1:])
+            self._sections = [ElfSection(index, self.string_at(names, header[0]), *header[1:])
+                              for index, header in enumerate(headers)]
+        return self._sections
+
+    @property
+    def sections_by_name(self):
+        if self._sections_by_name is None:
+            self._sections_by_name = {section.name : section for section in self.sections}
+        return self._sections_by_name
+
+    def section(self, name):
+        return self.sections_by_name[name]
+
+    def section_data(self, name):
+        """
+        Returns:
+            A memoryview of the contents of the named section, empty for
+            sections which occupy no space in the file, e.g. .bss
+        """
+        section = self.section(name)
+        if section.type == SHT_NOBITS:
+            return self.view[0:0]
+        return self.view[section.offset:section.offset + section.size]
+
+    def section_name_of_index(self, section_index):
+        if section_index == SHN_ABS:
+            return '*ABS*'
+        if section_index == SHN_COMMON:
+            return '*COM*'
+        if section_index == SHN_UNDEF or section_index >= len(self.sections):
+            return '*UND*'
+        return self.sections[section_index].name
+
+    @property
+    def symbols(self):
+        """
+        Returns:
+            A list of ElfSymbols of the .symtab section, or of .dynsym if
+            the file has no .symtab, without the null symbol
+        """
+        if self._symbols is None:
+            symbol_tables = [section for section in self.sections if section.type == SHT_SYMTAB] or \
+                            [section for section in self.sections if section.type == SHT_DYNSYM]
+            self._symbols = []
+            for symbol_table in symbol_tables:
+                string_table = self.sections[symbol_table.link]
+                entry_size = symbol_table.entsize or struct.calcsize(self.symbol_format)
+                for index in range(1, symbol_table.size // entry_size):
+                    name, info, other, section_index, value, size = \
+                        self.unpack(self.symbol_format, symbol_table.offset + index * entry_size)
+                    self._symbols.append(ElfSymbol(self.string_at(string_table, name), value, size,
+                                                   info & 0xf, info >> 4, section_index,
+                                                   self.section_name_of_index(section_index)))
+        return self._symbols
+
+    @property
+    def symbols_by_name(self):
+        """
+        Returns:
+            A dictionary of symbol names to ElfSymbols. If several
+            symbols share a name, global symbols take precedence.
+        """
+        if self._symbols_by_name is None:
+            self._symbols_by_name = {}
+            for symbol in self.symbols:
+                if not symbol.name:
+                    continue
+                existing = self._symbols_by_name.get(symbol.name)
+                if existing is None or existing.binding == STB_LOCAL:
+                    self._symbols_by_name[symbol.name] = symbol
+        return self._symbols_by_name
+
+    def symbol(self, name):
+        return self.symbols_by_name[name]
+
+    def symbol_address(self, name):
+        return self.symbol(name).address
+
+    def read_symbol(self, name, size=None):
+        """
+        Returns:
+            A memoryview of the initial contents of the named symbol in
+            the file, size defaults to the size of the symbol
+        """
+        symbol = self.symbol(name)
+        if size is None:
+            size = symbol.size
+        if symbol.section_index in (SHN_UNDEF, SHN_ABS, SHN_COMMON):
+            raise ElfFormatError('Symbol {} has no contents in the file'.format(name))
+        section = self.sections[symbol.section_index]
+        offset = section.offset + symbol.address - section.address
+        return self.view[offset:offset + size]
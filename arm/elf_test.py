@@ -0,0 +1,119 @@
+#!/usr/bin/python3
+
+"""
+Standard python import statements
+"""
+import unittest
+import tempfile
+import struct
+import os
+
+"""
+Custom python import statements
+"""
+from arm.elf import *
+
+def build_elf(file_path, byte_order='<'):
+    """
+    Write a small linked ELF64 file laid out like the tests' test.elf:
+    .text at 0x0, .data at 0x20, .bss, and a symbol table with local,
+    global and absolute symbols
+    """
+    text = b'\x02\x00\x00\x14' + b'\x00' * 28
+    data = struct.pack(byte_order + 'QQQQ', 0x00020026, 0x77777777, 0, 0)
+    strtab = b'\0_Reset\0Reset_Handler\0output\0lock\0stack_top_cpu0\0'
+    shstrtab = b'\0.text\0.data\0.bss\0.symtab\0.strtab\0.shstrtab\0'
+
+    def name_offset(table, name):
+        return table.index(name.encode() + b'\0')
+
+    symbols = [(0, 0, 0, 0, 0, 0)]
+    symbols.append((name_offset(strtab, 'Reset_Handler'), (STB_LOCAL << 4) | STT_NOTYPE, 0, 1, 0x8, 0))
+    symbols.append((name_offset(strtab, 'output'), (STB_LOCAL << 4) | STT_OBJECT, 0, 2, 0x28, 8))
+    symbols.append((name_offset(strtab, 'lock'), (STB_LOCAL << 4) | STT_OBJECT, 0, 2, 0x38, 8))
+    symbols.append((name_offset(strtab, '_Reset'), (STB_GLOBAL << 4) | STT_FUNC, 0, 1, 0x0, 4))
+    symbols.append((name_offset(strtab, 'stack_top_cpu0'), (STB_GLOBAL << 4) | STT_NOTYPE, 0, SHN_ABS, 0x1040, 0))
+    symtab = b''.join(struct.pack(byte_order + 'IBBHQQ', *symbol) for symbol in symbols)
+
+    contents = [text, data, symtab, strtab, shstrtab]
+    offset = 64
+    offsets = []
+    for content in contents:
+        offsets.append(offset)
+        offset += len(content)
+    shoff = offset
+
+    section_headers = [
+        (0, SHT_NULL, 0, 0, 0, 0, 0, 0, 0, 0),
+        (name_offset(shstrtab, '.text'), SHT_PROGBITS, 6, 0x0, offsets[0], len(text), 0, 0, 4, 0),
+        (name_offset(shstrtab, '.data'), SHT_PROGBITS, 3, 0x20, offsets[1], len(data), 0, 0, 8, 0),
+        (name_offset(shstrtab, '.bss'), SHT_NOBITS, 3, 0x40, offsets[2], 0x100, 0, 0, 8, 0),
+        (name_offset(shstrtab, '.symtab'), SHT_SYMTAB, 0, 0, offsets[2], len(symtab), 5, 4, 8, 24),
+        (name_offset(shstrtab, '.strtab'), SHT_STRTAB, 0, 0, offsets[3], len(strtab), 0, 0, 1, 0),
+        (name_offset(shstrtab, '.shstrtab'), SHT_STRTAB, 0, 0, offsets[4], len(shstrtab), 0, 0, 1, 0),
+    ]
+
+    ident = b'\x7fELF' + bytes([2, 1 if byte_order == '<' else 2, 1]) + b'\0' * 9
+    header = ident + struct.pack(byte_order + 'HHIQQQIHHHHHH', 2, 183, 1, 0x0, 0, shoff, 0,
+                                 64, 0, 0, 64, len(section_headers), 6)
+    with open(file_path, 'wb') as f:
+        f.write(header)
+        for content in contents:
+            f.write(content)
+        for section_header in section_headers:
+            f.write(struct.pack(byte_order + 'IIQQQQIIQQ', *section_header))
+
+class ElfFileTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.elf_file = os.path.join(self.tmp_dir.name, 'test.elf')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def check_elf(self, byte_order):
+        build_elf(self.elf_file, byte_order)
+        with ElfFile(self.elf_file) as elf:
+            self.assertEqual(183, elf.machine)
+            self.assertEqual(0x0, elf.entry)
+            self.assertEqual(['', '.text', '.data', '.bss', '.symtab', '.strtab', '.shstrtab'],
+                             [section.name for section in elf.sections])
+            self.assertEqual(0x20, elf.section('.data').address)
+            self.assertEqual(0x100, elf.section('.bss').size)
+            self.assertEqual(0, len(elf.section_data('.bss')))
+            self.assertEqual(b'\x02\x00\x00\x14', elf.section_data('.text')[0:4].tobytes())
+
+            self.assertEqual(0x0, elf.symbol_address('_Reset'))
+            self.assertEqual(0x8, elf.symbol_address('Reset_Handler'))
+            self.assertEqual(0x28, elf.symbol_address('output'))
+            self.assertEqual(0x38, elf.symbol_address('lock'))
+            self.assertEqual(0x1040, elf.symbol_address('stack_top_cpu0'))
+            self.assertEqual('*ABS*', elf.symbol('stack_top_cpu0').section_name)
+            self.assertEqual('.data', elf.symbol('lock').section_name)
+            self.assertEqual(STB_GLOBAL, elf.symbol('_Reset').binding)
+            self.assertEqual(STT_FUNC, elf.symbol('_Reset').type)
+            self.assertEqual(5, len(elf.symbols))
+
+            data = elf.read_symbol('output')
+            self.assertEqual(struct.pack(byte_order + 'Q', 0x77777777), data.tobytes())
+            data.release()
+            self.assertRaises(ElfFormatError, elf.read_symbol, 'stack_top_cpu0', 8)
+
+    def test_little_endian(self):
+        self.check_elf('<')
+
+    def test_big_endian(self):
+        self.check_elf('>')
+
+    def test_not_elf(self):
+        with open(self.elf_file, 'wb') as f:
+            f.write(b'not an elf file')
+        self.assertRaises(ElfFormatError, ElfFile, self.elf_file)
+
+    def test_truncated_header(self):
+        with open(self.elf_file, 'wb') as f:
+            f.write(b'\x7fELF\x02\x01\x01')
+        self.assertRaises(ElfFormatError, ElfFile, self.elf_file)
+
+if __name__ == '__main__':
+    unittest.main()
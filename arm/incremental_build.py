@@ -0,0 +1,152 @@
+#!/usr/bin/python3
+
+"""
+Standard python import statements
+"""
+import hashlib
+import json
+import os
+import subprocess
+
+def hash_file(file_path):
+    """
+    Returns:
+        The sha256 hex digest of the contents of file_path, or None
+        if the file does not exist
+    """
+    try:
+        with open(file_path, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except FileNotFoundError:
+        return None
+
+class IncrementalBuilder(object):
+    """
+    Make-like runner for toolchain commands.
+
+    A build step records the command, the hashes of its inputs and the
+    hashes of the outputs it produced in a stamp file next to its first
+    output. The step is skipped as long as the command and inputs are
+    unchanged and the outputs still have the recorded contents. The
+    stdout and stderr the step captured are recorded as well and
+    returned again when it is skipped.
+
+    Inspection commands (objdump, nm, ...) don't produce files, their
+    stdout is memoized per hash of the inspected artifact instead.
+    """
+    def __init__(self, inspect_cache_dir, enabled=True, extra_key=None, runner=subprocess.run):
+        """
+        Args:
+            inspect_cache_dir - directory the memoized inspection output is kept in
+            enabled - if False every command is always run
+            extra_key - JSON serializable data every step depends on,
+                        e.g. the toolchain versions
+            runner - function with the signature of subprocess.run
+                     used to run the commands
+        """
+        self.inspect_cache_dir = inspect_cache_dir
+        self.enabled = enabled
+        self.extra_key = extra_key
+        self.runner = runner
+
+    @staticmethod
+    def stamp_file(outputs):
+        return '{}.stamp'.format(outputs[0])
+
+    @staticmethod
+    def captured_streams(kwargs):
+        """
+        Returns:
+            The names of the streams the runner is asked to capture
+        """
+        if kwargs.get('capture_output'):
+            return ['stdout', 'stderr']
+        return [stream for stream in ['stdout', 'stderr'] if kwargs.get(stream) == subprocess.PIPE]
+
+    def up_to_date_stamp(self, command, input_hashes, outputs, streams):
+        """
+        Returns:
+            The stamp of the step if its outputs are up to date and it
+            recorded all of streams, otherwise None
+        """
+        try:
+            with open(self.stamp_file(outputs)) as f:
+                stamp = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if stamp.get('command') != command or \
+                stamp.get('extra_key') != self.extra_key or \
+                stamp.get('inputs') != input_hashes:
+            return None
+
+        if any(stamp.get('streams', {}).get(stream) is None for stream in streams):
+            return None
+
+        if stamp.get('outputs') != {output : hash_file(output) for output in outputs}:
+            return None
+        return stamp
+
+    def run(self, command, inputs, outputs, **kwargs):
+        """
+        Run a build step unless its outputs are up to date
+
+        Args:
+            command - the command line to run
+            inputs - the files the command reads
+            outputs - the files the command writes, must not be in inputs
+            kwargs - passed on to the runner
+
+        Returns:
+            The subprocess.CompletedProcess of the command, or a
+            CompletedProcess with returncode 0 and the recorded output
+            of the captured streams if the step was skipped
+        """
+        input_hashes = {input_file : hash_file(input_file) for input_file in inputs}
+        streams = self.captured_streams(kwargs)
+        stamp = self.up_to_date_stamp(command, input_hashes, outputs, streams) if self.enabled else None
+        if stamp is not None:
+            return subprocess.CompletedProcess(command, 0, **{stream : bytes.fromhex(stamp['streams'][stream])
+                                                              for stream in streams})
+
+        stamp_file = self.stamp_file(outputs)
+        if os.path.exists(stamp_file):
+            os.remove(stamp_file)
+
+        completed_process = self.runner(command, **kwargs)
+        output_hashes = {output : hash_file(output) for output in outputs}
+        if completed_process.returncode == 0 and None not in output_hashes.values():
+            #Only bytes are recorded, text mode output is captured again
+            recorded_streams = {stream : getattr(completed_process, stream).hex() for stream in streams
+                                if isinstance(getattr(completed_process, stream), bytes)}
+            with open(stamp_file, 'w') as f:
+                json.dump({'command' : command,
+                           'extra_key' : self.extra_key,
+                           'inputs' : input_hashes,
+                           'outputs' : output_hashes,
+                           'streams' : recorded_streams}, f)
+        return completed_process
+
+    def inspect(self, command, artifact):
+        """
+        Run a command which inspects artifact, memoizing its stdout
+
+        Returns:
+            A subprocess.CompletedProcess whose stdout holds the bytes
+            written by the command
+        """
+        key = hashlib.sha256(json.dumps([command, self.extra_key, hash_file(artifact)]).encode()).hexdigest()
+        memo_file = os.path.join(self.inspect_cache_dir, '{}.out'.format(key))
+        if self.enabled and os.path.exists(memo_file):
+            with open(memo_file, 'rb') as f:
+                return subprocess.CompletedProcess(command, 0, stdout=f.read())
+
+        completed_process = self.runner(command, stdout=subprocess.PIPE)
+        if self.enabled and completed_process.returncode == 0:
+            if not os.path.exists(self.inspect_cache_dir):
+                os.makedirs(self.inspect_cache_dir, exist_ok=True)
+            tmp_file = '{}.{}.tmp'.format(memo_file, os.getpid())
+            with open(tmp_file, 'wb') as f:
+                f.write(completed_process.stdout)
+            os.replace(tmp_file, memo_file)
+        return completed_process
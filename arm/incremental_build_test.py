@@ -0,0 +1,119 @@
+#!/usr/bin/python3
+
+"""
+Standard python import statements
+"""
+import unittest
+import tempfile
+import sys
+import os
+import subprocess
+
+"""
+Custom python import statements
+"""
+from arm.incremental_build import *
+
+class IncrementalBuilderTest(unittest.TestCase):
+    """
+    Uses a small python program as the "tool", which copies its input
+    to its output and appends a line to a log file every time it runs.
+    """
+    copy_program = ('import sys\n'
+                    'open(sys.argv[3], "a").write("run\\n")\n'
+                    'open(sys.argv[2], "wb").write(open(sys.argv[1], "rb").read())\n'
+                    'sys.stdout.write("copied")\n')
+
+    inspect_program = ('import sys\n'
+                       'open(sys.argv[2], "a").write("run\\n")\n'
+                       'sys.stdout.write(str(len(open(sys.argv[1], "rb").read())))\n')
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.input_file = self.tmp_path('input.txt')
+        self.output_file = self.tmp_path('output.txt')
+        self.log_file = self.tmp_path('log.txt')
+        self.write(self.input_file, b'abc')
+        self.builder = IncrementalBuilder(self.tmp_path('inspect'), extra_key={'tool' : '1.0'})
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def tmp_path(self, name):
+        return os.path.join(self.tmp_dir.name, name)
+
+    def write(self, file_path, data):
+        with open(file_path, 'wb') as f:
+            f.write(data)
+
+    def run_count(self):
+        if not os.path.exists(self.log_file):
+            return 0
+        with open(self.log_file) as f:
+            return len(f.readlines())
+
+    def build(self, **kwargs):
+        command = [sys.executable, '-c', self.copy_program, self.input_file, self.output_file, self.log_file]
+        return self.builder.run(command, inputs=[self.input_file], outputs=[self.output_file], **kwargs)
+
+    def inspect(self):
+        command = [sys.executable, '-c', self.inspect_program, self.output_file, self.log_file]
+        return self.builder.inspect(command, self.output_file)
+
+    def test_unchanged_inputs_skip_step(self):
+        self.assertEqual(0, self.build().returncode)
+        self.assertEqual(0, self.build().returncode)
+        self.assertEqual(1, self.run_count())
+
+    def test_skipped_step_replays_output(self):
+        self.assertEqual(b'copied', self.build(stdout=subprocess.PIPE).stdout)
+        completed_process = self.build(stdout=subprocess.PIPE)
+        self.assertEqual((b'copied', None), (completed_process.stdout, completed_process.stderr))
+        self.assertEqual(1, self.run_count())
+
+        #Output which was not captured can't be replayed
+        completed_process = self.build(stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        self.assertEqual((b'copied', b''), (completed_process.stdout, completed_process.stderr))
+        self.assertEqual(2, self.run_count())
+        self.assertEqual(b'', self.build(capture_output=True).stderr)
+        self.assertEqual(2, self.run_count())
+
+    def test_changed_input_reruns_step(self):
+        self.build()
+        self.write(self.input_file, b'abcd')
+        self.build()
+        self.assertEqual(2, self.run_count())
+
+    def test_modified_output_reruns_step(self):
+        self.build()
+        self.write(self.output_file, b'modified')
+        self.build()
+        self.assertEqual(2, self.run_count())
+        with open(self.output_file, 'rb') as f:
+            self.assertEqual(b'abc', f.read())
+
+    def test_changed_extra_key_reruns_step(self):
+        self.build()
+        self.builder.extra_key = {'tool' : '2.0'}
+        self.build()
+        self.assertEqual(2, self.run_count())
+
+    def test_disabled_always_runs(self):
+        self.builder.enabled = False
+        self.build()
+        self.build()
+        self.assertEqual(2, self.run_count())
+
+    def test_inspect_memoized_per_artifact(self):
+        self.build()
+        self.assertEqual(b'3', self.inspect().stdout)
+        self.assertEqual(b'3', self.inspect().stdout)
+        self.assertEqual(2, self.run_count())
+
+        self.write(self.input_file, b'abcdef')
+        self.build()
+        self.assertEqual(b'6', self.inspect().stdout)
+        self.assertEqual(4, self.run_count())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,193 @@
+#!/usr/bin/python3
+
+"""
+Standard python import statements
+"""
+import collections
+import itertools
+import json
+import os
+import shutil
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+
+class QMPError(Exception):
+    pass
+
+class QMPClient(object):
+    """
+    Minimal client of the QEMU Machine Protocol
+    """
+    def __init__(self, sock):
+        self.sock = sock
+        self.reader = sock.makefile('rb')
+        greeting = self.read_message()
+        if 'QMP' not in greeting:
+            raise QMPError('Unexpected QMP greeting {}'.format(greeting))
+        self.execute('qmp_capabilities')
+
+    @classmethod
+    def connect(cls, socket_path, process=None, timeout=10):
+        """
+        Connect to the QMP unix socket at socket_path, waiting for
+        qemu to create it
+
+        Raises:
+            QMPError: if process exits or timeout seconds pass before
+            the socket accepts connections
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                sock.connect(socket_path)
+                return cls(sock)
+            except (FileNotFoundError, ConnectionRefusedError):
+                sock.close()
+                if process is not None and process.poll() is not None:
+                    raise QMPError('qemu exited with {} before QMP was available'.format(process.returncode))
+                if time.monotonic() > deadline:
+                    raise QMPError('Timed out connecting to {}'.format(socket_path))
+                time.sleep(0.005)
+
+    def read_message(self):
+        line = self.reader.readline()
+        if not line:
+            raise QMPError('QMP connection closed')
+        return json.loads(line.decode())
+
+    def execute(self, command, arguments=None):
+        """
+        Execute a QMP command, skipping any asynchronous events
+
+        Returns:
+            The 'return' member of the response
+
+        Raises:
+            QMPError: if qemu reports an error
+        """
+        request = {'execute' : command}
+        if arguments:
+            request['arguments'] = arguments
+        self.sock.sendall(json.dumps(request).encode() + b'\n')
+        while True:
+            response = self.read_message()
+            if 'event' in response:
+                continue
+            if 'error' in response:
+                raise QMPError(response['error'])
+            return response['return']
+
+    def close(self):
+        self.reader.close()
+        self.sock.close()
+
+class WarmQemuInstance(object):
+    """
+    A qemu process which has initialized the machine and loaded the
+    kernel, but is paused (-S) before executing the first instruction.
+
+    Semihosting SYS_EXIT terminates the qemu process itself, so an
+    instance can only run a guest once; the pool replaces it afterwards.
+    """
+    def __init__(self, command, socket_path):
+        self.command = command
+        self.socket_path = socket_path
+        self.process = subprocess.Popen(command + ['-S', '-qmp', 'unix:{},server=on,wait=off'.format(socket_path)],
+                                        stdin=subprocess.PIPE,
+                                        stdout=subprocess.PIPE,
+                                        stderr=subprocess.PIPE)
+
+    def run(self, input=None, timeout=None):
+        """
+        Resume the guest and wait for qemu to exit
+
+        Returns:
+            A subprocess.CompletedProcess, as subprocess.run would
+            have returned for the same command
+
+        Raises:
+            subprocess.TimeoutExpired: if qemu runs for longer than
+            timeout seconds, holding the output captured until then
+        """
+        try:
+            qmp = QMPClient.connect(self.socket_path, self.process)
+        except QMPError:
+            self.kill()
+            raise
+        try:
+            qmp.execute('cont')
+        finally:
+            qmp.close()
+        try:
+            stdout, stderr = self.process.communicate(input, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            stdout, stderr = self.kill()
+            raise subprocess.TimeoutExpired(self.command, timeout, output=stdout, stderr=stderr)
+        return subprocess.CompletedProcess(self.command, self.process.returncode, stdout, stderr)
+
+    def kill(self):
+        """
+        Returns:
+            The output qemu wrote until it was killed
+        """
+        if self.process.poll() is None:
+            self.process.kill()
+        return self.process.communicate()
+
+class QemuPool(object):
+    """
+    Pool of warm qemu instances which all boot the same command line.
+
+    Every run takes a paused instance which has already gone through
+    process startup and machine initialization, and immediately starts
+    a replacement so that it boots while the guest is running.
+
+    run may be called from several threads at once.
+    """
+    def __init__(self, command, size=2):
+        self.command = command
+        self.size = size
+        self.socket_dir = tempfile.mkdtemp(prefix='qemu-pool-')
+        self.socket_ids = itertools.count()
+        self.instances = collections.deque()
+        self.lock = threading.Lock()
+        self.fill()
+
+    def start_instance(self):
+        socket_path = os.path.join(self.socket_dir, '{}.sock'.format(next(self.socket_ids)))
+        return WarmQemuInstance(self.command, socket_path)
+
+    def fill(self):
+        while len(self.instances) < self.size:
+            self.instances.append(self.start_instance())
+
+    def run(self, input=None, timeout=None):
+        """
+        Run the guest once on a warm instance
+
+        Returns:
+            A subprocess.CompletedProcess
+        """
+        with self.lock:
+            if self.instances:
+                instance = self.instances.popleft()
+            else:
+                instance = self.start_instance()
+            self.fill()
+        return instance.run(input=input, timeout=timeout)
+
+    def close(self):
+        with self.lock:
+            while self.instances:
+                self.instances.popleft().kill()
+        shutil.rmtree(self.socket_dir, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,74 @@
+#!/usr/bin/python3
+
+"""
+Standard python import statements
+"""
+import unittest
+import subprocess
+import sys
+
+"""
+Custom python import statements
+"""
+from arm.qemu_pool import *
+
+"""
+Stand-in for qemu-system-aarch64. Serves QMP on the socket given with
+-qmp and, once resumed with 'cont', writes its stdin and the hex bytes
+given as its second argument to stderr, then exits with the code given
+as its first argument.
+"""
+fake_qemu_program = '''
+import json, os, socket, sys
+exit_code = int(sys.argv[1], 0)
+stderr_bytes = bytes.fromhex(sys.argv[2])
+socket_path = sys.argv[sys.argv.index('-qmp') + 1].split(',')[0][len('unix:'):]
+server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+server.bind(socket_path)
+server.listen(1)
+connection, _ = server.accept()
+reader = connection.makefile('rb')
+connection.sendall(b'{"QMP": {"version": {}, "capabilities": []}}\\n')
+for line in reader:
+    command = json.loads(line)['execute']
+    if command == 'cont':
+        connection.sendall(b'{"event": "RESUME"}\\n')
+    connection.sendall(b'{"return": {}}\\n')
+    if command == 'cont':
+        break
+sys.stderr.buffer.write(sys.stdin.buffer.read() + stderr_bytes)
+os.remove(socket_path)
+sys.exit(exit_code)
+'''
+
+class QemuPoolTest(unittest.TestCase):
+    def fake_qemu_command(self, exit_code, stderr_hex):
+        return [sys.executable, '-c', fake_qemu_program, exit_code, stderr_hex]
+
+    def test_run_returns_completed_process(self):
+        command = self.fake_qemu_command('0x77', '04000000')
+        with QemuPool(command, size=1) as pool:
+            completed_process = pool.run(timeout=10)
+        self.assertEqual(command, completed_process.args)
+        self.assertEqual(0x77, completed_process.returncode)
+        self.assertEqual(b'\x04\x00\x00\x00', completed_process.stderr)
+
+    def test_repeated_runs(self):
+        with QemuPool(self.fake_qemu_command('3', 'ab'), size=2) as pool:
+            for i in range(0, 5):
+                completed_process = pool.run(timeout=10)
+                self.assertEqual(3, completed_process.returncode)
+                self.assertEqual(b'\xab', completed_process.stderr)
+            self.assertEqual(2, len(pool.instances))
+
+    def test_run_with_input(self):
+        with QemuPool(self.fake_qemu_command('0', ''), size=1) as pool:
+            completed_process = pool.run(input=b'\x77', timeout=10)
+        self.assertEqual(b'\x77', completed_process.stderr)
+
+    def test_exit_before_qmp(self):
+        with QemuPool([sys.executable, '-c', 'import sys; sys.exit(1)'], size=1) as pool:
+            self.assertRaises(QMPError, pool.run, timeout=10)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -10,6 +10,17 @@ import textwrap
 import subprocess
 import os
 import struct
+import collections
+import functools
+import csv
+import io
+import json
+import types
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 class RegisterFieldOutOfBoundError(Exception):
     pass
@@ -18,10 +29,13 @@ class RegisterField(object):
     """
     Class that represents a register field
     """
+    __slots__ = ('name', 'width', 'shift', 'mask', 'value', 'name_value_dict', 'conversion_function')
+
     def __init__(self, name, width, shift, value, name_value_dict, conversion_function=None):
         self.name = name
         self.width = width
         self.shift = shift
+        self.mask = (1 << width) - 1
         self.value = value
         self.name_value_dict = name_value_dict
         self.conversion_function = conversion_function
@@ -34,7 +48,7 @@ class RegisterField(object):
             RegisterFieldOutOfBoundError: if the value is larger than
             the width of the register field
         """
-        if value > (pow(2, self.width) - 1):
+        if value > self.mask:
             raise RegisterFieldOutOfBoundError
 
         self.value = value
@@ -79,10 +93,242 @@ class RegisterField(object):
         print(self.name, self.value, self.get_value_name())
 
 
+class RegisterFieldSchema(collections.namedtuple('RegisterFieldSchema', ['name', 'width', 'shift', 'mask',
+                                                                         'name_value_dict', 'conversion_function'])):
+    """
+    Immutable description of a register field, shared by all registers
+    of a SchemaRegister class
+    """
+    __slots__ = ()
+
+    @classmethod
+    def create(cls, name, width, shift, name_value_dict=None, conversion_function=None):
+        return cls(name, width, shift, (1 << width) - 1, name_value_dict or {}, conversion_function)
+
+    def decode(self, register_value):
+        """
+        Returns:
+            The raw value of the field in register_value
+        """
+        return (register_value >> self.shift) & self.mask
+
+    def encode(self, field_value):
+        """
+        Returns:
+            field_value shifted into place
+
+        Raises:
+            RegisterFieldOutOfBoundError: if field_value is larger than
+            the width of the field
+        """
+        if field_value > self.mask or field_value < 0:
+            raise RegisterFieldOutOfBoundError
+        return field_value << self.shift
+
+    def convert(self, field_value):
+        """
+        Returns:
+            field_value modified by the conversion function, if any
+        """
+        if self.conversion_function:
+            return self.conversion_function(field_value)
+        return field_value
+
+    def get_value_name(self, field_value):
+        """
+        Returns:
+            A string which describes field_value, False if the field
+            has no value names
+        """
+        if not self.name_value_dict:
+            return False
+        return self.name_value_dict[field_value]
+
+DecodedField = collections.namedtuple('DecodedField', ['key', 'name', 'raw_value', 'value', 'value_name'])
+
+class DecodedRegister(collections.namedtuple('DecodedRegister', ['register_class', 'value', 'fields'])):
+    """
+    Immutable and hashable snapshot of a decoded register value, e.g.
+    to group or deduplicate decoded trace entries. fields is a tuple of
+    DecodedFields in schema order, holding the field name, the raw field
+    value, the converted value and the value name, None for values
+    without a name.
+    """
+    __slots__ = ()
+
+    def field(self, key):
+        for decoded_field in self.fields:
+            if decoded_field.key == key:
+                return decoded_field
+        raise KeyError(key)
+
+    def as_dict(self):
+        """
+        Returns:
+            An OrderedDict of field keys to converted values
+        """
+        return collections.OrderedDict((decoded_field.key, decoded_field.value) for decoded_field in self.fields)
+
+class RegisterSchema(object):
+    """
+    Immutable layout of a register, a read-only mapping of field keys
+    to RegisterFieldSchemas in definition order
+    """
+    __slots__ = ('fields', 'name_tables')
+
+    def __init__(self, fields):
+        """
+        Args:
+            fields - a dictionary of strings to RegisterFieldSchemas
+        """
+        self.fields = types.MappingProxyType(collections.OrderedDict(fields))
+        self.name_tables = {}
+
+    def __reduce__(self):
+        return (RegisterSchema, (collections.OrderedDict(self.fields),))
+
+    def decode(self, register_value):
+        """
+        Returns:
+            A tuple of DecodedFields of register_value, in schema order
+        """
+        decoded_fields = []
+        for field, field_schema in self.fields.items():
+            raw_value = field_schema.decode(register_value)
+            decoded_fields.append(DecodedField(field, field_schema.name, raw_value, field_schema.convert(raw_value),
+                                               field_schema.name_value_dict.get(raw_value)))
+        return tuple(decoded_fields)
+
+    def name_table(self, field):
+        """
+        Returns:
+            A numpy object array, indexed by the raw value of field, of
+            the names of its values, None for values without a name.
+            Built once per field.
+        """
+        table = self.name_tables.get(field)
+        if table is None:
+            field_schema = self.fields[field]
+            table = numpy.full(field_schema.mask + 1, None, dtype=object)
+            for field_value, name in field_schema.name_value_dict.items():
+                table[field_value] = name
+            self.name_tables[field] = table
+        return table
+
+    def decode_array(self, values, dtype='<u8'):
+        """
+        Decode many register values at once
+
+        Args:
+            values - a numpy array of register values, or any buffer of
+                     register values of type dtype
+
+        Returns:
+            A numpy structured array with one column per field, holding
+            the field values after conversion. Conversion functions are
+            called once per field with the whole column, so they must
+            accept numpy arrays.
+        """
+        values = self.as_value_array(values, dtype)
+        columns = []
+        for field, field_schema in self.fields.items():
+            column = (values >> numpy.uint64(field_schema.shift)) & numpy.uint64(field_schema.mask)
+            if field_schema.width < 64:
+                column = column.astype(numpy.int64)
+            columns.append((field, numpy.asarray(field_schema.convert(column))))
+
+        decoded = numpy.empty(len(values), dtype=[(field, column.dtype) for field, column in columns])
+        for field, column in columns:
+            decoded[field] = column
+        return decoded
+
+    def decode_array_names(self, values, dtype='<u8'):
+        """
+        Returns:
+            A numpy structured array with one object column per field
+            which has value names, holding the names of the raw field
+            values of values, None for values without a name
+        """
+        values = self.as_value_array(values, dtype)
+        fields = [field for field, field_schema in self.fields.items() if field_schema.name_value_dict]
+        decoded = numpy.empty(len(values), dtype=[(field, object) for field in fields])
+        for field in fields:
+            field_schema = self.fields[field]
+            column = (values >> numpy.uint64(field_schema.shift)) & numpy.uint64(field_schema.mask)
+            decoded[field] = self.name_table(field)[column]
+        return decoded
+
+    def pack(self, field_values):
+        """
+        Args:
+            field_values - a dictionary of field keys to raw field
+                           values, fields which aren't given are 0
+
+        Returns:
+            The register value holding field_values
+
+        Raises:
+            RegisterFieldOutOfBoundError: if a value is larger than the
+            width of its field
+        """
+        register_value = 0
+        for field, field_value in field_values.items():
+            register_value |= self.fields[field].encode(field_value)
+        return register_value
+
+    def encode_array(self, columns):
+        """
+        Pack many register values at once, the inverse of decode_array
+        without conversion functions
+
+        Args:
+            columns - a dictionary of field keys to equally long numpy
+                      arrays or sequences of raw field values, fields
+                      which aren't given are 0
+
+        Returns:
+            A numpy uint64 array of the packed register values
+
+        Raises:
+            RegisterFieldOutOfBoundError: if a value is larger than the
+            width of its field
+        """
+        if numpy is None:
+            raise ImportError('Encoding arrays of register values requires numpy')
+        register_values = None
+        for field, column in columns.items():
+            field_schema = self.fields[field]
+            column = numpy.asarray(column)
+            if len(column) and (column.min() < 0 or column.max() > field_schema.mask):
+                raise RegisterFieldOutOfBoundError('Value of {} out of bounds'.format(field))
+            column = column.astype(numpy.uint64) << numpy.uint64(field_schema.shift)
+            if register_values is None:
+                register_values = column
+            else:
+                register_values |= column
+        if register_values is None:
+            return numpy.zeros(0, dtype=numpy.uint64)
+        return register_values
+
+    @staticmethod
+    def as_value_array(values, dtype):
+        if numpy is None:
+            raise ImportError('Decoding arrays of register values requires numpy')
+        if isinstance(values, numpy.ndarray):
+            return values.astype(numpy.uint64, copy=False)
+        try:
+            buffer = memoryview(values)
+        except TypeError:
+            #Not a buffer, e.g. a list of ints
+            return numpy.asarray(values, dtype=numpy.uint64)
+        return numpy.frombuffer(buffer, dtype=dtype).astype(numpy.uint64, copy=False)
+
 class Register(object):
     """
     Class that represents a Register
     """
+    __slots__ = ('fields', 'decoders')
+
     def __init__(self, fields):
         """
         Initialize an instance of the Register class
@@ -95,14 +341,35 @@ class Register(object):
             }
         """
         self.fields = fields
+        self.decoders = [(fields[field], shift, mask) for field, shift, mask in self.compile_layout(fields)]
+
+    @staticmethod
+    def compile_layout(fields):
+        """
+        Returns:
+            A tuple of (field, shift, mask) tuples, one per field of
+            fields, from which set_value decodes a register value
+        """
+        return tuple((field, fields[field].shift, fields[field].mask) for field in fields)
 
     def set_value(self, register_value):
-        for field in self.fields:
-            shift = self.fields[field].shift
-            width = self.fields[field].width
-            mask = pow(2, width) - 1
-            field_value = (register_value & (mask << shift)) >> shift
-            self.fields[field].set_value(field_value)
+        """
+        Decode register_value into all fields in a single pass. The
+        field values are masked to their width, so they can't be out of
+        bounds.
+        """
+        for field, shift, mask in self.decoders:
+            field.value = (register_value >> shift) & mask
+
+    def get_value(self):
+        """
+        Returns:
+            The register value holding the values of all fields
+        """
+        register_value = 0
+        for field, shift, mask in self.decoders:
+            register_value |= (field.value & mask) << shift
+        return register_value
 
     def set_field(self, field, field_value):
         self.fields[field].set_value(field_value)
@@ -116,6 +383,317 @@ class Register(object):
     def get_field_value_name(self, field):
         return self.fields[field].get_value_name()
 
+    def snapshot(self):
+        """
+        Returns:
+            A DecodedRegister of the current field values
+        """
+        return DecodedRegister(type(self), self.get_value(),
+                               tuple(DecodedField(field, self.fields[field].name, self.fields[field].value,
+                                                  self.fields[field].get_value(),
+                                                  (self.fields[field].name_value_dict or {}).get(self.fields[field].value))
+                                     for field in self.fields))
+
     def print(self):
-        for field in self.fields:
-            self.fields[field].print()
+        RegisterRenderer(sys.stdout).render(self)
+
+class SchemaRegister(Register):
+    """
+    Register whose layout is defined once per class, as the class level
+    schema, e.g.:
+
+        class MY_REG(SchemaRegister):
+            __slots__ = ()
+            schema = RegisterSchema({
+                'field1' : RegisterFieldSchema.create(...),
+            })
+
+    Instances only hold the raw value of the register and decode fields
+    on access, so creating one over a captured value is a single small
+    allocation.
+    """
+    __slots__ = ('value',)
+    schema = None
+
+    def __init__(self, value=0):
+        self.value = value
+
+    @classmethod
+    def decode_array(cls, values, dtype='<u8'):
+        """
+        See RegisterSchema.decode_array, requires numpy
+        """
+        return cls.schema.decode_array(values, dtype)
+
+    @classmethod
+    def decode_array_names(cls, values, dtype='<u8'):
+        """
+        See RegisterSchema.decode_array_names, requires numpy
+        """
+        return cls.schema.decode_array_names(values, dtype)
+
+    @classmethod
+    def pack(cls, **field_values):
+        """
+        Returns:
+            The register value holding field_values, e.g.
+            SCTLR_EL1.pack(M=1, C=1, I=1)
+
+        Raises:
+            RegisterFieldOutOfBoundError: if a value is larger than the
+            width of its field
+        """
+        return cls.schema.pack(field_values)
+
+    @classmethod
+    def encode_array(cls, columns):
+        """
+        See RegisterSchema.encode_array, requires numpy
+        """
+        return cls.schema.encode_array(columns)
+
+    @property
+    def fields(self):
+        """
+        Returns:
+            A dictionary of new RegisterFields holding the current field
+            values, like the fields of a Register. Changing them doesn't
+            change the register, see set_field.
+        """
+        return {field : RegisterField(name=field_schema.name,
+                                      width=field_schema.width,
+                                      shift=field_schema.shift,
+                                      value=field_schema.decode(self.value),
+                                      name_value_dict=field_schema.name_value_dict,
+                                      conversion_function=field_schema.conversion_function)
+                for field, field_schema in self.schema.fields.items()}
+
+    def set_value(self, register_value):
+        self.value = register_value
+
+    def get_value(self):
+        return self.value
+
+    def snapshot(self, cache=None):
+        """
+        Args:
+            cache - an optional RegisterDecodeCache, to skip decoding
+                    values which were decoded before
+
+        Returns:
+            A DecodedRegister of the current value
+        """
+        if cache is not None:
+            return cache.decode(type(self), self.value)
+        return DecodedRegister(type(self), self.value, self.schema.decode(self.value))
+
+    def set_field(self, field, field_value):
+        """
+        Raises:
+            RegisterFieldOutOfBoundError: if field_value is larger than
+            the width of the field
+        """
+        field_schema = self.schema.fields[field]
+        self.value = (self.value & ~(field_schema.mask << field_schema.shift)) | field_schema.encode(field_value)
+
+    def get_field(self, field):
+        field_schema = self.schema.fields[field]
+        return field_schema.convert(field_schema.decode(self.value))
+
+    def get_field_name(self, field):
+        return self.schema.fields[field].name
+
+    def get_field_value_name(self, field):
+        field_schema = self.schema.fields[field]
+        return field_schema.get_value_name(field_schema.decode(self.value))
+
+class RegisterDecodeCache(object):
+    """
+    Opt-in LRU cache of DecodedRegisters keyed on (register class, raw
+    value), for traces in which the same values recur, e.g. because the
+    same hardware configuration is read on every boot.
+
+    Usage:
+        cache = RegisterDecodeCache(maxsize=1024)
+        snapshot = cache.decode(CLIDR_EL1, 0x0a200023)
+        print(cache.cache_info())
+    """
+    def __init__(self, maxsize=4096):
+        self.decode = functools.lru_cache(maxsize=maxsize)(self.decode_uncached)
+
+    @staticmethod
+    def decode_uncached(register_class, register_value):
+        return DecodedRegister(register_class, register_value, register_class.schema.decode(register_value))
+
+    def cache_info(self):
+        """
+        Returns:
+            The hits, misses, maxsize and currsize of the cache, as
+            functools.lru_cache reports them
+        """
+        return self.decode.cache_info()
+
+    def hit_rate(self):
+        cache_info = self.cache_info()
+        lookups = cache_info.hits + cache_info.misses
+        return cache_info.hits / lookups if lookups else 0.0
+
+    def clear(self):
+        self.decode.cache_clear()
+
+class RegisterRenderer(object):
+    """
+    Formats many registers into one buffer, which is written to a file
+    object in large chunks instead of printing each field.
+
+    Formats:
+        text  - a line per register and a "name raw_value value_name"
+                line per field, as Register.print prints them
+        csv   - a row per field, with the label, register class and
+                register value of the field
+        jsonl - a JSON object per register
+
+    Usage:
+        with RegisterRenderer(f, 'csv', cache=RegisterDecodeCache()) as renderer:
+            for label, register in registers:
+                renderer.write(register, label)
+
+    The formatted fields are memoized per DecodedRegister, so values
+    which recur are formatted once.
+    """
+    formats = ('text', 'csv', 'jsonl')
+    csv_header = ['label', 'register', 'value', 'field', 'name', 'raw_value', 'converted_value', 'value_name']
+
+    def __init__(self, file, format='text', buffer_size=1 << 20, cache=None):
+        """
+        Args:
+            file - a text file object
+            buffer_size - number of characters to buffer before writing
+            cache - an optional RegisterDecodeCache for SchemaRegisters
+        """
+        if format not in self.formats:
+            raise ValueError('Unknown format {}'.format(format))
+        self.file = file
+        self.format = format
+        self.buffer_size = buffer_size
+        self.cache = cache
+        self.parts = []
+        self.buffered = 0
+        self.format_fields = functools.lru_cache(maxsize=4096)(getattr(self, 'format_{}_fields'.format(format)))
+        if format == 'csv':
+            self.append(self.csv_row(self.csv_header))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.flush()
+
+    def snapshot(self, register):
+        if isinstance(register, DecodedRegister):
+            return register
+        if self.cache is not None and isinstance(register, SchemaRegister):
+            return register.snapshot(self.cache)
+        return register.snapshot()
+
+    def append(self, text):
+        self.parts.append(text)
+        self.buffered += len(text)
+        if self.buffered >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if self.parts:
+            self.file.write(''.join(self.parts))
+            self.parts = []
+            self.buffered = 0
+        self.file.flush()
+
+    def write(self, register, label=None):
+        """
+        Args:
+            register - a Register or DecodedRegister
+            label - e.g. the run or core the register was captured on,
+                    defaults to the register class name
+        """
+        snapshot = self.snapshot(register)
+        register_name = snapshot.register_class.__name__
+        label = register_name if label is None else label
+        if self.format == 'text':
+            self.append('{} {} {:#x}\n'.format(label, register_name, snapshot.value))
+            self.append(self.format_fields(snapshot))
+        elif self.format == 'csv':
+            prefix = self.csv_row([label])[:-2] + ','
+            self.append(''.join(prefix + row for row in self.format_fields(snapshot)))
+        else:
+            self.append('{{"label": {}, {}\n'.format(json.dumps(label), self.format_fields(snapshot)))
+
+    def render(self, register):
+        """
+        Write a single register and flush. In text format only the
+        field lines are written, as Register.print prints them.
+        """
+        if self.format == 'text':
+            self.append(self.format_fields(self.snapshot(register)))
+        else:
+            self.write(register)
+        self.flush()
+
+    @staticmethod
+    def csv_row(values):
+        row = io.StringIO()
+        csv.writer(row, lineterminator='\r\n').writerow(values)
+        return row.getvalue()
+
+    @staticmethod
+    def format_text_fields(snapshot):
+        return ''.join('{} {} {}\n'.format(field.name, field.raw_value,
+                                            False if field.value_name is None else field.value_name)
+                       for field in snapshot.fields)
+
+    def format_csv_fields(self, snapshot):
+        register_name = snapshot.register_class.__name__
+        return tuple(self.csv_row([register_name, '{:#x}'.format(snapshot.value), field.key, field.name,
+                                   field.raw_value, field.value, field.value_name])
+                     for field in snapshot.fields)
+
+    @staticmethod
+    def format_jsonl_fields(snapshot):
+        return '"register": {}, "value": {}, "fields": {}}}'.format(
+            json.dumps(snapshot.register_class.__name__), snapshot.value,
+            json.dumps(collections.OrderedDict((field.key, {'raw_value' : field.raw_value,
+                                                             'value' : field.value,
+                                                             'value_name' : field.value_name})
+                                               for field in snapshot.fields)))
+
+def render_compare_table(registers, labels=None):
+    """
+    Format registers of the same class side by side, one row per field
+    and one column-aligned column per register, marking rows in which
+    the registers differ with '*'
+
+    Args:
+        registers - a list of Registers or DecodedRegisters
+        labels - the column headers, default to the register values
+
+    Returns:
+        The table as a string
+    """
+    snapshots = [register if isinstance(register, DecodedRegister) else register.snapshot()
+                 for register in registers]
+    if labels is None:
+        labels = ['{:#x}'.format(snapshot.value) for snapshot in snapshots]
+
+    def cell(field):
+        if field.value_name is None:
+            return str(field.value)
+        return '{} ({})'.format(field.value, field.value_name)
+
+    rows = [[''] + list(labels)]
+    for fields in zip(*[snapshot.fields for snapshot in snapshots]):
+        marker = '*' if len(set(field.raw_value for field in fields)) > 1 else ' '
+        rows.append(['{} {}'.format(marker, fields[0].key)] + [cell(field) for field in fields])
+
+    widths = [max(len(row[column]) for row in rows) for column in range(len(rows[0]))]
+    return ''.join('  '.join(value.ljust(width) for value, width in zip(row, widths)).rstrip() + '\n'
+                   for row in rows)
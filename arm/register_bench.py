@@ -0,0 +1,131 @@
+#!/usr/bin/python3
+
+"""
+Standard python import statements
+"""
+import argparse
+import contextlib
+import io
+import random
+import timeit
+
+"""
+Custom python import statements
+"""
+from arm.register import *
+from arm.arm_register import *
+
+def reference_register(register_class):
+    """
+    Returns:
+        A dictionary of new RegisterFields of register_class, as its
+        constructor built it before the layout was a class level schema,
+        kept as the baseline of the benchmark
+    """
+    return {field : RegisterField(name=field_schema.name,
+                                  width=field_schema.width,
+                                  shift=field_schema.shift,
+                                  value=0,
+                                  name_value_dict=dict(field_schema.name_value_dict),
+                                  conversion_function=field_schema.conversion_function)
+            for field, field_schema in register_class.schema.fields.items()}
+
+def reference_set_value(fields, register_value):
+    """
+    Register.set_value as it was before the field layout was compiled,
+    kept as the baseline of the benchmark
+    """
+    for field in fields:
+        shift = fields[field].shift
+        width = fields[field].width
+        mask = pow(2, width) - 1
+        field_value = (register_value & (mask << shift)) >> shift
+        fields[field].set_value(field_value)
+
+def bench_register(register_class, values, repeat):
+    """
+    Time creating a register over each value and decoding all its
+    fields: with the reference decoder, with the generic Register,
+    which decodes through its compiled (field, shift, mask) layout,
+    and with the SchemaRegister subclass
+
+    Returns:
+        A (reference, register, schema) tuple of the best time per
+        value in seconds
+    """
+    field_keys = list(register_class.schema.fields)
+
+    def reference():
+        for value in values:
+            fields = reference_register(register_class)
+            reference_set_value(fields, value)
+            for field in field_keys:
+                fields[field].get_value()
+
+    def register():
+        for value in values:
+            register = Register(reference_register(register_class))
+            register.set_value(value)
+            for field in field_keys:
+                register.get_field(field)
+
+    def schema():
+        for value in values:
+            register = register_class(value)
+            for field in field_keys:
+                register.get_field(field)
+
+    return tuple(min(timeit.repeat(function, number=1, repeat=repeat)) / len(values)
+                 for function in [reference, register, schema])
+
+def bench_render(register_class, values, repeat):
+    """
+    Time writing the fields of a register over each value as text, by
+    printing each field as Register.print did, and with a
+    RegisterRenderer
+
+    Returns:
+        A (print, renderer) tuple of the best time per value in seconds
+    """
+    def reference():
+        with contextlib.redirect_stdout(io.StringIO()):
+            for value in values:
+                register = register_class(value)
+                for field_schema in register.schema.fields.values():
+                    field_value = field_schema.decode(register.value)
+                    print(field_schema.name, field_value, field_schema.name_value_dict.get(field_value, False))
+
+    def renderer():
+        with RegisterRenderer(io.StringIO(), cache=RegisterDecodeCache()) as renderer:
+            for value in values:
+                renderer.write(register_class(value))
+
+    reference_time = min(timeit.repeat(reference, number=1, repeat=repeat)) / len(values)
+    renderer_time = min(timeit.repeat(renderer, number=1, repeat=repeat)) / len(values)
+    return reference_time, renderer_time
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark decoding register values')
+    parser.add_argument('-n', '--values', type=int, default=100000,
+                        help='number of random register values decoded per run')
+    parser.add_argument('-r', '--repeat', type=int, default=5,
+                        help='number of runs, the best one is reported')
+    args = parser.parse_args()
+
+    values = [random.getrandbits(32) for i in range(args.values)]
+    for register_class in [CLIDR_EL1, CCSIDR_EL1, ID_AA64MMFR0_EL1]:
+        reference_time, register_time, schema_time = bench_register(register_class, values, args.repeat)
+        print('{:<18} reference {:8.1f} ns/value  Register {:8.1f} ns/value ({:4.1f}x)  '
+              'SchemaRegister {:8.1f} ns/value ({:4.1f}x)'.format(
+            register_class.__name__, reference_time * 1e9, register_time * 1e9, reference_time / register_time,
+            schema_time * 1e9, reference_time / schema_time))
+
+    #Captured values of a register recur, e.g. one per board configuration
+    recurring_values = [random.choice(values[:16]) for i in range(args.values)]
+    for register_class in [CLIDR_EL1, CCSIDR_EL1, ID_AA64MMFR0_EL1]:
+        print_time, renderer_time = bench_render(register_class, recurring_values, args.repeat)
+        print('{:<18} print     {:8.1f} ns/value  renderer {:8.1f} ns/value  speedup {:4.1f}x'.format(
+            register_class.__name__, print_time * 1e9, renderer_time * 1e9, print_time / renderer_time))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+#!/usr/bin/python3
+
+"""
+Standard python import statements
+"""
+import collections
+import functools
+import itertools
+
+FieldChange = collections.namedtuple('FieldChange', ['key', 'name', 'old_raw_value', 'new_raw_value',
+                                                     'old_value', 'new_value', 'old_value_name', 'new_value_name'])
+
+class RegisterDiff(collections.namedtuple('RegisterDiff', ['register_class', 'old_value', 'new_value', 'changes'])):
+    """
+    Hashable difference between two values of a register, changes is a
+    tuple of FieldChanges of the fields which differ, in schema order
+    """
+    __slots__ = ()
+
+    def describe(self):
+        return ', '.join('{} {} -> {}'.format(change.key,
+                                              change.old_value_name or change.old_value,
+                                              change.new_value_name or change.new_value)
+                         for change in self.changes)
+
+@functools.lru_cache(maxsize=65536)
+def diff_register_values(register_class, old_value, new_value):
+    """
+    Compare two raw values of a SchemaRegister subclass. The values are
+    XORed, so only fields with changed bits are decoded.
+
+    Returns:
+        A RegisterDiff, None if the values are equal
+    """
+    changed_bits = old_value ^ new_value
+    if not changed_bits:
+        return None
+    changes = []
+    for field, field_schema in register_class.schema.fields.items():
+        if (changed_bits >> field_schema.shift) & field_schema.mask:
+            old_raw_value = field_schema.decode(old_value)
+            new_raw_value = field_schema.decode(new_value)
+            changes.append(FieldChange(field, field_schema.name, old_raw_value, new_raw_value,
+                                       field_schema.convert(old_raw_value), field_schema.convert(new_raw_value),
+                                       field_schema.name_value_dict.get(old_raw_value),
+                                       field_schema.name_value_dict.get(new_raw_value)))
+    return RegisterDiff(register_class, old_value, new_value, tuple(changes))
+
+class DumpComparison(object):
+    """
+    Result of compare_dumps: identical diffs are grouped, with the
+    number of runs they occurred in and the first run they occurred in.
+
+    Runs which only one set of dumps has, e.g. because a trace was cut
+    short, are not compared but counted in old_only_runs and
+    new_only_runs.
+    """
+    def __init__(self, layout):
+        self.layout = layout
+        self.runs = 0
+        self.identical_runs = 0
+        self.old_only_runs = 0
+        self.new_only_runs = 0
+        self.diff_counts = collections.Counter()
+        self.first_runs = {}
+
+    def add_value_pairs(self, value_pair_counts, value_pair_first_runs):
+        """
+        Decode the distinct (column, old value, new value) pairs once
+        and group them by their diffs
+        """
+        for (column, old_value, new_value), count in value_pair_counts.items():
+            label, register_class = self.layout[column]
+            register_diff = diff_register_values(register_class, old_value, new_value)
+            if register_diff is None or not register_diff.changes:
+                continue
+            key = (label, register_diff.changes)
+            self.diff_counts[key] += count
+            first_run = value_pair_first_runs[(column, old_value, new_value)]
+            self.first_runs[key] = min(first_run, self.first_runs.get(key, first_run))
+
+    def field_change_counts(self):
+        """
+        Returns:
+            A Counter of (label, FieldChange) tuples to the number of
+            runs in which they occurred
+        """
+        counts = collections.Counter()
+        for (label, changes), count in self.diff_counts.items():
+            for change in changes:
+                counts[(label, change)] += count
+        return counts
+
+    def summary(self):
+        lines = ['{} runs, {} identical, {} distinct diffs'.format(self.runs, self.identical_runs,
+                                                                   len(self.diff_counts))]
+        if self.old_only_runs or self.new_only_runs:
+            lines.append('  unmatched: {} runs only in old, {} runs only in new'.format(self.old_only_runs,
+                                                                                     self.new_only_runs))
+        for (label, changes), count in self.diff_counts.most_common():
+            lines.append('  {}: {} ({} runs, first in run {})'.format(
+                label, RegisterDiff(None, None, None, changes).describe(), count, self.first_runs[(label, changes)]))
+        return '\n'.join(lines)
+
+#Fills in for the dumps of the shorter set of dumps in compare_dumps
+missing_dump = object()
+
+def compare_dumps(layout, old_dumps, new_dumps):
+    """
+    Compare two sets of captured register dumps run by run, e.g. the
+    records of traces taken with two qemu versions or on a board
+
+    Args:
+        layout - a list of (label, register class) tuples, one per
+                 register of a dump
+        old_dumps, new_dumps - iterables of dumps, tuples of raw
+                               register values in layout order, e.g.
+                               TraceReader.iter_records()
+
+    Returns:
+        A DumpComparison
+    """
+    return compare_dump_pairs(layout, itertools.zip_longest(old_dumps, new_dumps, fillvalue=missing_dump))
+
+def compare_to_baseline(layout, baseline_dump, dumps):
+    """
+    Compare every dump of dumps to baseline_dump, e.g. the dump of a
+    reference board, see compare_dumps
+    """
+    baseline_dump = tuple(baseline_dump)
+    return compare_dump_pairs(layout, ((baseline_dump, dump) for dump in dumps))
+
+def compare_dump_pairs(layout, dump_pairs):
+    """
+    Compare the (old dump, new dump) pairs of dump_pairs, in which
+    missing_dump stands for the dumps of a shorter set of dumps
+
+    Returns:
+        A DumpComparison
+    """
+    comparison = DumpComparison([(label, register_class) for label, register_class in layout])
+    columns = range(len(comparison.layout))
+    value_pair_counts = collections.Counter()
+    value_pair_first_runs = {}
+    run = -1
+    for run, (old_dump, new_dump) in enumerate(dump_pairs):
+        if old_dump is missing_dump or new_dump is missing_dump:
+            #Only the longer set of dumps is left
+            unmatched_runs = 1 + sum(1 for dump_pair in dump_pairs)
+            if old_dump is missing_dump:
+                comparison.new_only_runs = unmatched_runs
+            else:
+                comparison.old_only_runs = unmatched_runs
+            run -= 1
+            break
+        #Dumps may be lists on one side and tuples on the other
+        old_dump, new_dump = tuple(old_dump), tuple(new_dump)
+        if old_dump == new_dump:
+            comparison.identical_runs += 1
+            continue
+        for column, old_value, new_value in zip(columns, old_dump, new_dump):
+            if old_value != new_value:
+                value_pair = (column, old_value, new_value)
+                if value_pair not in value_pair_counts:
+                    value_pair_first_runs[value_pair] = run
+                value_pair_counts[value_pair] += 1
+    comparison.runs = run + 1
+    comparison.add_value_pairs(value_pair_counts, value_pair_first_runs)
+    return comparison
+
+def trace_layout(trace):
+    """
+    Returns:
+        The layout of the records of a TraceReader, for compare_dumps
+    """
+    return [(column.name, trace.register_class(column.name)) for column in trace.columns]
@@ -0,0 +1,104 @@
+#!/usr/bin/python3
+
+"""
+Standard python import statements
+"""
+import unittest
+import tempfile
+import os
+
+"""
+Custom python import statements
+"""
+from arm.register_diff import *
+from arm.arm_register import *
+from arm.trace import *
+
+mmu_config_layout = [('ccsidr_l1', CCSIDR_EL1),
+                     ('ccsidr_l2', CCSIDR_EL1),
+                     ('clidr', CLIDR_EL1),
+                     ('id_aa64mmfr0_el1', ID_AA64MMFR0_EL1)]
+
+qemu_dump = (0x700fe01a, 0x201fe00a, 0x0a200023, 0x1122)
+
+class DiffRegisterValuesTest(unittest.TestCase):
+    def test_equal_values(self):
+        self.assertEqual(None, diff_register_values(CLIDR_EL1, 0x0a200023, 0x0a200023))
+
+    def test_changed_fields(self):
+        register_diff = diff_register_values(CLIDR_EL1, 0x0a200023, 0x09200023 | (1 << 30))
+        self.assertEqual(['ICB', 'LoC'], [change.key for change in register_diff.changes])
+        icb = register_diff.changes[0]
+        self.assertEqual((0, 1), (icb.old_raw_value, icb.new_raw_value))
+        self.assertEqual('L1 cache is the highest Inner Cacheable level', icb.new_value_name)
+        self.assertEqual('ICB Not disclosed by this mechanism -> L1 cache is the highest Inner Cacheable level, LoC 2 -> 1',
+                         register_diff.describe())
+
+    def test_converted_values(self):
+        register_diff = diff_register_values(CCSIDR_EL1, 0x700fe01a, 0x701fe00a)
+        self.assertEqual([('Associativity', 4, 2), ('NumSets', 128, 256)],
+                         [(change.key, change.old_value, change.new_value) for change in register_diff.changes])
+
+class CompareDumpsTest(unittest.TestCase):
+    def test_grouped_diffs(self):
+        board_dump = (0x700fe01a, 0x201fe00a, 0x0a200023, 0x1124)
+        old_dumps = [qemu_dump] * 10000
+        new_dumps = [qemu_dump if run % 4 else board_dump for run in range(10000)]
+        new_dumps[1] = (0x700fe01a, 0x201fe00a, 0x0a200023 | (1 << 30), 0x1122)
+
+        comparison = compare_dumps(mmu_config_layout, old_dumps, new_dumps)
+        self.assertEqual(10000, comparison.runs)
+        self.assertEqual(7499, comparison.identical_runs)
+        self.assertEqual(2, len(comparison.diff_counts))
+
+        (label, changes), count = comparison.diff_counts.most_common(1)[0]
+        self.assertEqual(('id_aa64mmfr0_el1', 2500), (label, count))
+        self.assertEqual([('PARange', '1TB', '16TB')],
+                         [(change.key, change.old_value_name, change.new_value_name) for change in changes])
+        self.assertEqual(0, comparison.first_runs[(label, changes)])
+
+        field_changes = comparison.field_change_counts()
+        self.assertEqual(1, sum(count for (label, change), count in field_changes.items() if change.key == 'ICB'))
+        self.assertIn('10000 runs, 7499 identical, 2 distinct diffs', comparison.summary())
+        self.assertIn('PARange 1TB -> 16TB (2500 runs, first in run 0)', comparison.summary())
+
+    def test_same_changes_grouped_across_values(self):
+        """
+        LoC changes the same way in both runs, while other fields
+        differ between the runs but not between old and new
+        """
+        old_dumps = [(0x0, 0x0, 0x02000000, 0x0), (0x0, 0x0, 0x02000023, 0x0)]
+        new_dumps = [(0x0, 0x0, 0x01000000, 0x0), (0x0, 0x0, 0x01000023, 0x0)]
+        comparison = compare_dumps(mmu_config_layout, old_dumps, new_dumps)
+        self.assertEqual(1, len(comparison.diff_counts))
+        self.assertEqual(2, list(comparison.diff_counts.values())[0])
+
+    def test_unmatched_runs(self):
+        dumps = [qemu_dump] * 3
+        comparison = compare_dumps(mmu_config_layout, dumps, dumps[:1])
+        self.assertEqual((1, 1, 2, 0), (comparison.runs, comparison.identical_runs,
+                                        comparison.old_only_runs, comparison.new_only_runs))
+        self.assertIn('unmatched: 2 runs only in old, 0 runs only in new', comparison.summary())
+
+        comparison = compare_dumps(mmu_config_layout, iter([]), iter(dumps))
+        self.assertEqual((0, 0, 3), (comparison.runs, comparison.old_only_runs, comparison.new_only_runs))
+
+    def test_lists_and_tuples_compare_equal(self):
+        comparison = compare_dumps(mmu_config_layout, [list(qemu_dump)] * 2, [tuple(qemu_dump)] * 2)
+        self.assertEqual((2, 2, 0), (comparison.runs, comparison.identical_runs, len(comparison.diff_counts)))
+
+    def test_compare_to_baseline_trace(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            trace_file = os.path.join(tmp_dir, 'board.trace')
+            with TraceWriter(trace_file, [(label, register_class.__name__, 4)
+                                          for label, register_class in mmu_config_layout]) as trace:
+                trace.write_record(*qemu_dump)
+                trace.write_record(0x700fe01a, 0x201fe00a, 0x0a200022, 0x1122)
+            with TraceReader(trace_file) as trace:
+                comparison = compare_to_baseline(trace_layout(trace), qemu_dump, trace.iter_records())
+            self.assertEqual((2, 1), (comparison.runs, comparison.identical_runs))
+            self.assertIn('clidr: Ctype1 Separate instruction and data caches -> Data cache only',
+                          comparison.summary())
+
+if __name__ == '__main__':
+    unittest.main()
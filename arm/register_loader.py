@@ -0,0 +1,256 @@
+#!/usr/bin/python3
+
+"""
+Standard python import statements
+"""
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import tempfile
+
+"""
+Custom python import statements
+"""
+from arm.register import *
+
+class RegisterDefinitionError(Exception):
+    pass
+
+class AddConversion(object):
+    """
+    Conversion function of fields which hold a value minus addend, e.g.
+    the associativity of a cache minus 1
+    """
+    __slots__ = ('addend',)
+
+    def __init__(self, addend):
+        self.addend = addend
+
+    def __call__(self, field_value):
+        return field_value + self.addend
+
+    def __reduce__(self):
+        return (AddConversion, (self.addend,))
+
+class PowerOfTwoConversion(object):
+    """
+    Conversion function of fields which hold the log2 of a value minus
+    exponent_addend, e.g. a cache line size in bytes as log2(words)
+    """
+    __slots__ = ('exponent_addend',)
+
+    def __init__(self, exponent_addend):
+        self.exponent_addend = exponent_addend
+
+    def __call__(self, field_value):
+        return 2 ** (field_value + self.exponent_addend)
+
+    def __reduce__(self):
+        return (PowerOfTwoConversion, (self.exponent_addend,))
+
+conversion_types = {
+    'add' : lambda definition: AddConversion(definition['addend']),
+    'power_of_two' : lambda definition: PowerOfTwoConversion(definition['exponent_addend']),
+}
+
+class RegisterDefinitionLoader(object):
+    """
+    Generates SchemaRegister classes from a JSON file of register
+    definitions, lazily, one register at a time, on first access by
+    name.
+
+    The definitions are compiled to one pickled RegisterSchema per
+    register in cache_dir the first time any register is loaded, so
+    later runs only read the registers they use, no matter how many
+    registers the JSON file defines. The compiled definitions are
+    rebuilt whenever the size or modification time of the JSON file
+    changes, or the source of register.py or register_loader.py, which
+    define what is pickled. The names of the defined registers are
+    read once per loader, so looking up an undefined name doesn't touch
+    the file system.
+
+    The JSON file looks like:
+    {
+        "value_name_tables" : {
+            "el_support" : {"0x0" : "Not implemented", "0x1" : "AArch64 only"}
+        },
+        "registers" : {
+            "ID_AA64PFR0_EL1" : {
+                "fields" : [
+                    {"key" : "EL0", "name" : "EL0 Exception level handling",
+                     "width" : 4, "shift" : 0, "value_names" : "el_support"},
+                    {"key" : "DminLine", "name" : "Smallest data cache line in bytes",
+                     "width" : 4, "shift" : 16,
+                     "conversion" : {"type" : "power_of_two", "exponent_addend" : 2}}
+                ]
+            }
+        }
+    }
+
+    value_names is either the name of a shared value_name_tables entry
+    or a dictionary of field values to names. Field values may be
+    written in decimal or hex.
+    """
+    cache_format_version = 1
+    source_files = (os.path.join(os.path.dirname(os.path.realpath(__file__)), 'register.py'),
+                    os.path.realpath(__file__))
+
+    def __init__(self, definition_file, cache_dir, module_name=__name__):
+        """
+        Args:
+            definition_file - path of the JSON file
+            cache_dir - directory of the compiled definitions
+            module_name - __module__ of the generated classes, so that
+                          they can be pickled by reference
+        """
+        self.definition_file = definition_file
+        self.cache_dir = cache_dir
+        self.module_name = module_name
+        self.classes = {}
+        self.schemas = None
+        self.defined_names = None
+        self.loaded_dir = None
+
+    @classmethod
+    def source_hash(cls):
+        """
+        Returns:
+            A short hash of the source_files
+        """
+        source_hash = hashlib.sha256()
+        for source_file in cls.source_files:
+            with open(source_file, 'rb') as f:
+                source_hash.update(f.read())
+        return source_hash.hexdigest()[:16]
+
+    @property
+    def compiled_dir(self):
+        stat = os.stat(self.definition_file)
+        return os.path.join(self.cache_dir, '{}-{}-{}-v{}-{}'.format(
+            os.path.splitext(os.path.basename(self.definition_file))[0],
+            stat.st_mtime_ns, stat.st_size, self.cache_format_version, self.source_hash()))
+
+    def register_names(self):
+        """
+        Returns:
+            A frozenset of the names of all defined registers, compiling
+            the definitions if they aren't yet
+        """
+        if self.defined_names is None:
+            compiled_dir = self.compiled_dir
+            if not os.path.isdir(compiled_dir):
+                self.compile(compiled_dir)
+            if self.schemas is not None:
+                self.defined_names = frozenset(self.schemas)
+            else:
+                self.defined_names = frozenset(os.path.splitext(file_name)[0] for file_name in os.listdir(compiled_dir)
+                                               if file_name.endswith('.pickle'))
+                self.loaded_dir = compiled_dir
+        return self.defined_names
+
+    def load(self, name):
+        """
+        Returns:
+            The SchemaRegister subclass of the register called name,
+            the same class on every call
+
+        Raises:
+            AttributeError: if no register called name is defined, so
+            that load can back a module level __getattr__
+        """
+        register_class = self.classes.get(name)
+        if register_class is None:
+            schema = self.load_schema(name)
+            register_class = type(name, (SchemaRegister,), {'__slots__' : (),
+                                                            '__module__' : self.module_name,
+                                                            'schema' : schema})
+            self.classes[name] = register_class
+        return register_class
+
+    def load_schema(self, name):
+        if name not in self.register_names():
+            raise AttributeError(name)
+        if self.schemas is not None:
+            return self.schemas[name]
+        try:
+            with open(os.path.join(self.loaded_dir, '{}.pickle'.format(name)), 'rb') as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            raise AttributeError(name)
+
+    def names(self):
+        """
+        Returns:
+            A sorted list of the names of all defined registers
+        """
+        return sorted(self.register_names())
+
+    def compile(self, compiled_dir):
+        """
+        Parse the JSON file and write the compiled definitions. If the
+        cache_dir isn't writable, the parsed definitions are kept in
+        memory instead.
+        """
+        schemas = self.parse()
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_dir = tempfile.mkdtemp(dir=self.cache_dir)
+            for name, schema in schemas.items():
+                with open(os.path.join(tmp_dir, '{}.pickle'.format(name)), 'wb') as f:
+                    pickle.dump(schema, f, protocol=pickle.HIGHEST_PROTOCOL)
+            try:
+                os.rename(tmp_dir, compiled_dir)
+            except OSError:
+                #Compiled by another process in the meantime
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+        except OSError:
+            self.schemas = schemas
+
+    def parse(self):
+        """
+        Returns:
+            A dictionary of register names to RegisterSchemas
+
+        Raises:
+            RegisterDefinitionError: if a definition is invalid
+        """
+        with open(self.definition_file) as f:
+            definitions = json.load(f)
+
+        value_name_tables = {table_name : self.parse_value_names(table)
+                             for table_name, table in definitions.get('value_name_tables', {}).items()}
+        schemas = {}
+        for name, register_definition in definitions['registers'].items():
+            if not name.isidentifier():
+                raise RegisterDefinitionError('Invalid register name {}'.format(name))
+            try:
+                schemas[name] = RegisterSchema((field_definition['key'],
+                                                self.parse_field(field_definition, value_name_tables))
+                                               for field_definition in register_definition['fields'])
+            except (KeyError, TypeError, ValueError) as e:
+                raise RegisterDefinitionError('Invalid definition of {}: {!r}'.format(name, e))
+        return schemas
+
+    @staticmethod
+    def parse_value_names(value_names):
+        return {int(field_value, 0) : name for field_value, name in value_names.items()}
+
+    def parse_field(self, field_definition, value_name_tables):
+        value_names = field_definition.get('value_names', {})
+        if isinstance(value_names, str):
+            value_names = value_name_tables[value_names]
+        else:
+            value_names = self.parse_value_names(value_names)
+
+        conversion_function = None
+        conversion = field_definition.get('conversion')
+        if conversion:
+            conversion_function = conversion_types[conversion['type']](conversion)
+
+        return RegisterFieldSchema.create(name=field_definition['name'],
+                                          width=field_definition['width'],
+                                          shift=field_definition['shift'],
+                                          name_value_dict=value_names,
+                                          conversion_function=conversion_function)
@@ -0,0 +1,135 @@
+#!/usr/bin/python3
+
+"""
+Standard python import statements
+"""
+import unittest
+import tempfile
+import json
+import os
+import pickle
+
+"""
+Custom python import statements
+"""
+from arm.register_loader import *
+
+definitions = {
+    'value_name_tables' : {
+        'enable' : {'0' : 'Disabled', '1' : 'Enabled'},
+    },
+    'registers' : {
+        'TEST_REG' : {
+            'fields' : [
+                {'key' : 'EN', 'name' : 'Enable', 'width' : 1, 'shift' : 0, 'value_names' : 'enable'},
+                {'key' : 'LINE', 'name' : 'Line size', 'width' : 4, 'shift' : 4,
+                 'conversion' : {'type' : 'power_of_two', 'exponent_addend' : 2}},
+                {'key' : 'COUNT', 'name' : 'Count - 1', 'width' : 8, 'shift' : 8,
+                 'conversion' : {'type' : 'add', 'addend' : 1},
+                 'value_names' : {'0xff' : 'Maximum'}},
+            ]
+        },
+        'OTHER_REG' : {
+            'fields' : [
+                {'key' : 'ALL', 'name' : 'All bits', 'width' : 32, 'shift' : 0},
+            ]
+        },
+    }
+}
+
+class CountingLoader(RegisterDefinitionLoader):
+    parse_count = 0
+
+    def parse(self):
+        CountingLoader.parse_count += 1
+        return super(CountingLoader, self).parse()
+
+class RegisterDefinitionLoaderTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.definition_file = os.path.join(self.tmp_dir.name, 'registers.json')
+        self.cache_dir = os.path.join(self.tmp_dir.name, 'cache')
+        self.write_definitions(definitions)
+        CountingLoader.parse_count = 0
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def write_definitions(self, data):
+        with open(self.definition_file, 'w') as f:
+            json.dump(data, f)
+
+    def test_load(self):
+        loader = CountingLoader(self.definition_file, self.cache_dir)
+        TEST_REG = loader.load('TEST_REG')
+        self.assertIs(TEST_REG, loader.load('TEST_REG'))
+        self.assertEqual('TEST_REG', TEST_REG.__name__)
+        self.assertTrue(issubclass(TEST_REG, SchemaRegister))
+
+        reg = TEST_REG(0xff31)
+        self.assertEqual('Enabled', reg.get_field_value_name('EN'))
+        self.assertEqual(32, reg.get_field('LINE'))
+        self.assertEqual(256, reg.get_field('COUNT'))
+        self.assertEqual('Maximum', reg.get_field_value_name('COUNT'))
+        self.assertEqual(0xff31, TEST_REG.pack(EN=1, LINE=3, COUNT=0xff))
+        self.assertEqual(['OTHER_REG', 'TEST_REG'], loader.names())
+
+    def test_unknown_register(self):
+        loader = RegisterDefinitionLoader(self.definition_file, self.cache_dir)
+        self.assertRaises(AttributeError, loader.load, 'MISSING_REG')
+        self.assertRaises(AttributeError, loader.load, '../TEST_REG')
+
+    def test_compiled_definitions_are_reused(self):
+        CountingLoader(self.definition_file, self.cache_dir).load('TEST_REG')
+        self.assertEqual(1, CountingLoader.parse_count)
+
+        loader = CountingLoader(self.definition_file, self.cache_dir)
+        self.assertEqual(256, loader.load('TEST_REG')(0xff00).get_field('COUNT'))
+        self.assertEqual(1, CountingLoader.parse_count)
+
+        #Changing the definitions recompiles them
+        changed = json.loads(json.dumps(definitions))
+        changed['registers']['NEW_REG'] = changed['registers'].pop('OTHER_REG')
+        self.write_definitions(changed)
+        os.utime(self.definition_file, ns=(0, 0))
+        loader = CountingLoader(self.definition_file, self.cache_dir)
+        loader.load('NEW_REG')
+        self.assertRaises(AttributeError, loader.load, 'OTHER_REG')
+        self.assertEqual(2, CountingLoader.parse_count)
+
+    def test_unknown_names_read_once(self):
+        loader = CountingLoader(self.definition_file, self.cache_dir)
+        loader.load('TEST_REG')
+        os.rename(self.cache_dir, self.cache_dir + '.moved')
+        self.assertRaises(AttributeError, loader.load, 'MISSING_REG')
+        self.assertEqual(1, CountingLoader.parse_count)
+
+    def test_source_changes_recompile(self):
+        class ChangedSourceLoader(RegisterDefinitionLoader):
+            source_files = RegisterDefinitionLoader.source_files[:1]
+
+        self.assertNotEqual(RegisterDefinitionLoader(self.definition_file, self.cache_dir).compiled_dir,
+                            ChangedSourceLoader(self.definition_file, self.cache_dir).compiled_dir)
+
+    def test_unwritable_cache_dir(self):
+        cache_file = os.path.join(self.tmp_dir.name, 'not_a_dir')
+        with open(cache_file, 'w') as f:
+            f.write('')
+        loader = CountingLoader(self.definition_file, cache_file)
+        self.assertEqual(1, loader.load('TEST_REG')(0x1).get_field('EN'))
+        loader.load('OTHER_REG')
+        self.assertRaises(AttributeError, loader.load, 'MISSING_REG')
+        self.assertEqual(1, CountingLoader.parse_count)
+
+    def test_invalid_definition(self):
+        self.write_definitions({'registers' : {'BAD_REG' : {'fields' : [{'key' : 'X', 'width' : 1}]}}})
+        loader = RegisterDefinitionLoader(self.definition_file, self.cache_dir)
+        self.assertRaises(RegisterDefinitionError, loader.load, 'BAD_REG')
+
+    def test_conversions_pickle(self):
+        conversion = pickle.loads(pickle.dumps(PowerOfTwoConversion(4)))
+        self.assertEqual(64, conversion(2))
+        self.assertEqual(3, pickle.loads(pickle.dumps(AddConversion(1)))(2))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+#!/usr/bin/python3
+
+"""
+Standard python import statements
+"""
+import collections
+import importlib
+
+RegisterLayoutEntry = collections.namedtuple('RegisterLayoutEntry', ['label', 'register_class', 'size'])
+
+def parse_register_layout(description, default_size=4, register_module='arm.arm_register'):
+    """
+    Parse a layout description of a register dump, e.g.
+    'CCSIDR_EL1, CCSIDR_EL1, CLIDR_EL1, ID_AA64MMFR0_EL1'. Every entry
+    is a register class name, optionally with a size in bytes and a
+    label, as in 'mpidr=MPIDR_EL1:8'. Labels default to the register
+    class name.
+
+    Returns:
+        A list of RegisterLayoutEntries
+    """
+    module = importlib.import_module(register_module)
+    layout = []
+    for entry in description.split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        label, separator, register = entry.rpartition('=')
+        register, separator, size = register.partition(':')
+        layout.append(RegisterLayoutEntry(label or register,
+                                          getattr(module, register),
+                                          int(size, 0) if size else default_size))
+    return layout
+
+class RegisterStreamDecoder(object):
+    """
+    Decodes a stream of little-endian register values, e.g. the stderr
+    of a guest dumping registers, into register instances as soon as
+    all bytes of each register arrived. Only the bytes of a partially
+    received register are buffered.
+
+    Usage with a running guest:
+        decoder = RegisterStreamDecoder(layout, on_register=print_register)
+        self.run_qemu(elf_file, on_stderr=decoder.feed)
+    """
+    def __init__(self, layout, repeat=False, on_register=None):
+        """
+        Args:
+            layout - a list of RegisterLayoutEntries, or a layout
+                     description for parse_register_layout
+            repeat - start over at the first entry after the last one,
+                     for streams of many dumps
+            on_register - called with each RegisterLayoutEntry and its
+                          register instance as they are decoded
+        """
+        if isinstance(layout, str):
+            layout = parse_register_layout(layout)
+        self.layout = layout
+        self.repeat = repeat
+        self.on_register = on_register
+        self.pending = bytearray()
+        self.index = 0
+        self.extra_bytes = 0
+
+    def is_complete(self):
+        """
+        Returns:
+            True once all registers of a non-repeating layout arrived
+        """
+        return not self.repeat and self.index >= len(self.layout)
+
+    def feed(self, chunk):
+        """
+        Returns:
+            A list of (RegisterLayoutEntry, register) tuples of the
+            registers completed by chunk
+        """
+        decoded = []
+        view = memoryview(chunk)
+        offset = 0
+        while offset < len(view):
+            if self.is_complete():
+                self.extra_bytes += len(view) - offset
+                break
+            entry = self.layout[self.index]
+            needed = entry.size - len(self.pending)
+            if not self.pending and len(view) - offset >= entry.size:
+                register_value = int.from_bytes(view[offset:offset + entry.size], 'little')
+                offset += entry.size
+            else:
+                self.pending += view[offset:offset + needed]
+                offset += min(needed, len(view) - offset)
+                if len(self.pending) < entry.size:
+                    break
+                register_value = int.from_bytes(self.pending, 'little')
+                self.pending.clear()
+
+            register = entry.register_class(register_value)
+            decoded.append((entry, register))
+            if self.on_register:
+                self.on_register(entry, register)
+            self.index += 1
+            if self.repeat and self.index == len(self.layout):
+                self.index = 0
+        view.release()
+        return decoded
+
+def decode_register_stream(chunks, layout, repeat=False):
+    """
+    Generator stage of a pipeline from byte chunks to registers
+
+    Args:
+        chunks - an iterable of bytes-like chunks, e.g. iter_file_chunks
+        layout - as for RegisterStreamDecoder
+
+    Yields:
+        (RegisterLayoutEntry, register) tuples, as soon as the chunks
+        holding each register were read
+    """
+    decoder = RegisterStreamDecoder(layout, repeat=repeat)
+    for chunk in chunks:
+        for decoded in decoder.feed(chunk):
+            yield decoded
+        if decoder.is_complete():
+            return
+
+def iter_file_chunks(f, chunk_size=65536):
+    """
+    Yields:
+        Chunks of at most chunk_size bytes of the binary file object f
+    """
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
@@ -0,0 +1,72 @@
+#!/usr/bin/python3
+
+"""
+Standard python import statements
+"""
+import unittest
+import io
+
+"""
+Custom python import statements
+"""
+from arm.register_stream import *
+from arm.arm_register import *
+
+mmu_config_layout = 'CCSIDR_EL1, CCSIDR_EL1, CLIDR_EL1, ID_AA64MMFR0_EL1'
+mmu_config_dump = bytes.fromhex('1ae00f700ae01f202300200a22110000')
+
+class ParseRegisterLayoutTest(unittest.TestCase):
+    def test_parse(self):
+        layout = parse_register_layout(mmu_config_layout)
+        self.assertEqual(['CCSIDR_EL1', 'CCSIDR_EL1', 'CLIDR_EL1', 'ID_AA64MMFR0_EL1'], [entry.label for entry in layout])
+        self.assertEqual([CCSIDR_EL1, CCSIDR_EL1, CLIDR_EL1, ID_AA64MMFR0_EL1], [entry.register_class for entry in layout])
+        self.assertEqual([4] * 4, [entry.size for entry in layout])
+
+        layout = parse_register_layout('mpidr=MPIDR_EL1:8, clidr=CLIDR_EL1')
+        self.assertEqual(('mpidr', 8), (layout[0].label, layout[0].size))
+        self.assertEqual('MPIDR_EL1', layout[0].register_class.__name__)
+        self.assertRaises(AttributeError, parse_register_layout, 'NOT_A_REGISTER')
+
+class RegisterStreamDecoderTest(unittest.TestCase):
+    def test_byte_by_byte(self):
+        decoder = RegisterStreamDecoder(mmu_config_layout)
+        decoded = []
+        for offset in range(len(mmu_config_dump)):
+            completed = decoder.feed(mmu_config_dump[offset:offset + 1])
+            if (offset + 1) % 4:
+                self.assertEqual([], completed)
+            decoded += completed
+        self.assertTrue(decoder.is_complete())
+        self.assertEqual([0x700fe01a, 0x201fe00a, 0x0a200023, 0x1122], [register.value for entry, register in decoded])
+        self.assertEqual(32768, decoded[1][1].cache_size())
+        self.assertEqual('Unified cache', decoded[2][1].get_field_value_name('Ctype2'))
+
+    def test_uneven_chunks_and_callback(self):
+        received = []
+        decoder = RegisterStreamDecoder(mmu_config_layout, on_register=lambda entry, register: received.append(register))
+        self.assertEqual(1, len(decoder.feed(mmu_config_dump[:7])))
+        self.assertEqual(2, len(decoder.feed(mmu_config_dump[7:13])))
+        self.assertEqual(1, len(decoder.feed(mmu_config_dump[13:] + b'\xff\xff')))
+        self.assertEqual(4, len(received))
+        self.assertEqual(2, decoder.extra_bytes)
+        self.assertEqual(0, len(decoder.pending))
+
+    def test_repeated_dumps_from_file(self):
+        f = io.BytesIO(mmu_config_dump * 1000)
+        decoded = decode_register_stream(iter_file_chunks(f, chunk_size=5), mmu_config_layout, repeat=True)
+        count = 0
+        for entry, register in decoded:
+            if count % 4 == 2:
+                self.assertIsInstance(register, CLIDR_EL1)
+                self.assertEqual(0x0a200023, register.value)
+            count += 1
+        self.assertEqual(4000, count)
+
+    def test_stream_stops_after_layout(self):
+        def chunks():
+            yield mmu_config_dump
+            raise AssertionError('Read past the end of the layout')
+        self.assertEqual(4, len(list(decode_register_stream(chunks(), mmu_config_layout))))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -10,6 +10,11 @@ import textwrap
 import subprocess
 import os
 import struct
+import pickle
+import io
+import json
+import csv
+import contextlib
 
 """
 Custom python import statements
@@ -79,5 +84,159 @@ class RegisterTest(unittest.TestCase):
         self.assertEqual(6, reg.get_field('field1'))
         self.assertEqual(7, reg.get_field('field2'))
 
+    def test_register_set_value(self):
+        fields = {'field1' : RegisterField(name='field1',
+                              width=3,
+                              shift=0,
+                              value=0,
+                              name_value_dict={}),
+                  'field2': RegisterField(name='field2',
+                              width=4,
+                              shift=3,
+                              value=0,
+                              name_value_dict={})}
+
+        reg = Register(fields)
+        reg.set_value(0xffffff00 | (0xa << 3) | 0x5)
+        self.assertEqual(5, reg.get_field('field1'))
+        self.assertEqual(0xa, reg.get_field('field2'))
+        self.assertEqual((0xa << 3) | 0x5, reg.get_value())
+
+    def test_subclass_instances_decode_independently(self):
+        class TestRegister(Register):
+            def __init__(self):
+                Register.__init__(self, {'field' : RegisterField(name='field',
+                                                                 width=8,
+                                                                 shift=8,
+                                                                 value=0,
+                                                                 name_value_dict={})})
+
+        first = TestRegister()
+        second = TestRegister()
+        first.set_value(0x1234)
+        second.set_value(0xabcd)
+        self.assertEqual(0x12, first.get_field('field'))
+        self.assertEqual(0xab, second.get_field('field'))
+
+def double(value):
+    return value * 2
+
+class SchemaRegisterTest(unittest.TestCase):
+    class TestRegister(SchemaRegister):
+        __slots__ = ()
+        schema = RegisterSchema({
+            'low'  : RegisterFieldSchema.create(name='Low', width=4, shift=0,
+                                                name_value_dict={0xa : 'ten'}),
+            'high' : RegisterFieldSchema.create(name='High', width=4, shift=4,
+                                                conversion_function=double),
+        })
+
+    def test_get_set_field(self):
+        reg = self.TestRegister(0x3a)
+        self.assertEqual(0xa, reg.get_field('low'))
+        self.assertEqual(6, reg.get_field('high'))
+        self.assertEqual('ten', reg.get_field_value_name('low'))
+        self.assertEqual(False, reg.get_field_value_name('high'))
+        self.assertEqual('High', reg.get_field_name('high'))
+
+        reg.set_field('high', 0xf)
+        self.assertEqual(0xfa, reg.value)
+        self.assertRaises(RegisterFieldOutOfBoundError, reg.set_field, 'low', 0x10)
+        self.assertEqual(0xfa, reg.value)
+
+        reg.set_value(0x1)
+        self.assertEqual(1, reg.get_field('low'))
+        self.assertEqual(0, reg.get_field('high'))
+
+    def test_fields(self):
+        reg = self.TestRegister(0x3a)
+        fields = reg.fields
+        self.assertEqual(['low', 'high'], list(fields))
+        self.assertEqual((0xa, 'ten', 'Low'), (fields['low'].get_value(), fields['low'].get_value_name(),
+                                               fields['low'].get_name()))
+        self.assertEqual((4, 4, 6), (fields['high'].shift, fields['high'].width, fields['high'].get_value()))
+        fields['low'].set_value(0x1)
+        self.assertEqual(0x3a, reg.value)
+
+    def test_schema_is_read_only(self):
+        schema = self.TestRegister.schema
+        with self.assertRaises(TypeError):
+            schema.fields['low'] = None
+        self.assertRaises(AttributeError, setattr, schema.fields['low'], 'shift', 1)
+        self.assertEqual(['low', 'high'], list(pickle.loads(pickle.dumps(schema)).fields))
+
+class RegisterRendererTest(unittest.TestCase):
+    class TestRegister(SchemaRegister):
+        __slots__ = ()
+        schema = RegisterSchema({
+            'low'  : RegisterFieldSchema.create(name='Low', width=4, shift=0,
+                                                name_value_dict={0xa : 'ten'}),
+            'high' : RegisterFieldSchema.create(name='High', width=4, shift=4,
+                                                conversion_function=double),
+        })
+
+    def render(self, format, registers, **kwargs):
+        f = io.StringIO()
+        with RegisterRenderer(f, format, **kwargs) as renderer:
+            for label, register in registers:
+                renderer.write(register, label)
+        return f.getvalue()
+
+    def test_text(self):
+        text = self.render('text', [('run0', self.TestRegister(0x3a)), (None, self.TestRegister(0x31))])
+        self.assertEqual('run0 TestRegister 0x3a\n'
+                         'Low 10 ten\n'
+                         'High 3 False\n'
+                         'TestRegister TestRegister 0x31\n'
+                         'Low 1 False\n'
+                         'High 3 False\n', text)
+
+    def test_print(self):
+        f = io.StringIO()
+        with contextlib.redirect_stdout(f):
+            self.TestRegister(0x3a).print()
+        self.assertEqual('Low 10 ten\nHigh 3 False\n', f.getvalue())
+
+        fields = {'field1' : RegisterField(name='field1', width=3, shift=0, value=6, name_value_dict={6 : 'six'})}
+        f = io.StringIO()
+        with contextlib.redirect_stdout(f):
+            Register(fields).print()
+        self.assertEqual('field1 6 six\n', f.getvalue())
+
+    def test_csv(self):
+        text = self.render('csv', [('run,0', self.TestRegister(0x3a))], cache=RegisterDecodeCache())
+        rows = list(csv.reader(io.StringIO(text)))
+        self.assertEqual(RegisterRenderer.csv_header, rows[0])
+        self.assertEqual(['run,0', 'TestRegister', '0x3a', 'low', 'Low', '10', '10', 'ten'], rows[1])
+        self.assertEqual(['run,0', 'TestRegister', '0x3a', 'high', 'High', '3', '6', ''], rows[2])
+
+    def test_jsonl(self):
+        text = self.render('jsonl', [('run0', self.TestRegister(0x3a)), ('run1', self.TestRegister(0x3a))])
+        lines = [json.loads(line) for line in text.splitlines()]
+        self.assertEqual(2, len(lines))
+        self.assertEqual({'label' : 'run1', 'register' : 'TestRegister', 'value' : 0x3a,
+                          'fields' : {'low' : {'raw_value' : 10, 'value' : 10, 'value_name' : 'ten'},
+                                      'high' : {'raw_value' : 3, 'value' : 6, 'value_name' : None}}}, lines[1])
+
+    def test_writes_in_chunks(self):
+        class CountingFile(io.StringIO):
+            writes = 0
+            def write(self, text):
+                CountingFile.writes += 1
+                return super(CountingFile, self).write(text)
+
+        f = CountingFile()
+        with RegisterRenderer(f, 'text', buffer_size=4096) as renderer:
+            for value in range(1000):
+                renderer.write(self.TestRegister(value & 0xff))
+        self.assertEqual(3000, len(f.getvalue().splitlines()))
+        self.assertTrue(CountingFile.writes < 20)
+
+    def test_compare_table(self):
+        table = render_compare_table([self.TestRegister(0x3a), self.TestRegister(0x4a)], ['qemu', 'board'])
+        self.assertEqual('        qemu      board\n'
+                         '  low   10 (ten)  10 (ten)\n'
+                         '* high  6         8\n', table)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,76 @@
+#!/usr/bin/python3
+
+"""
+Standard python import statements
+"""
+import hashlib
+import json
+import os
+
+class ResultCache(object):
+    """
+    Persistent record of passing tests.
+
+    Each test id maps to the key of the last run that passed. The key is
+    a hash of everything the result of the test depends on, so a test
+    whose key still matches the recorded one does not need to be run again.
+
+    Every test is stored in its own file so that tests running in
+    parallel worker processes never overwrite each other's entries.
+    """
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+
+    @staticmethod
+    def compute_key(file_paths, extra_data):
+        """
+        Compute the cache key of a test
+
+        Args:
+            file_paths - paths of the files the test depends on, files
+                         which don't exist are recorded as missing
+            extra_data - any additional JSON serializable data the test
+                         depends on, e.g. tool versions or command lines
+
+        Returns:
+            A hex string
+        """
+        key = hashlib.sha256()
+        for file_path in file_paths:
+            key.update(file_path.encode())
+            if os.path.exists(file_path):
+                with open(file_path, 'rb') as f:
+                    key.update(hashlib.sha256(f.read()).digest())
+            else:
+                key.update(b'missing')
+        key.update(json.dumps(extra_data, sort_keys=True).encode())
+        return key.hexdigest()
+
+    def entry_file(self, test_id):
+        return os.path.join(self.cache_dir, '{}.json'.format(test_id))
+
+    def is_cached_pass(self, test_id, key):
+        """
+        Returns:
+            True if the last recorded pass of test_id had the same key
+        """
+        try:
+            with open(self.entry_file(test_id)) as f:
+                return json.load(f)['key'] == key
+        except (OSError, ValueError, KeyError):
+            return False
+
+    def record_pass(self, test_id, key):
+        if not os.path.exists(self.cache_dir):
+            os.makedirs(self.cache_dir, exist_ok=True)
+        entry_file = self.entry_file(test_id)
+        tmp_file = '{}.{}.tmp'.format(entry_file, os.getpid())
+        with open(tmp_file, 'w') as f:
+            json.dump({'key' : key}, f)
+        os.replace(tmp_file, entry_file)
+
+    def invalidate(self, test_id):
+        try:
+            os.remove(self.entry_file(test_id))
+        except FileNotFoundError:
+            pass
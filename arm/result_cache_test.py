@@ -0,0 +1,146 @@
+#!/usr/bin/python3
+
+"""
+Standard python import statements
+"""
+import unittest
+import tempfile
+import os
+import sys
+import types
+
+"""
+Custom python import statements
+"""
+from arm.result_cache import *
+import arm.arm_test
+
+class ResultCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.source_file = os.path.join(self.tmp_dir.name, 'test.asm')
+        with open(self.source_file, 'w') as f:
+            f.write('mov x0, #1\n')
+        self.cache = ResultCache(os.path.join(self.tmp_dir.name, 'cache'))
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_record_and_lookup(self):
+        key = self.cache.compute_key([self.source_file], {'qemu' : ['-kernel']})
+        self.assertEqual(False, self.cache.is_cached_pass('a.test', key))
+        self.cache.record_pass('a.test', key)
+        self.assertEqual(True, self.cache.is_cached_pass('a.test', key))
+        self.assertEqual(False, self.cache.is_cached_pass('b.test', key))
+        self.cache.invalidate('a.test')
+        self.assertEqual(False, self.cache.is_cached_pass('a.test', key))
+
+    def test_key_changes_with_source(self):
+        key = self.cache.compute_key([self.source_file], {})
+        with open(self.source_file, 'w') as f:
+            f.write('mov x0, #2\n')
+        self.assertNotEqual(key, self.cache.compute_key([self.source_file], {}))
+
+    def test_key_changes_with_extra_data(self):
+        key = self.cache.compute_key([self.source_file], {'as' : '2.32'})
+        self.assertEqual(key, self.cache.compute_key([self.source_file], {'as' : '2.32'}))
+        self.assertNotEqual(key, self.cache.compute_key([self.source_file], {'as' : '2.33'}))
+
+    def test_missing_file(self):
+        missing_file = os.path.join(self.tmp_dir.name, 'test.c')
+        key = self.cache.compute_key([missing_file], {})
+        with open(missing_file, 'w') as f:
+            f.write('')
+        self.assertNotEqual(key, self.cache.compute_key([missing_file], {}))
+
+class OutcomesNotKeptResult(object):
+    """
+    Test result which reports the outcomes of tests without keeping
+    them in lists, like the one pytest passes to TestCase.run
+    """
+    def __init__(self):
+        self.outcomes = []
+
+    def startTest(self, test):
+        pass
+
+    def stopTest(self, test):
+        pass
+
+    def addSuccess(self, test):
+        self.outcomes.append('success')
+
+    def addError(self, test, err):
+        self.outcomes.append('error')
+
+    def addFailure(self, test, err):
+        self.outcomes.append('failure')
+
+    def addSkip(self, test, reason):
+        self.outcomes.append('skip')
+
+class ResultCacheRecordingTest(unittest.TestCase):
+    """
+    Only tests which executed a step are recorded as passes
+    """
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+        class CachedTest(arm.arm_test.ARMInstructionTest):
+            def test_disabled(self):
+                return
+
+            def test_step(self):
+                output_file = os.path.join(self.output_dir, 'test.o')
+                self.build_step([sys.executable, '-c', 'import sys; open(sys.argv[1], "w").close()', output_file],
+                                inputs=[], outputs=[output_file])
+
+        CachedTest.config_data = {'base_dir' : os.path.dirname(os.path.dirname(os.path.realpath(__file__))),
+                                  'base_output_dir' : os.path.join(self.tmp_dir.name, 'build'),
+                                  'result_cache_dir' : os.path.join(self.tmp_dir.name, 'result_cache'),
+                                  'inspect_cache_dir' : os.path.join(self.tmp_dir.name, 'inspect_cache'),
+                                  'use_result_cache' : True,
+                                  'use_build_cache' : False}
+        self.CachedTest = CachedTest
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def run_tests(self, *test_names):
+        """
+        Returns:
+            The names of the tests skipped as cached passes
+        """
+        result = unittest.TestResult()
+        unittest.TestSuite([self.CachedTest(test_name) for test_name in test_names]).run(result)
+        self.assertEqual([], result.errors + result.failures)
+        return [test._testMethodName for test, reason in result.skipped]
+
+    def test_no_op_test_not_recorded(self):
+        self.assertEqual([], self.run_tests('test_disabled', 'test_step'))
+        self.assertEqual(['test_step'], self.run_tests('test_disabled', 'test_step'))
+
+    def test_helper_module_change_invalidates(self):
+        helper_file = os.path.join(self.tmp_dir.name, 'helper.py')
+        with open(helper_file, 'w') as f:
+            f.write('VALUE = 1\n')
+        helper_module = types.ModuleType('result_cache_test_helper')
+        helper_module.__file__ = helper_file
+        sys.modules[helper_module.__name__] = helper_module
+        self.addCleanup(sys.modules.pop, helper_module.__name__)
+        self.CachedTest.helper_modules = arm.arm_test.ARMInstructionTest.helper_modules + [helper_module.__name__]
+
+        self.assertEqual([], self.run_tests('test_step'))
+        self.assertEqual(['test_step'], self.run_tests('test_step'))
+        with open(helper_file, 'w') as f:
+            f.write('VALUE = 2\n')
+        self.assertEqual([], self.run_tests('test_step'))
+
+    def test_result_without_outcome_lists(self):
+        for run in range(2):
+            result = OutcomesNotKeptResult()
+            self.CachedTest('test_step').run(result)
+            self.assertEqual(['success'], result.outcomes)
+
+if __name__ == '__main__':
+    unittest.main()
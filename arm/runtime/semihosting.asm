@@ -0,0 +1,180 @@
+/*
+Semihosting routines shared by the tests. Assembled into its own
+object which tests link in next to their test.o, see
+ARMInstructionTest.assemble_runtime.
+
+The routines don't use the stack, so they can be called before the
+stack pointer is initialized.
+*/
+.section .text
+.global write_buffer_to_stderr
+write_buffer_to_stderr:
+    /*
+    Write a whole buffer to stderr with a single SYS_WRITE semihosting
+    call, instead of one SYS_WRITEC call per byte. The stderr handle is
+    opened with SYS_OPEN(":tt", "a") on the first call.
+
+    Args:
+        x1 - Address of the buffer, preserved
+        x2 - Length of the buffer in bytes, preserved
+
+    Returns:
+        x0 - Number of bytes which were not written
+
+    Clobbers:
+        x3, x4, x5
+    */
+    mov x5, x1
+    adr x3, semihosting_stderr_handle
+    ldr x4, [x3]
+    cmn x4, #1
+    bne semihosting_stderr_handle_open
+
+    adr x1, semihosting_open_args
+    mov w0, #0x01               //SYS_OPEN
+    hlt #0xf000
+    mov x4, x0
+    str x4, [x3]
+
+semihosting_stderr_handle_open:
+    adr x3, semihosting_write_args
+    stp x4, x5, [x3]            //handle, buffer
+    str x2, [x3, #16]           //length
+    mov x1, x3
+    mov w0, #0x05               //SYS_WRITE
+    hlt #0xf000
+    mov x1, x5
+    ret
+
+.global read_buffer_from_stdin
+read_buffer_from_stdin:
+    /*
+    Fill a buffer from stdin with SYS_READ semihosting calls, repeating
+    the call until the whole buffer is read or the input ends. The
+    stdin handle is opened with SYS_OPEN(":tt", "r") on the first call.
+
+    Args:
+        x1 - Address of the buffer, preserved
+        x2 - Length of the buffer in bytes, preserved
+
+    Returns:
+        x0 - Number of bytes which were not read, non-zero if the input
+             ended before the buffer was full
+
+    Clobbers:
+        x3, x4, x5, x6, x7
+    */
+    mov x5, x1
+    mov x6, x2
+    adr x3, semihosting_stdin_handle
+    ldr x4, [x3]
+    cmn x4, #1
+    bne semihosting_stdin_handle_open
+
+    adr x1, semihosting_open_stdin_args
+    mov w0, #0x01               //SYS_OPEN
+    hlt #0xf000
+    mov x4, x0
+    str x4, [x3]
+
+semihosting_stdin_handle_open:
+    mov x7, x5                  //next byte of the buffer to fill
+    mov x0, x6                  //bytes left to read
+
+semihosting_read_loop:
+    cbz x0, semihosting_read_done
+    adr x3, semihosting_read_args
+    stp x4, x7, [x3]            //handle, buffer
+    str x0, [x3, #16]           //length
+    mov x2, x0
+    mov x1, x3
+    mov w0, #0x06               //SYS_READ
+    hlt #0xf000
+    cmp x0, x2                  //nothing read, the input ended
+    beq semihosting_read_done
+    sub x3, x2, x0
+    add x7, x7, x3
+    b semihosting_read_loop
+
+semihosting_read_done:
+    mov x1, x5
+    mov x2, x6
+    ret
+
+.global run_batch
+run_batch:
+    /*
+    Run a kernel over a batch of input vectors streamed from the host,
+    writing one output per vector, so that a single boot processes the
+    whole batch. The framing is described in arm/batch.py.
+
+    The kernel is called with x0 holding the address of the input
+    vector and x1 the address of the output buffer. It must preserve
+    x19-x28.
+
+    Args:
+        x0 - Address of the kernel
+        x1 - Address of the input vector buffer
+        x2 - Size of an input vector in bytes
+        x3 - Address of the output buffer
+        x4 - Size of an output in bytes
+
+    Clobbers:
+        x0-x7, x19-x25, x28, and whatever the kernel clobbers
+    */
+    mov x28, x30
+    mov x19, x0
+    mov x20, x1
+    mov x21, x2
+    mov x22, x3
+    mov x23, x4
+
+    adr x1, batch_header
+    mov x2, #8
+    bl read_buffer_from_stdin
+    cbnz x0, run_batch_done
+    adr x3, batch_header
+    ldp w24, w25, [x3]          //magic, vector count
+    ldr w4, =0x48435442
+    cmp w24, w4
+    bne run_batch_done
+
+run_batch_loop:
+    cbz x25, run_batch_trailer
+    mov x1, x20
+    mov x2, x21
+    bl read_buffer_from_stdin
+    cbnz x0, run_batch_done
+    mov x0, x20
+    mov x1, x22
+    blr x19
+    mov x1, x22
+    mov x2, x23
+    bl write_buffer_to_stderr
+    sub x25, x25, #1
+    b run_batch_loop
+
+run_batch_trailer:
+    adr x1, batch_header
+    mov x2, #8
+    bl write_buffer_to_stderr
+
+run_batch_done:
+    mov x30, x28
+    ret
+
+.data
+.balign 8
+semihosting_stderr_handle:  .dword -1
+semihosting_open_args:      .dword semihosting_tt_name
+                            .dword 8    //mode "a", which opens stderr
+                            .dword 3    //length of semihosting_tt_name
+semihosting_write_args:     .dword 0, 0, 0
+semihosting_stdin_handle:   .dword -1
+semihosting_open_stdin_args: .dword semihosting_tt_name
+                            .dword 0    //mode "r", which opens stdin
+                            .dword 3    //length of semihosting_tt_name
+semihosting_read_args:      .dword 0, 0, 0
+batch_header:               .word 0, 0
+semihosting_tt_name:        .asciz ":tt"
+.end
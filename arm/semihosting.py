@@ -0,0 +1,114 @@
+#!/usr/bin/python3
+
+"""
+Standard python import statements
+"""
+import collections
+
+class SemihostingOutputMatcher(object):
+    """
+    Incrementally compares the bytes a guest writes through semihosting
+    (SYS_WRITEC / SYS_WRITE0 / SYS_WRITE to stderr) with the expected
+    output, so that the result is known as soon as the first wrong byte
+    or the last expected byte arrives instead of when qemu exits.
+    """
+    PENDING = 'pending'
+    MATCHED = 'matched'
+    MISMATCHED = 'mismatched'
+
+    def __init__(self, expected):
+        self.expected = bytes(expected)
+        self.received = bytearray()
+        self.state = self.PENDING
+        self.mismatch_offset = None
+
+    def feed(self, chunk):
+        """
+        Compare the next chunk of guest output
+
+        Returns:
+            The state after the chunk
+        """
+        start = len(self.received)
+        self.received.extend(chunk)
+        if self.state == self.MISMATCHED:
+            return self.state
+
+        expected_part = self.expected[start:start + len(chunk)]
+        for offset, (expected_byte, received_byte) in enumerate(zip(expected_part, chunk)):
+            if expected_byte != received_byte:
+                self.set_mismatch(start + offset)
+                return self.state
+
+        if len(self.received) > len(self.expected):
+            self.set_mismatch(len(self.expected))
+        elif len(self.received) == len(self.expected):
+            self.state = self.MATCHED
+        return self.state
+
+    def set_mismatch(self, offset):
+        self.state = self.MISMATCHED
+        self.mismatch_offset = offset
+
+    def is_mismatched(self):
+        return self.state == self.MISMATCHED
+
+    def is_decided(self):
+        """
+        Returns:
+            True once all expected bytes arrived or a byte differed
+        """
+        return self.state != self.PENDING
+
+    def diagnostics(self):
+        """
+        Returns:
+            A string describing where the output diverged
+        """
+        if self.state == self.MISMATCHED:
+            return 'Output differs at byte {}: expected {}, received {}'.format(
+                self.mismatch_offset, self.expected.hex(), bytes(self.received).hex())
+        if self.state == self.PENDING:
+            return 'Output incomplete: expected {}, received {}'.format(
+                self.expected.hex(), bytes(self.received).hex())
+        return 'Output matched: {}'.format(self.expected.hex())
+
+def split_regions(data, regions):
+    """
+    Split a bulk dump written by write_buffer_to_stderr into the
+    labeled memory regions it consists of, without copying
+
+    Args:
+        data - the bytes written by the guest
+        regions - a list of (label, size in bytes) tuples, in the order
+                  the guest dumped them
+
+    Returns:
+        An OrderedDict of labels to memoryviews of data
+
+    Raises:
+        ValueError: if the sizes of the regions don't add up to the
+        length of data
+    """
+    expected_size = sum(size for label, size in regions)
+    if expected_size != len(data):
+        raise ValueError('Dump is {} bytes, regions add up to {} bytes'.format(len(data), expected_size))
+
+    view = memoryview(data)
+    split = collections.OrderedDict()
+    offset = 0
+    for label, size in regions:
+        split[label] = view[offset:offset + size]
+        offset += size
+    return split
+
+def escape_mux_input(data):
+    """
+    Escape data written to the stdin of qemu -nographic, whose character
+    multiplexer takes 0x01 (Ctrl-A) as the escape byte of its commands.
+    Ctrl-A Ctrl-A reaches the guest as a single 0x01.
+
+    Returns:
+        The escaped bytes
+    """
+    return bytes(data).replace(b'\x01', b'\x01\x01')
@@ -0,0 +1,58 @@
+#!/usr/bin/python3
+
+"""
+Standard python import statements
+"""
+import unittest
+
+"""
+Custom python import statements
+"""
+from arm.semihosting import *
+
+class SemihostingOutputMatcherTest(unittest.TestCase):
+    def test_match_byte_by_byte(self):
+        matcher = SemihostingOutputMatcher(b'\x44\x33\x22\x11')
+        self.assertEqual(matcher.PENDING, matcher.feed(b'\x44'))
+        self.assertEqual(matcher.PENDING, matcher.feed(b'\x33\x22'))
+        self.assertEqual(False, matcher.is_decided())
+        self.assertEqual(matcher.MATCHED, matcher.feed(b'\x11'))
+        self.assertEqual(True, matcher.is_decided())
+
+    def test_mismatch_is_detected_immediately(self):
+        matcher = SemihostingOutputMatcher(b'\x44\x33\x22\x11')
+        self.assertEqual(matcher.MISMATCHED, matcher.feed(b'\x44\x34'))
+        self.assertEqual(1, matcher.mismatch_offset)
+        self.assertEqual(True, matcher.is_mismatched())
+        self.assertIn('byte 1', matcher.diagnostics())
+        self.assertEqual(matcher.MISMATCHED, matcher.feed(b'\x22\x11'))
+        self.assertEqual(b'\x44\x34\x22\x11', matcher.received)
+
+    def test_extra_bytes_mismatch(self):
+        matcher = SemihostingOutputMatcher(b'\x88')
+        self.assertEqual(matcher.MISMATCHED, matcher.feed(b'\x88\x88'))
+        self.assertEqual(1, matcher.mismatch_offset)
+
+    def test_incomplete_diagnostics(self):
+        matcher = SemihostingOutputMatcher(b'\xab\xcd')
+        matcher.feed(b'\xab')
+        self.assertIn('incomplete', matcher.diagnostics())
+
+class SplitRegionsTest(unittest.TestCase):
+    def test_split_regions(self):
+        data = bytes.fromhex('1ae00f700ae01f202300200a22110000')
+        regions = split_regions(data, [('ccsidr_l1', 4), ('ccsidr_l2', 4), ('clidr_id_aa64mmfr0', 8)])
+        self.assertEqual(['ccsidr_l1', 'ccsidr_l2', 'clidr_id_aa64mmfr0'], list(regions))
+        self.assertEqual(b'\x1a\xe0\x0f\x70', regions['ccsidr_l1'])
+        self.assertEqual(0x700fe01a, regions['ccsidr_l1'].cast('I')[0])
+        self.assertEqual(bytes.fromhex('2300200a22110000'), regions['clidr_id_aa64mmfr0'].tobytes())
+
+    def test_split_regions_size_mismatch(self):
+        self.assertRaises(ValueError, split_regions, b'\x00' * 5, [('output', 4)])
+
+    def test_escape_mux_input(self):
+        self.assertEqual(b'\x77\x01\x01\x00\x01\x01\x01\x01', escape_mux_input(bytearray(b'\x77\x01\x00\x01\x01')))
+        self.assertEqual(b'', escape_mux_input(b''))
+
+if __name__ == '__main__':
+    unittest.main()
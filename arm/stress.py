@@ -0,0 +1,110 @@
+#!/usr/bin/python3
+
+"""
+Standard python import statements
+"""
+import collections
+import concurrent.futures
+import math
+import subprocess
+import time
+
+def percentile(sorted_values, p):
+    """
+    Nearest-rank percentile
+
+    Args:
+        sorted_values - a non empty list sorted in ascending order
+        p - the percentile, between 0 and 100
+    """
+    rank = max(1, int(math.ceil(p / 100.0 * len(sorted_values))))
+    return sorted_values[rank - 1]
+
+class StressReport(object):
+    """
+    Distribution of the outcomes of many runs of the same guest
+    """
+    def __init__(self, outcomes, latencies, expected_returncode=None, expected_stderr=None):
+        """
+        Args:
+            outcomes - a Counter of (returncode, stderr) tuples, returncode
+                       is None for iterations which timed out
+            latencies - the wall time of every iteration in seconds
+            expected_returncode - returncode of a passing iteration, or None to accept any
+            expected_stderr - stderr of a passing iteration, or None to accept any
+        """
+        self.outcomes = outcomes
+        self.latencies = sorted(latencies)
+        self.expected_returncode = expected_returncode
+        self.expected_stderr = expected_stderr
+
+    @property
+    def iterations(self):
+        return sum(self.outcomes.values())
+
+    def is_expected(self, returncode, stderr):
+        if self.expected_returncode is not None and returncode != self.expected_returncode:
+            return False
+        if self.expected_stderr is not None and stderr != self.expected_stderr:
+            return False
+        return True
+
+    @property
+    def failures(self):
+        return sum(count for (returncode, stderr), count in self.outcomes.items()
+                   if not self.is_expected(returncode, stderr))
+
+    @property
+    def failure_rate(self):
+        if not self.iterations:
+            return 0.0
+        return self.failures / self.iterations
+
+    def latency_percentile(self, p):
+        return percentile(self.latencies, p)
+
+    def summary(self):
+        lines = ['{} iterations, {} failures ({:.4%})'.format(self.iterations, self.failures, self.failure_rate)]
+        if self.latencies:
+            lines.append('latency p50 {:.3f}s, p90 {:.3f}s, p99 {:.3f}s, max {:.3f}s'.format(
+                self.latency_percentile(50), self.latency_percentile(90),
+                self.latency_percentile(99), self.latencies[-1]))
+        for (returncode, stderr), count in self.outcomes.most_common():
+            status = 'ok' if self.is_expected(returncode, stderr) else 'FAIL'
+            if returncode is None:
+                lines.append('{:>8} x timeout, stderr {} {}'.format(count, stderr, status))
+            else:
+                lines.append('{:>8} x returncode {:#x}, stderr {} {}'.format(count, returncode, stderr, status))
+        return '\n'.join(lines)
+
+def stress_run(run_once, iterations, concurrency, expected_returncode=None, expected_stderr=None):
+    """
+    Run the same guest many times with bounded concurrency
+
+    Args:
+        run_once - callable which runs the guest once and returns a
+                   subprocess.CompletedProcess, must be thread safe.
+                   A subprocess.TimeoutExpired it raises is counted
+                   as an outcome with a returncode of None.
+        iterations - number of times to run the guest
+        concurrency - maximum number of runs in flight at the same time
+
+    Returns:
+        A StressReport
+    """
+    def timed_run(iteration):
+        start = time.monotonic()
+        try:
+            completed_process = run_once()
+            outcome = (completed_process.returncode, completed_process.stderr)
+        except subprocess.TimeoutExpired as e:
+            outcome = (None, e.stderr)
+        return outcome, time.monotonic() - start
+
+    outcomes = collections.Counter()
+    latencies = []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for outcome, latency in executor.map(timed_run, range(iterations)):
+            outcomes[outcome] += 1
+            latencies.append(latency)
+    return StressReport(outcomes, latencies, expected_returncode, expected_stderr)
@@ -0,0 +1,73 @@
+#!/usr/bin/python3
+
+"""
+Standard python import statements
+"""
+import unittest
+import collections
+import subprocess
+import itertools
+import threading
+import sys
+
+"""
+Custom python import statements
+"""
+from arm.stress import *
+
+class PercentileTest(unittest.TestCase):
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(1, percentile(values, 0))
+        self.assertEqual(50, percentile(values, 50))
+        self.assertEqual(99, percentile(values, 99))
+        self.assertEqual(100, percentile(values, 100))
+        self.assertEqual(7, percentile([7], 90))
+
+class StressRunTest(unittest.TestCase):
+    def test_outcome_distribution(self):
+        """
+        Every 10th iteration loses the race
+        """
+        counter = itertools.count()
+        lock = threading.Lock()
+
+        def run_once():
+            with lock:
+                i = next(counter)
+            if i % 10 == 9:
+                return subprocess.CompletedProcess([], 0x77, b'', b'\x03\x00\x00\x00')
+            return subprocess.CompletedProcess([], 0x77, b'', b'\x04\x00\x00\x00')
+
+        report = stress_run(run_once, iterations=1000, concurrency=8,
+                            expected_returncode=0x77, expected_stderr=b'\x04\x00\x00\x00')
+        self.assertEqual(1000, report.iterations)
+        self.assertEqual(100, report.failures)
+        self.assertAlmostEqual(0.1, report.failure_rate)
+        self.assertEqual(collections.Counter({(0x77, b'\x04\x00\x00\x00') : 900,
+                                              (0x77, b'\x03\x00\x00\x00') : 100}), report.outcomes)
+        self.assertEqual(1000, len(report.latencies))
+        self.assertIn('1000 iterations, 100 failures', report.summary())
+
+    def test_subprocess_runs(self):
+        command = [sys.executable, '-c', 'import sys; sys.stderr.write("x"); sys.exit(3)']
+
+        def run_once():
+            return subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+        report = stress_run(run_once, iterations=8, concurrency=4, expected_returncode=3)
+        self.assertEqual(0, report.failures)
+        self.assertEqual({(3, b'x') : 8}, dict(report.outcomes))
+        self.assertTrue(report.latency_percentile(50) <= report.latency_percentile(99))
+
+    def test_timeouts_are_outcomes(self):
+        def run_once():
+            raise subprocess.TimeoutExpired([], 1, output=b'', stderr=b'\x01')
+
+        report = stress_run(run_once, iterations=3, concurrency=2, expected_returncode=0x77)
+        self.assertEqual({(None, b'\x01') : 3}, dict(report.outcomes))
+        self.assertEqual(3, report.failures)
+        self.assertIn('timeout', report.summary())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -60,27 +60,6 @@ write_byte_to_stderr:
     hlt #0xf000
     ret
 
-write_dword_to_stderr:
-    /*
-    Write 4 bytes to stderr using the Angel semi-hosting
-    interface
-
-    Args:
-        x1 - Address to write to stderr
-    */
-    mov w0, #0x03
-    hlt #0xf000
-    add x1, x1, #1
-    mov w0, #0x03
-    hlt #0xf000
-    add x1, x1, #1
-    mov w0, #0x03
-    hlt #0xf000
-    add x1, x1, #1
-    mov w0, #0x03
-    hlt #0xf000
-    ret
-
 disable_caches:
     mrs x0, SCTLR_EL3
     bic x0, x0, #(0x1 << 2)
@@ -180,31 +159,28 @@ boot:
 
     b .
 
+    adr x1, register_dump
+
     mov x0, #0
     msr CSSELR_EL1, x0
 
     mrs x8, CCSIDR_EL1
-    adr x1, output
-    str x8, [x1]
-    bl write_dword_to_stderr
+    str w8, [x1]
 
     mov x0, #1
     msr CSSELR_EL1, x0
 
     mrs x8, CCSIDR_EL1
-    adr x1, output
-    str x8, [x1]
-    bl write_dword_to_stderr
+    str w8, [x1, #4]
 
     mrs x8, CLIDR_EL1
-    adr x1, output
-    str x8, [x1]
-    bl write_dword_to_stderr
+    str w8, [x1, #8]
 
     mrs x8, ID_AA64MMFR0_EL1
-    adr x1, output
-    str x8, [x1]
-    bl write_dword_to_stderr
+    str w8, [x1, #12]
+
+    mov x2, #16
+    bl write_buffer_to_stderr
 
     bl tlb_init 
     /*MMU Registers
@@ -227,7 +203,7 @@ boot:
 .balign 8
 code:                       .dword 0x00020026
 status:                     .dword 0x77777777
-output:                     .dword 0xffffffff
+register_dump:              .word 0, 0, 0, 0
 
 .macro PUT_64B high, low
 .word \low
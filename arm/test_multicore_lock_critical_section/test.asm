@@ -3,11 +3,6 @@
 _Reset:
     B Reset_Handler /* Reset */
 
-write_byte_to_stderr:
-    mov w0, #0x03
-    hlt #0xf000
-    ret
-
 Reset_Handler:
 
 /* Acquire Lock */
@@ -52,14 +47,9 @@ boot:
 done_waiting:
 
     /* Write data to output */
-    mov x12, #0x4
     adr x1, output
-
-    loop_start:
-    bl write_byte_to_stderr
-    add x1, x1, 1
-    sub x12, x12, #0x1
-    cbnz x12, loop_start
+    mov x2, #0x4
+    bl write_buffer_to_stderr
 
     mov w0, #0x18
     adr x1, code
@@ -0,0 +1,52 @@
+.section INTERRUPT_VECTOR, "x"
+.global _Reset
+_Reset:
+    B Reset_Handler /* Reset */
+
+Reset_Handler:
+    mrs x0, MPIDR_EL1
+    and x0, x0, #0xFFFF
+    cbz x0, boot
+
+sleep:
+    wfi
+    B sleep
+
+set_bit_kernel:
+    /*
+    Args:
+        x0 - Input, address of the 64-bit value to modify followed by
+             the 64-bit number of the bit to set
+        x1 - Output, address of the 64-bit result
+    */
+    ldp x2, x3, [x0]
+    mov x4, #0x1
+    lsl x4, x4, x3
+    orr x2, x2, x4
+    str x2, [x1]
+    ret
+
+boot:
+    //initialize stack pointer
+    adr x0, stack_top_cpu0
+    mov sp, x0
+
+    //run set_bit_kernel over every vector the host sends
+    adr x0, set_bit_kernel
+    adr x1, input_vector
+    mov x2, #16
+    adr x3, output
+    mov x4, #8
+    bl run_batch
+
+    mov w0, #0x18
+    adr x1, code
+    hlt #0xf000
+
+.data
+.balign 8
+code:           .dword 0x00020026
+status:         .dword 0x77777777
+input_vector:   .dword 0, 0
+output:         .dword 0
+.end
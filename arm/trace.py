@@ -0,0 +1,278 @@
+#!/usr/bin/python3
+
+"""
+Standard python import statements
+"""
+import collections
+import importlib
+import json
+import mmap
+import os
+import struct
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+class TraceFormatError(Exception):
+    pass
+
+TraceColumn = collections.namedtuple('TraceColumn', ['name', 'register', 'size'])
+
+class TraceFormat(object):
+    """
+    Binary trace of captured register dumps:
+
+        magic       - b'ARMTRACE'
+        version     - little-endian 32-bit word
+        header size - little-endian 32-bit word, the size of the JSON
+                      header including padding
+        header      - JSON list of the columns of a record, each with
+                      its name, the name of the register class which
+                      decodes it, e.g. "CCSIDR_EL1", and its size in
+                      bytes, 4 or 8. Padded with spaces to 8 bytes.
+        records     - fixed-width records of the little-endian column
+                      values, in column order, until the end of the file
+
+    A record has the layout of a dump the guest writes with
+    write_buffer_to_stderr, so dumps are appended to a trace as they
+    are, without parsing them.
+    """
+    magic = b'ARMTRACE'
+    version = 1
+    prefix_format = '<8sII'
+    prefix_size = struct.calcsize(prefix_format)
+    column_formats = {4 : 'I', 8 : 'Q'}
+
+    def __init__(self, columns):
+        """
+        Args:
+            columns - a list of TraceColumns, or of (name, register, size)
+                      tuples
+        """
+        self.columns = [TraceColumn(*column) for column in columns]
+        if not self.columns:
+            raise TraceFormatError('A trace needs at least one column')
+        for column in self.columns:
+            if column.size not in self.column_formats:
+                raise TraceFormatError('Column {} has unsupported size {}'.format(column.name, column.size))
+        if len(set(column.name for column in self.columns)) != len(self.columns):
+            raise TraceFormatError('Column names are not unique')
+        self.record_format = '<' + ''.join(self.column_formats[column.size] for column in self.columns)
+        self.record_size = struct.calcsize(self.record_format)
+        self.column_offsets = collections.OrderedDict()
+        offset = 0
+        for column in self.columns:
+            self.column_offsets[column.name] = offset
+            offset += column.size
+
+    def encode_header(self):
+        header = json.dumps([list(column) for column in self.columns]).encode()
+        header += b' ' * (-(self.prefix_size + len(header)) % 8)
+        return struct.pack(self.prefix_format, self.magic, self.version, len(header)) + header
+
+    @classmethod
+    def decode_header(cls, data, file_path):
+        """
+        Returns:
+            A (TraceFormat, size of the whole header) tuple
+        """
+        if len(data) < cls.prefix_size:
+            raise TraceFormatError('{} is not a trace'.format(file_path))
+        magic, version, header_size = struct.unpack_from(cls.prefix_format, data)
+        if magic != cls.magic:
+            raise TraceFormatError('{} is not a trace'.format(file_path))
+        if version != cls.version:
+            raise TraceFormatError('{} has unsupported version {}'.format(file_path, version))
+        try:
+            columns = json.loads(bytes(data[cls.prefix_size:cls.prefix_size + header_size]).decode())
+            return cls(columns), cls.prefix_size + header_size
+        except (ValueError, TypeError):
+            raise TraceFormatError('{} has an invalid header'.format(file_path))
+
+class TraceWriter(object):
+    """
+    Appends records to a trace file, creating it if it doesn't exist.
+
+    Usage:
+        with TraceWriter(trace_file, [('ccsidr_l1', 'CCSIDR_EL1', 4)]) as trace:
+            trace.write_dump(completed_process.stderr)
+    """
+    def __init__(self, file_path, columns):
+        """
+        Raises:
+            TraceFormatError: if the file exists with different columns
+        """
+        self.file_path = file_path
+        self.format = TraceFormat(columns)
+        self.file = open(file_path, 'ab')
+        try:
+            if self.file.tell() == 0:
+                self.file.write(self.format.encode_header())
+            else:
+                with open(file_path, 'rb') as f:
+                    prefix = f.read(TraceFormat.prefix_size)
+                    header_size = struct.unpack_from(TraceFormat.prefix_format, prefix)[2] \
+                                  if len(prefix) == TraceFormat.prefix_size else 0
+                    existing_format = TraceFormat.decode_header(prefix + f.read(header_size), file_path)[0]
+                if existing_format.columns != self.format.columns:
+                    raise TraceFormatError('{} has different columns'.format(file_path))
+        except (TraceFormatError, OSError):
+            self.file.close()
+            raise
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write_dump(self, data):
+        """
+        Append one record, given as the raw bytes the guest dumped
+        """
+        if len(data) != self.format.record_size:
+            raise TraceFormatError('Dump is {} bytes, records are {} bytes'.format(len(data), self.format.record_size))
+        self.file.write(data)
+
+    def write_record(self, *values):
+        """
+        Append one record, given as one integer per column
+        """
+        self.file.write(struct.pack(self.format.record_format, *values))
+
+class TraceReader(object):
+    """
+    Memory maps a trace file. Records are read without copying them,
+    a partially written last record is ignored.
+    """
+    def __init__(self, file_path, register_module='arm.arm_register'):
+        """
+        Args:
+            register_module - the module which defines the register
+                              classes named by the columns
+        """
+        self.file_path = file_path
+        self.register_module = register_module
+        with open(file_path, 'rb') as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else b''
+        try:
+            self.format, self.header_size = TraceFormat.decode_header(self.data, file_path)
+        except TraceFormatError:
+            self.close()
+            raise
+        self.count = (len(self.data) - self.header_size) // self.format.record_size
+        self.records = memoryview(self.data)[self.header_size:self.header_size + self.count * self.format.record_size]
+
+    def close(self):
+        """
+        Unmap the trace. Views returned by column_view and column_array
+        stay valid: while one of them is alive, the mapping is left to
+        be closed by the garbage collector once the last one is dropped.
+        """
+        records, self.records = getattr(self, 'records', None), None
+        data, self.data = self.data, b''
+        try:
+            if records is not None:
+                records.release()
+            if isinstance(data, mmap.mmap):
+                data.close()
+        except BufferError:
+            #Still exported by a view
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def columns(self):
+        return self.format.columns
+
+    def column(self, name):
+        for column in self.format.columns:
+            if column.name == name:
+                return column
+        raise KeyError(name)
+
+    def record(self, index):
+        """
+        Returns:
+            A tuple of the column values of record index, negative
+            indices count from the end
+        """
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        return struct.unpack_from(self.format.record_format, self.records, index * self.format.record_size)
+
+    def value(self, index, name):
+        return self.record(index)[list(self.format.column_offsets).index(name)]
+
+    def iter_records(self):
+        return struct.iter_unpack(self.format.record_format, self.records)
+
+    def column_view(self, name):
+        """
+        Returns:
+            A memoryview of the values of column name. It is a zero-copy
+            view if records have a single column, otherwise the column
+            is gathered into a new buffer.
+        """
+        column = self.column(name)
+        column_format = TraceFormat.column_formats[column.size]
+        if len(self.format.columns) == 1:
+            return self.records.cast(column_format)
+        offset = self.format.column_offsets[name]
+        record_size = self.format.record_size
+        gathered = bytearray(self.count * column.size)
+        for index in range(self.count):
+            start = index * record_size + offset
+            gathered[index * column.size:(index + 1) * column.size] = self.records[start:start + column.size]
+        return memoryview(gathered).cast(column_format)
+
+    def column_array(self, name):
+        """
+        Returns:
+            A zero-copy, read-only numpy view of the values of column
+            name, strided over the records, requires numpy
+        """
+        if numpy is None:
+            raise ImportError('Column arrays require numpy')
+        dtype = numpy.dtype({'names' : [column.name for column in self.format.columns],
+                             'formats' : ['<u{}'.format(column.size) for column in self.format.columns],
+                             'offsets' : list(self.format.column_offsets.values()),
+                             'itemsize' : self.format.record_size})
+        return numpy.frombuffer(self.records, dtype=dtype)[name]
+
+    def register_class(self, name):
+        return getattr(importlib.import_module(self.register_module), self.column(name).register)
+
+    def registers(self, name):
+        """
+        Returns:
+            A generator of register instances of column name, one per
+            record
+        """
+        register_class = self.register_class(name)
+        column_index = list(self.format.column_offsets).index(name)
+        for record in self.iter_records():
+            yield register_class(record[column_index])
+
+    def decode_column(self, name):
+        """
+        Returns:
+            The structured array of the decoded fields of column name,
+            see RegisterSchema.decode_array, requires numpy
+        """
+        return self.register_class(name).decode_array(self.column_array(name))
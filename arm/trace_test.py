@@ -0,0 +1,126 @@
+#!/usr/bin/python3
+
+"""
+Standard python import statements
+"""
+import unittest
+import tempfile
+import struct
+import os
+
+"""
+Custom python import statements
+"""
+from arm.trace import *
+from arm.arm_register import *
+
+mmu_config_columns = [('ccsidr_l1', 'CCSIDR_EL1', 4),
+                      ('ccsidr_l2', 'CCSIDR_EL1', 4),
+                      ('clidr', 'CLIDR_EL1', 4),
+                      ('id_aa64mmfr0_el1', 'ID_AA64MMFR0_EL1', 4)]
+
+mmu_config_dump = bytes.fromhex('1ae00f700ae01f202300200a22110000')
+
+class TraceTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.trace_file = os.path.join(self.tmp_dir.name, 'test.trace')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def write_runs(self, runs):
+        with TraceWriter(self.trace_file, mmu_config_columns) as trace:
+            for run in range(runs):
+                trace.write_dump(mmu_config_dump)
+
+    def test_write_read(self):
+        self.write_runs(2)
+        with TraceWriter(self.trace_file, mmu_config_columns) as trace:
+            trace.write_record(0x1, 0x2, 0x3, 0x4)
+
+        with TraceReader(self.trace_file) as trace:
+            self.assertEqual(3, len(trace))
+            self.assertEqual((0x700fe01a, 0x201fe00a, 0x0a200023, 0x1122), trace.record(0))
+            self.assertEqual((0x1, 0x2, 0x3, 0x4), trace.record(-1))
+            self.assertEqual(0x0a200023, trace.value(1, 'clidr'))
+            self.assertRaises(IndexError, trace.record, 3)
+            self.assertEqual(TraceColumn('clidr', 'CLIDR_EL1', 4), trace.column('clidr'))
+
+            column = trace.column_view('ccsidr_l1')
+            self.assertEqual([0x700fe01a, 0x700fe01a, 0x1], column.tolist())
+            column.release()
+
+            ccsidrs = list(trace.registers('ccsidr_l1'))
+            self.assertIsInstance(ccsidrs[0], CCSIDR_EL1)
+            self.assertEqual(32768, ccsidrs[0].cache_size())
+            self.assertEqual('Unified cache', next(trace.registers('clidr')).get_field_value_name('Ctype2'))
+
+    def test_single_column_view(self):
+        with TraceWriter(self.trace_file, [('mpidr', 'MPIDR_EL1', 8)]) as trace:
+            for value in range(4):
+                trace.write_record(0x80000000 | value)
+
+        with TraceReader(self.trace_file) as trace:
+            column = trace.column_view('mpidr')
+            self.assertEqual([0x80000000, 0x80000001, 0x80000002, 0x80000003], column.tolist())
+            column.release()
+            self.assertEqual([0, 1, 2, 3], [mpidr.get_field('Aff0') for mpidr in trace.registers('mpidr')])
+
+    def test_partial_record_ignored(self):
+        self.write_runs(1)
+        with open(self.trace_file, 'ab') as f:
+            f.write(mmu_config_dump[:6])
+        with TraceReader(self.trace_file) as trace:
+            self.assertEqual(1, len(trace))
+
+    def test_mismatched_columns(self):
+        self.write_runs(1)
+        self.assertRaises(TraceFormatError, TraceWriter, self.trace_file, mmu_config_columns[:2])
+        with TraceWriter(self.trace_file, mmu_config_columns) as trace:
+            self.assertRaises(TraceFormatError, trace.write_dump, mmu_config_dump[:8])
+
+    def test_not_a_trace(self):
+        with open(self.trace_file, 'wb') as f:
+            f.write(b'1ae00f700ae01f20')
+        self.assertRaises(TraceFormatError, TraceReader, self.trace_file)
+        self.assertRaises(TraceFormatError, TraceFormat, [('x', 'CLIDR_EL1', 2)])
+        self.assertRaises(TraceFormatError, TraceFormat, [])
+
+    def test_invalid_header(self):
+        for header in (b'[1]    ', b'[]     ', b'{"a": 1}'):
+            with open(self.trace_file, 'wb') as f:
+                f.write(struct.pack(TraceFormat.prefix_format, TraceFormat.magic, TraceFormat.version, len(header)))
+                f.write(header)
+            self.assertRaises(TraceFormatError, TraceReader, self.trace_file)
+            self.assertRaises(TraceFormatError, TraceWriter, self.trace_file, mmu_config_columns)
+
+    def test_column_view_outlives_reader(self):
+        with TraceWriter(self.trace_file, [('mpidr', 'MPIDR_EL1', 8)]) as trace:
+            trace.write_record(0x80000001)
+        with TraceReader(self.trace_file) as trace:
+            column = trace.column_view('mpidr')
+        self.assertEqual([0x80000001], column.tolist())
+
+    @unittest.skipIf(numpy is None, 'requires numpy')
+    def test_column_array_outlives_reader(self):
+        self.write_runs(2)
+        with TraceReader(self.trace_file) as trace:
+            column = trace.column_array('clidr')
+            decoded = trace.decode_column('ccsidr_l2')
+        self.assertEqual([0x0a200023] * 2, column.tolist())
+        self.assertEqual([256] * 2, decoded['NumSets'].tolist())
+
+    @unittest.skipIf(numpy is None, 'requires numpy')
+    def test_column_array(self):
+        self.write_runs(3)
+        with TraceReader(self.trace_file) as trace:
+            column = trace.column_array('clidr')
+            self.assertEqual([0x0a200023] * 3, column.tolist())
+            self.assertFalse(column.flags.writeable)
+            decoded = trace.decode_column('ccsidr_l2')
+            self.assertEqual([256] * 3, decoded['NumSets'].tolist())
+            del column, decoded
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,766 @@
+#!/usr/bin/python3
+
+"""
+Standard python import statements
+"""
+import array
+import operator
+import json
+import os
+import concurrent.futures
+from multiprocessing import shared_memory
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+#Decimal digits per limb, limbs are stored least significant first
+LIMB_DIGITS = 9
+LIMB_BASE = 10 ** LIMB_DIGITS
+LIMB_TYPECODE = 'I'
+
+#Crossover thresholds in limbs, measured on each host by
+#karatsuba_bench.py --tune and loaded from THRESHOLDS_FILE at import
+DEFAULT_THRESHOLDS = {
+    #Operands with at most this many limbs are multiplied with the
+    #schoolbook method, above it karatsuba_multiply splits them
+    'schoolbook_cutoff' : 48,
+    #Operands with more limbs are split three ways with Toom-Cook
+    #instead of two ways with Karatsuba
+    'toom3_cutoff' : 400,
+    #Operands with more limbs are multiplied by transform_multiply, if
+    #numpy is available
+    'transform_cutoff' : 64,
+    #Operands with more limbs are split by parallel_multiply_limbs and
+    #their subproducts multiplied by worker processes
+    'parallel_cutoff' : 4000,
+}
+
+THRESHOLDS_FILE = os.environ.get('KARATSUBA_THRESHOLDS',
+                                 os.path.join(os.path.dirname(os.path.dirname(os.path.realpath(__file__))),
+                                              'build', 'karatsuba_thresholds.json'))
+
+def load_thresholds(thresholds_file=THRESHOLDS_FILE):
+    """
+    Read the thresholds written by save_thresholds. Thresholds which
+    are missing or not positive integers keep their default, as does
+    everything if thresholds_file does not exist or is not valid JSON.
+
+    Returns:
+        A dictionary like DEFAULT_THRESHOLDS
+    """
+    thresholds = dict(DEFAULT_THRESHOLDS)
+    try:
+        with open(thresholds_file) as f:
+            measured = json.load(f)
+    except (OSError, ValueError):
+        return thresholds
+    if isinstance(measured, dict):
+        for name in thresholds:
+            value = measured.get(name)
+            if isinstance(value, int) and not isinstance(value, bool) and value > 0:
+                thresholds[name] = value
+    return thresholds
+
+def save_thresholds(thresholds, thresholds_file=THRESHOLDS_FILE):
+    """
+    Atomically write thresholds, so a concurrent import never reads a
+    partial file
+    """
+    thresholds_dir = os.path.dirname(os.path.abspath(thresholds_file))
+    os.makedirs(thresholds_dir, exist_ok=True)
+    tmp_file = '{}.{}.tmp'.format(thresholds_file, os.getpid())
+    with open(tmp_file, 'w') as f:
+        json.dump(thresholds, f, indent=4, sort_keys=True)
+        f.write('\n')
+    os.replace(tmp_file, thresholds_file)
+
+THRESHOLDS = load_thresholds()
+SCHOOLBOOK_CUTOFF = THRESHOLDS['schoolbook_cutoff']
+
+def is_multiple_of_2(x):
+    """
+    Returns True if x is an even multiple of 2, False otherwise
+    """
+    return (x % 2 == 0)
+
+def is_power_of_2(x):
+    """
+    Returns True if x is a power of 2, False otherwise
+    """
+    assert(x > 0)
+    return (x & (x - 1) == 0)
+
+def lengthen(x, length_to_extend_to):
+    """
+    Multiply x by 10 until its length is equal to
+    length_to_extend_to.
+
+    Returns:
+        A list with 2 elements:
+            1. The new value of x as a string
+            2. How much the length of x increased by
+    """
+    assert(type(x) == str)
+    length_of_x = len(x)
+    assert(length_of_x <= length_to_extend_to)
+    increase = length_to_extend_to - length_of_x
+    return [str(int(x) * 10 ** increase), increase]
+
+def increase_to_next_power_of_2(x):
+    """
+    Returns:
+        The smallest power of 2 which is greater than or equal to x
+    """
+    assert(x > 0)
+    return 1 << (x - 1).bit_length()
+
+def to_limbs(digits):
+    """
+    Convert a string of decimal digits to limbs
+
+    Returns:
+        An array('I') of base LIMB_BASE limbs, least significant first,
+        empty for zero
+
+    Raises:
+        ValueError if digits is not a string of decimal digits
+    """
+    if not isinstance(digits, str) or not digits.isdigit() or not digits.isascii():
+        raise ValueError('Not a string of decimal digits: {!r:.40}'.format(digits))
+    limbs = array.array(LIMB_TYPECODE, [int(digits[max(0, end - LIMB_DIGITS):end])
+                                        for end in range(len(digits), 0, -LIMB_DIGITS)])
+    return strip_limbs(limbs)
+
+def from_limbs(limbs):
+    """
+    Returns:
+        The decimal string of limbs, as returned by to_limbs
+    """
+    if not limbs:
+        return '0'
+    return str(limbs[-1]) + ''.join(['%09d' % limb for limb in reversed(limbs[:-1])])
+
+def strip_limbs(limbs):
+    """
+    Remove the most significant zero limbs of limbs in place
+
+    Returns:
+        limbs
+    """
+    end = len(limbs)
+    while end and not limbs[end - 1]:
+        end -= 1
+    del limbs[end:]
+    return limbs
+
+def normalize_limbs(accumulator):
+    """
+    Propagate the carries of a list of unbounded, possibly negative,
+    per limb sums whose total is not negative
+
+    Returns:
+        An array('I') of limbs
+    """
+    carry = 0
+    for index, value in enumerate(accumulator):
+        carry, accumulator[index] = divmod(value + carry, LIMB_BASE)
+    while carry:
+        carry, limb = divmod(carry, LIMB_BASE)
+        accumulator.append(limb)
+    assert(carry == 0)
+    return strip_limbs(array.array(LIMB_TYPECODE, accumulator))
+
+def add_limbs(a, b):
+    """
+    Returns:
+        The limbs of the sum of the limbs a and b
+    """
+    if len(a) < len(b):
+        a, b = b, a
+    accumulator = list(a)
+    accumulator[:len(b)] = map(operator.add, accumulator[:len(b)], b)
+    return normalize_limbs(accumulator)
+
+def schoolbook_multiply(a, b):
+    """
+    Multiply the limbs a and b limb by limb. The carries are only
+    propagated once at the end, the per limb sums are Python ints.
+
+    Returns:
+        The limbs of the product
+    """
+    if not a or not b:
+        return array.array(LIMB_TYPECODE)
+    if len(a) < len(b):
+        a, b = b, a
+    accumulator = [0] * (len(a) + len(b))
+    length_of_a = len(a)
+    for index, limb in enumerate(b):
+        if limb:
+            accumulator[index:index + length_of_a] = map(operator.add,
+                                                         accumulator[index:index + length_of_a],
+                                                         [limb * a_limb for a_limb in a])
+    return normalize_limbs(accumulator)
+
+def compare_limbs(a, b):
+    """
+    Returns:
+        -1, 0 or 1 if the limbs a are less than, equal to or greater
+        than the limbs b
+    """
+    if len(a) != len(b):
+        return -1 if len(a) < len(b) else 1
+    for a_limb, b_limb in zip(reversed(a), reversed(b)):
+        if a_limb != b_limb:
+            return -1 if a_limb < b_limb else 1
+    return 0
+
+def subtract_limbs(a, b):
+    """
+    Returns:
+        The limbs of a - b, a must not be less than b
+    """
+    accumulator = list(a)
+    accumulator[:len(b)] = map(operator.sub, accumulator[:len(b)], b)
+    return normalize_limbs(accumulator)
+
+def scale_limbs(a, factor):
+    """
+    Returns:
+        The limbs of a times the small non negative int factor
+    """
+    return normalize_limbs([limb * factor for limb in a])
+
+def divide_limbs_exactly(a, divisor):
+    """
+    Returns:
+        The limbs of a divided by the small int divisor, which must
+        divide a
+    """
+    quotient = array.array(LIMB_TYPECODE, [0]) * len(a)
+    remainder = 0
+    for index in range(len(a) - 1, -1, -1):
+        quotient[index], remainder = divmod(remainder * LIMB_BASE + a[index], divisor)
+    assert(remainder == 0)
+    return strip_limbs(quotient)
+
+"""
+Signed values of the Toom-3 evaluation and interpolation are
+(negative, limbs) tuples, zero is never negative
+"""
+def signed_add(x, y):
+    x_negative, a = x
+    y_negative, b = y
+    if x_negative == y_negative:
+        return (x_negative, add_limbs(a, b))
+    comparison = compare_limbs(a, b)
+    if comparison >= 0:
+        return (x_negative and comparison > 0, subtract_limbs(a, b))
+    return (y_negative, subtract_limbs(b, a))
+
+def signed_subtract(x, y):
+    y_negative, b = y
+    return signed_add(x, (not y_negative and len(b) > 0, b))
+
+def signed_scale(x, factor):
+    return (x[0], scale_limbs(x[1], factor))
+
+def signed_divide_exactly(x, divisor):
+    return (x[0], divide_limbs_exactly(x[1], divisor))
+
+def signed_multiply(x, y, multiply):
+    product = multiply(x[1], y[1])
+    return ((x[0] != y[0]) and len(product) > 0, product)
+
+def karatsuba_subproducts(a, b):
+    """
+    Split the limbs a and b for one level of Karatsuba multiplication:
+        a = a1 * B^m + a0, b = b1 * B^m + b0
+    Operands of very different lengths only have the longer one split.
+
+    Returns:
+        A (m, operands) tuple, operands is a list of the (x, y) limbs
+        of the subproducts: a0 * b0, a1 * b1 and (a0 + a1) * (b0 + b1),
+        or a0 * b and a1 * b for unbalanced operands
+    """
+    m = max(len(a), len(b)) // 2
+    a0, a1 = strip_limbs(a[:m]), a[m:]
+    b0, b1 = strip_limbs(b[:m]), b[m:]
+    if not b1 or not a1:
+        if not a1:
+            a0, a1, b = b0, b1, a
+        return m, [(a0, b), (a1, b)]
+    return m, [(a0, b0), (a1, b1), (add_limbs(a0, a1), add_limbs(b0, b1))]
+
+def karatsuba_combine(length, m, products):
+    """
+    Combine the products of the subproducts of karatsuba_subproducts,
+    z0 = a0 * b0, z2 = a1 * b1 and z1 = (a0 + a1) * (b0 + b1):
+        a * b = z2 * B^2m + (z1 - z2 - z0) * B^m + z0
+
+    Args:
+        length - the total number of limbs of a and b
+
+    Returns:
+        The limbs of the product
+    """
+    accumulator = [0] * (length + 1)
+    if len(products) == 2:
+        for index, limb in enumerate(products[0]):
+            accumulator[index] += limb
+        for index, limb in enumerate(products[1], m):
+            accumulator[index] += limb
+        return normalize_limbs(accumulator)
+
+    z0, z2, z1 = products
+    for index, limb in enumerate(z0):
+        accumulator[index] += limb
+        accumulator[index + m] -= limb
+    for index, limb in enumerate(z2):
+        accumulator[index + 2 * m] += limb
+        accumulator[index + m] -= limb
+    for index, limb in enumerate(z1, m):
+        accumulator[index] += limb
+    return normalize_limbs(accumulator)
+
+def karatsuba_split(a, b, multiply):
+    """
+    One level of Karatsuba multiplication of the limbs a and b, with
+    three half size products, see karatsuba_subproducts
+
+    Args:
+        multiply - multiplies the limbs of the subproducts
+
+    Returns:
+        The limbs of the product
+    """
+    m, operands = karatsuba_subproducts(a, b)
+    return karatsuba_combine(len(a) + len(b), m, [multiply(x, y) for x, y in operands])
+
+def toom3_split(a, b, multiply):
+    """
+    One level of Toom-Cook 3-way multiplication of the limbs a and b,
+    with five third size products. a and b are split into polynomials
+    of degree 2 in B^k, which are evaluated at 0, 1, -1, -2 and
+    infinity, multiplied pointwise and interpolated with Bodrato's
+    sequence.
+
+    Args:
+        multiply - multiplies the limbs of the subproducts
+
+    Returns:
+        The limbs of the product
+    """
+    k = (max(len(a), len(b)) + 2) // 3
+    a0, a1, a2 = strip_limbs(a[:k]), strip_limbs(a[k:2 * k]), a[2 * k:]
+    b0, b1, b2 = strip_limbs(b[:k]), strip_limbs(b[k:2 * k]), b[2 * k:]
+
+    def evaluate(p0, p1, p2):
+        p0_p2 = add_limbs(p0, p2)
+        at_1 = (False, add_limbs(p0_p2, p1))
+        at_minus_1 = signed_subtract((False, p0_p2), (False, p1))
+        at_minus_2 = signed_subtract(signed_scale(signed_add(at_minus_1, (False, p2)), 2), (False, p0))
+        return at_1, at_minus_1, at_minus_2
+
+    a_at_1, a_at_minus_1, a_at_minus_2 = evaluate(a0, a1, a2)
+    b_at_1, b_at_minus_1, b_at_minus_2 = evaluate(b0, b1, b2)
+    r_0 = (False, multiply(a0, b0))
+    r_1 = signed_multiply(a_at_1, b_at_1, multiply)
+    r_minus_1 = signed_multiply(a_at_minus_1, b_at_minus_1, multiply)
+    r_minus_2 = signed_multiply(a_at_minus_2, b_at_minus_2, multiply)
+    r_infinity = (False, multiply(a2, b2))
+
+    r3 = signed_divide_exactly(signed_subtract(r_minus_2, r_1), 3)
+    r1 = signed_divide_exactly(signed_subtract(r_1, r_minus_1), 2)
+    r2 = signed_subtract(r_minus_1, r_0)
+    r3 = signed_add(signed_divide_exactly(signed_subtract(r2, r3), 2), signed_scale(r_infinity, 2))
+    r2 = signed_subtract(signed_add(r2, r1), r_infinity)
+    r1 = signed_subtract(r1, r3)
+
+    accumulator = [0] * (len(a) + len(b) + 1)
+    for power, (negative, limbs) in enumerate([r_0, r1, r2, r3, r_infinity]):
+        sign = -1 if negative else 1
+        for index, limb in enumerate(limbs, power * k):
+            accumulator[index] += sign * limb
+    return normalize_limbs(accumulator)
+
+def karatsuba_multiply(a, b, cutoff=None):
+    """
+    Multiply the limbs a and b with Karatsuba's method at every level,
+    see karatsuba_split
+
+    Args:
+        cutoff - operands of at most this many limbs are multiplied by
+                 schoolbook_multiply, defaults to SCHOOLBOOK_CUTOFF
+
+    Returns:
+        The limbs of the product
+    """
+    if cutoff is None:
+        cutoff = SCHOOLBOOK_CUTOFF
+    cutoff = max(cutoff, 1)
+    if min(len(a), len(b)) <= cutoff:
+        return schoolbook_multiply(a, b)
+    return karatsuba_split(a, b, lambda x, y: karatsuba_multiply(x, y, cutoff))
+
+def toom3_multiply(a, b, cutoff=None):
+    """
+    Multiply the limbs a and b with Toom-Cook 3-way at every level, see
+    toom3_split
+
+    Args:
+        cutoff - operands of at most this many limbs are multiplied by
+                 schoolbook_multiply, defaults to SCHOOLBOOK_CUTOFF
+
+    Returns:
+        The limbs of the product
+    """
+    if cutoff is None:
+        cutoff = SCHOOLBOOK_CUTOFF
+    cutoff = max(cutoff, 2)
+    if min(len(a), len(b)) <= cutoff:
+        return schoolbook_multiply(a, b)
+    return toom3_split(a, b, lambda x, y: toom3_multiply(x, y, cutoff))
+
+#Number theoretic transforms are modulo the prime 119 * 2^23 + 1, so
+#their length is at most 2^23, 3 is a primitive root
+NTT_MODULUS = 998244353
+NTT_ROOT = 3
+NTT_MAX_LENGTH = 1 << 23
+
+def limbs_to_pieces(limbs, piece_digits):
+    """
+    Split limbs into pieces of piece_digits decimal digits, which must
+    divide LIMB_DIGITS
+
+    Returns:
+        A numpy int64 array of the pieces, least significant first
+    """
+    values = numpy.frombuffer(limbs, dtype='u{}'.format(limbs.itemsize)).astype(numpy.int64)
+    pieces = numpy.empty((len(values), LIMB_DIGITS // piece_digits), dtype=numpy.int64)
+    piece_base = 10 ** piece_digits
+    for index in range(pieces.shape[1]):
+        pieces[:, index] = values % piece_base
+        values //= piece_base
+    return pieces.ravel()
+
+def pieces_to_limbs(pieces, piece_digits):
+    """
+    Returns:
+        The limbs of pieces of piece_digits decimal digits, each less
+        than 10^piece_digits
+    """
+    pieces_per_limb = LIMB_DIGITS // piece_digits
+    padded = numpy.zeros(-(-len(pieces) // pieces_per_limb) * pieces_per_limb, dtype=numpy.int64)
+    padded[:len(pieces)] = pieces
+    padded = padded.reshape(-1, pieces_per_limb)
+    values = numpy.zeros(len(padded), dtype=numpy.int64)
+    for index in range(pieces_per_limb - 1, -1, -1):
+        values = values * 10 ** piece_digits + padded[:, index]
+    limbs = array.array(LIMB_TYPECODE)
+    limbs.frombytes(values.astype('u{}'.format(limbs.itemsize)).tobytes())
+    return strip_limbs(limbs)
+
+def propagate_carries(coefficients, base):
+    """
+    Vectorized carry propagation of non negative int64 convolution
+    coefficients. Whole carries are moved up until every coefficient is
+    at most 2 * base - 2, then the remaining carries of at most one,
+    which may ripple through runs of base - 1, are resolved at once: a
+    carry enters a position if the nearest lower position which does
+    not equal base - 1 is at least base.
+
+    Returns:
+        A numpy int64 array of digits less than base
+    """
+    headroom = 2
+    largest = int(coefficients.max()) if len(coefficients) else 0
+    while largest:
+        largest //= base
+        headroom += 1
+    digits = numpy.zeros(len(coefficients) + headroom, dtype=numpy.int64)
+    digits[:len(coefficients)] = coefficients
+    while digits.max() > 2 * base - 2:
+        carries = digits // base
+        digits -= carries * base
+        digits[1:] += carries[:-1]
+
+    generates = digits >= base
+    positions = numpy.arange(len(digits))
+    last_stop = numpy.maximum.accumulate(numpy.where(generates | (digits != base - 1), positions, -1))
+    carry_in = numpy.zeros(len(digits), dtype=bool)
+    carry_in[1:] = (last_stop[:-1] >= 0) & generates[numpy.maximum(last_stop[:-1], 0)]
+    digits += carry_in
+    digits[digits >= base] -= base
+    return digits
+
+def fft_multiply(a, b):
+    """
+    Multiply the limbs a and b as polynomials in 10^3 with a float64
+    FFT. With pieces of 3 digits the convolution coefficients of
+    operands of millions of digits stay far below 2^53, every result is
+    checked to be within 1/4 of an integer before it is rounded.
+
+    Returns:
+        The limbs of the product, None if the FFT was not accurate enough
+    """
+    x, y = limbs_to_pieces(a, 3), limbs_to_pieces(b, 3)
+    length = len(x) + len(y) - 1
+    transform_length = 1 << (length - 1).bit_length()
+    product = numpy.fft.irfft(numpy.fft.rfft(x, transform_length) * numpy.fft.rfft(y, transform_length),
+                              transform_length)[:length]
+    coefficients = numpy.rint(product)
+    if len(product) and numpy.abs(product - coefficients).max() > 0.25:
+        return None
+    return pieces_to_limbs(propagate_carries(coefficients.astype(numpy.int64), 1000), 3)
+
+def ntt(values, invert=False):
+    """
+    Iterative radix 2 number theoretic transform modulo NTT_MODULUS of
+    a numpy uint64 array with a power of 2 length
+
+    Returns:
+        The transformed values, as a new numpy uint64 array
+    """
+    length = len(values)
+    bits = length.bit_length() - 1
+    reversed_indices = numpy.zeros(length, dtype=numpy.int64)
+    for bit in range(bits):
+        reversed_indices |= ((numpy.arange(length) >> bit) & 1) << (bits - 1 - bit)
+    values = values[reversed_indices]
+
+    root = pow(NTT_ROOT, (NTT_MODULUS - 1) // length, NTT_MODULUS)
+    if invert:
+        root = pow(root, NTT_MODULUS - 2, NTT_MODULUS)
+    #Powers of the root of unity of order length, doubled up to length / 2
+    twiddles = numpy.ones(1, dtype=numpy.uint64)
+    while len(twiddles) < length // 2:
+        step = pow(root, len(twiddles), NTT_MODULUS)
+        twiddles = numpy.concatenate([twiddles, twiddles * numpy.uint64(step) % numpy.uint64(NTT_MODULUS)])
+
+    modulus = numpy.uint64(NTT_MODULUS)
+    half = 1
+    while half < length:
+        blocks = values.reshape(-1, 2 * half)
+        low = blocks[:, :half]
+        high = blocks[:, half:] * twiddles[::length // (2 * half)][:half] % modulus
+        values = numpy.concatenate([(low + high) % modulus, (low + modulus - high) % modulus], axis=1).ravel()
+        half *= 2
+    if invert:
+        values = values * numpy.uint64(pow(length, NTT_MODULUS - 2, NTT_MODULUS)) % modulus
+    return values
+
+def ntt_multiply(a, b):
+    """
+    Multiply the limbs a and b as polynomials in 10 with an exact
+    number theoretic transform. The convolution coefficients are less
+    than NTT_MODULUS as long as the shorter operand has less than
+    12 million digits.
+
+    Returns:
+        The limbs of the product
+
+    Raises:
+        ValueError if the product has more than NTT_MAX_LENGTH digits
+    """
+    x, y = limbs_to_pieces(a, 1), limbs_to_pieces(b, 1)
+    length = len(x) + len(y) - 1
+    transform_length = 1 << (length - 1).bit_length()
+    if transform_length > NTT_MAX_LENGTH:
+        raise ValueError('Product of {} digits is too long for a transform modulo {}'.format(length, NTT_MODULUS))
+    transforms = []
+    for pieces in [x, y]:
+        padded = numpy.zeros(transform_length, dtype=numpy.uint64)
+        padded[:len(pieces)] = pieces
+        transforms.append(ntt(padded))
+    product = ntt(transforms[0] * transforms[1] % numpy.uint64(NTT_MODULUS), invert=True)[:length]
+    return pieces_to_limbs(propagate_carries(product.astype(numpy.int64), 10), 1)
+
+def transform_multiply(a, b):
+    """
+    Multiply the limbs a and b with fft_multiply, or with ntt_multiply
+    if the FFT was not accurate enough. Products too long for both are
+    split with karatsuba_split.
+
+    Returns:
+        The limbs of the product
+
+    Raises:
+        ImportError if numpy is not available
+    """
+    if numpy is None:
+        raise ImportError('Transform multiplication requires numpy')
+    if not a or not b:
+        return array.array(LIMB_TYPECODE)
+    product = fft_multiply(a, b)
+    if product is None:
+        if (len(a) + len(b)) * LIMB_DIGITS > NTT_MAX_LENGTH:
+            return karatsuba_split(a, b, transform_multiply)
+        product = ntt_multiply(a, b)
+    return product
+
+def multiply_limbs(a, b, thresholds=None):
+    """
+    Multiply the limbs a and b, choosing the algorithm at every level
+    of the recursion by the size of the operands:
+        transform_multiply above the transform_cutoff threshold, if
+        numpy is available
+        schoolbook_multiply up to the schoolbook_cutoff threshold
+        karatsuba_split up to the toom3_cutoff threshold, and for
+        operands of very different lengths
+        toom3_split above it
+
+    Args:
+        thresholds - a dictionary like DEFAULT_THRESHOLDS, defaults to
+                     the thresholds loaded at import
+
+    Returns:
+        The limbs of the product
+    """
+    if thresholds is None:
+        thresholds = THRESHOLDS
+    size = min(len(a), len(b))
+    if numpy is not None and size > thresholds['transform_cutoff']:
+        return transform_multiply(a, b)
+    if size <= max(thresholds['schoolbook_cutoff'], 2):
+        return schoolbook_multiply(a, b)
+    multiply = lambda x, y: multiply_limbs(x, y, thresholds)
+    if size <= thresholds['toom3_cutoff'] or 2 * size < max(len(a), len(b)):
+        return karatsuba_split(a, b, multiply)
+    return toom3_split(a, b, multiply)
+
+def multiply_in_worker(shared_memory_name, x_span, y_span, product_offset, thresholds):
+    """
+    Multiply two operands in a shared memory block with multiply_limbs
+    and write the product to the block, run in the worker processes of
+    parallel_multiply_limbs
+
+    Args:
+        x_span, y_span - (offset, length) tuples of the operands in
+                         limbs from the start of the block
+        product_offset - offset in limbs to write the product to, with
+                         room for the total length of the operands
+
+    Returns:
+        The length of the product in limbs
+    """
+    itemsize = array.array(LIMB_TYPECODE).itemsize
+    shared = shared_memory.SharedMemory(name=shared_memory_name)
+    try:
+        operands = []
+        for offset, length in [x_span, y_span]:
+            limbs = array.array(LIMB_TYPECODE)
+            limbs.frombytes(shared.buf[offset * itemsize:(offset + length) * itemsize])
+            operands.append(limbs)
+        product = multiply_limbs(operands[0], operands[1], thresholds)
+        shared.buf[product_offset * itemsize:(product_offset + len(product)) * itemsize] = \
+            memoryview(product).cast('B')
+        return len(product)
+    finally:
+        shared.close()
+
+def parallel_multiply_limbs(a, b, workers, thresholds=None):
+    """
+    Multiply the limbs a and b on several cores. The upper levels of
+    the Karatsuba recursion are expanded until there are at least two
+    subproducts per worker, or the subproducts have at most
+    parallel_cutoff limbs. The subproducts are multiplied with
+    multiply_limbs in a ProcessPoolExecutor, their operands and
+    products are passed in one shared memory block, only the offsets
+    into it are pickled. The products are combined in this process.
+
+    Operands of at most parallel_cutoff limbs are multiplied serially
+    by multiply_limbs. With numpy available, the workers multiply the
+    subproducts with transform_multiply.
+
+    Args:
+        workers - the number of worker processes
+        thresholds - as for multiply_limbs
+
+    Returns:
+        The limbs of the product
+    """
+    if thresholds is None:
+        thresholds = THRESHOLDS
+    size = min(len(a), len(b))
+    if workers <= 1 or size <= thresholds['parallel_cutoff']:
+        return multiply_limbs(a, b, thresholds)
+
+    depth = 1
+    while 3 ** depth < 2 * workers:
+        depth += 1
+    #Inner nodes are (length, m, children) tuples, leaves are indices of
+    #the subproducts multiplied by the workers
+    subproducts = []
+    def expand(x, y, level):
+        if level == depth or min(len(x), len(y)) <= thresholds['parallel_cutoff']:
+            subproducts.append((x, y))
+            return len(subproducts) - 1
+        m, operands = karatsuba_subproducts(x, y)
+        return (len(x) + len(y), m, [expand(x_part, y_part, level + 1) for x_part, y_part in operands])
+    tree = expand(a, b, 0)
+
+    spans = []
+    offset = 0
+    for x, y in subproducts:
+        spans.append(((offset, len(x)), (offset + len(x), len(y)), offset + len(x) + len(y)))
+        offset += 2 * (len(x) + len(y))
+    itemsize = array.array(LIMB_TYPECODE).itemsize
+    shared = shared_memory.SharedMemory(create=True, size=max(offset, 1) * itemsize)
+    try:
+        for (x, y), (x_span, y_span, product_offset) in zip(subproducts, spans):
+            for limbs, (span_offset, length) in [(x, x_span), (y, y_span)]:
+                shared.buf[span_offset * itemsize:(span_offset + length) * itemsize] = memoryview(limbs).cast('B')
+
+        products = [None] * len(subproducts)
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+            #Largest subproducts first, so no worker is left with one at the end
+            order = sorted(range(len(subproducts)),
+                           key=lambda index: -(len(subproducts[index][0]) + len(subproducts[index][1])))
+            futures = {index : executor.submit(multiply_in_worker, shared.name, *spans[index], thresholds)
+                       for index in order}
+            for index, future in futures.items():
+                product_offset = spans[index][2]
+                product = array.array(LIMB_TYPECODE)
+                product.frombytes(shared.buf[product_offset * itemsize:(product_offset + future.result()) * itemsize])
+                products[index] = product
+    finally:
+        shared.close()
+        shared.unlink()
+
+    def combine(node):
+        if isinstance(node, int):
+            return products[node]
+        length, m, children = node
+        return karatsuba_combine(length, m, [combine(child) for child in children])
+    return combine(tree)
+
+def karatsuba(x, y, cutoff=None, workers=None):
+    """
+    Multiply two non negative integers given as strings of decimal
+    digits, e.g. karatsuba('12', '34') == '408'
+
+    Args:
+        cutoff - overrides the schoolbook_cutoff threshold of
+                 multiply_limbs
+        workers - the number of processes to multiply large operands
+                  with, see parallel_multiply_limbs, by default they are
+                  multiplied in this process. With numpy a single
+                  transform_multiply is faster than starting the
+                  workers unless the operands are very large, so the
+                  tuned parallel_cutoff is much higher with numpy
+
+    Returns:
+        The product as a string of decimal digits
+
+    Raises:
+        ValueError if x or y is not a string of decimal digits
+    """
+    multiply_thresholds = THRESHOLDS
+    if cutoff is not None:
+        multiply_thresholds = dict(THRESHOLDS, schoolbook_cutoff=cutoff)
+    if workers is not None and workers > 1:
+        return from_limbs(parallel_multiply_limbs(to_limbs(x), to_limbs(y), workers, multiply_thresholds))
+    return from_limbs(multiply_limbs(to_limbs(x), to_limbs(y), multiply_thresholds))
@@ -0,0 +1,315 @@
+#!/usr/bin/python3
+
+"""
+Benchmark of the multiplication algorithms of the karatsuba package.
+It imports the package, so run it as a module from the repository root:
+
+    python3 -m karatsuba.karatsuba_bench
+    python3 -m karatsuba.karatsuba_bench --tune
+"""
+
+"""
+Standard python import statements
+"""
+import argparse
+import collections
+import os
+import random
+import statistics
+import sys
+import timeit
+
+"""
+Custom python import statements
+"""
+from karatsuba.karatsuba import *
+
+Timing = collections.namedtuple('Timing', ['best', 'median', 'mean', 'stdev', 'number', 'repeat'])
+
+def time_function(function, repeat):
+    """
+    Time function with timeit, calling it often enough per run that a
+    run takes at least 0.2 seconds
+
+    Returns:
+        A Timing of the seconds per call over the repeat runs
+    """
+    timer = timeit.Timer(function)
+    number, elapsed = timer.autorange()
+    run_times = [elapsed / number] + [run_time / number
+                                      for run_time in timer.repeat(repeat=repeat - 1, number=number)]
+    return Timing(min(run_times), statistics.median(run_times), statistics.mean(run_times),
+                  statistics.stdev(run_times) if len(run_times) > 1 else 0.0, number, len(run_times))
+
+def random_operand(digits, generator):
+    """
+    Returns:
+        A random string of exactly digits decimal digits
+    """
+    return str(generator.randint(1, 9)) + ''.join(generator.choice('0123456789') for digit in range(digits - 1))
+
+def multiplication_algorithms(workers=2):
+    """
+    Args:
+        workers - the number of processes of the parallel algorithm
+
+    Returns:
+        An ordered dictionary of algorithm names to functions taking
+        two strings of decimal digits and returning a function which
+        multiplies them, with the operands already converted
+    """
+    def builtin_multiply(x, y):
+        x, y = int(x), int(y)
+        return lambda: x * y
+
+    def limbs_multiply(multiply):
+        def prepare(x, y):
+            a, b = to_limbs(x), to_limbs(y)
+            return lambda: multiply(a, b)
+        return prepare
+
+    algorithms = collections.OrderedDict([('builtin', builtin_multiply),
+                                          ('schoolbook', limbs_multiply(schoolbook_multiply)),
+                                          ('karatsuba', limbs_multiply(karatsuba_multiply)),
+                                          ('toom3', limbs_multiply(toom3_multiply))])
+    if numpy is not None:
+        algorithms['fft'] = limbs_multiply(fft_multiply)
+        algorithms['ntt'] = limbs_multiply(ntt_multiply)
+    algorithms['dispatch'] = limbs_multiply(multiply_limbs)
+    algorithms['parallel'] = limbs_multiply(lambda a, b: parallel_multiply_limbs(a, b, workers))
+    return algorithms
+
+def operand_sizes(min_digits, max_digits, steps_per_decade):
+    """
+    Returns:
+        A list of geometrically spaced digit counts from min_digits to
+        max_digits
+    """
+    sizes = []
+    size = min_digits
+    while size < max_digits:
+        sizes.append(int(round(size)))
+        size *= 10 ** (1 / steps_per_decade)
+    sizes.append(max_digits)
+    return sorted(set(sizes))
+
+def sweep(sizes, algorithms, repeat, time_limit, generator, report=None):
+    """
+    Time each algorithm on random operands of each size. An algorithm
+    is not timed on larger operands once a call took more than
+    time_limit seconds.
+
+    Args:
+        report - called with each size, algorithm name and Timing
+
+    Returns:
+        A dictionary of (size, algorithm name) to Timing
+    """
+    timings = {}
+    too_slow = set()
+    for size in sizes:
+        x, y = random_operand(size, generator), random_operand(size, generator)
+        for name, algorithm in algorithms.items():
+            if name in too_slow:
+                continue
+            timing = time_function(algorithm(x, y), repeat)
+            timings[(size, name)] = timing
+            if report:
+                report(size, name, timing)
+            if timing.best > time_limit:
+                too_slow.add(name)
+    return timings
+
+def fastest_threshold(candidates, time_with_threshold):
+    """
+    Find the threshold below which a recursive algorithm leaves the
+    multiplication to its base case, e.g. schoolbook below Karatsuba,
+    by timing whole multiplications large enough to recurse into
+    subproducts of all candidate sizes
+
+    Args:
+        candidates - threshold values to try
+        time_with_threshold - returns the time of a multiplication
+                              with a candidate as the threshold
+
+    Returns:
+        The candidate with the fastest multiplication
+    """
+    return min(candidates, key=time_with_threshold)
+
+def tune_schoolbook_cutoff(candidates, repeat, generator):
+    """
+    Returns:
+        The schoolbook_cutoff threshold for this host
+    """
+    size = 16 * max(candidates)
+    a = to_limbs(random_operand(size * LIMB_DIGITS, generator))
+    b = to_limbs(random_operand(size * LIMB_DIGITS, generator))
+    return fastest_threshold(candidates,
+                             lambda cutoff: time_function(lambda: karatsuba_multiply(a, b, cutoff=cutoff),
+                                                          repeat).median)
+
+def tune_toom3_cutoff(candidates, schoolbook_cutoff, repeat, generator):
+    """
+    Returns:
+        The toom3_cutoff threshold for this host, with schoolbook_cutoff
+        already tuned
+    """
+    size = 4 * max(candidates)
+    a = to_limbs(random_operand(size * LIMB_DIGITS, generator))
+    b = to_limbs(random_operand(size * LIMB_DIGITS, generator))
+
+    def time_with_threshold(cutoff):
+        #Without the transform, which would otherwise multiply the whole operands
+        thresholds = dict(THRESHOLDS, schoolbook_cutoff=schoolbook_cutoff, toom3_cutoff=cutoff,
+                          transform_cutoff=sys.maxsize)
+        return time_function(lambda: multiply_limbs(a, b, thresholds), repeat).median
+
+    return fastest_threshold(candidates, time_with_threshold)
+
+def tune_transform_cutoff(candidates, schoolbook_cutoff, toom3_cutoff, repeat, generator):
+    """
+    transform_multiply does not recurse, so unlike the other thresholds
+    it is the last candidate size at which the recursive algorithms
+    still were at least as fast
+
+    Returns:
+        The transform_cutoff threshold for this host, with the other
+        thresholds already tuned
+    """
+    recursive_thresholds = dict(THRESHOLDS, schoolbook_cutoff=schoolbook_cutoff, toom3_cutoff=toom3_cutoff,
+                                transform_cutoff=sys.maxsize)
+    cutoff = candidates[0]
+    for size in candidates:
+        a = to_limbs(random_operand(size * LIMB_DIGITS, generator))
+        b = to_limbs(random_operand(size * LIMB_DIGITS, generator))
+        if (time_function(lambda: multiply_limbs(a, b, recursive_thresholds), repeat).median <=
+                time_function(lambda: transform_multiply(a, b), repeat).median):
+            cutoff = size
+    return cutoff
+
+def tune_parallel_cutoff(candidates, thresholds, workers, repeat, generator):
+    """
+    Like transform_cutoff, the last candidate size at which multiplying
+    in this process was still at least as fast as parallel_multiply_limbs
+    with workers processes, including starting the workers
+
+    Returns:
+        The parallel_cutoff threshold for this host, with the other
+        thresholds already tuned
+    """
+    parallel_thresholds = dict(thresholds, parallel_cutoff=1)
+    cutoff = candidates[0]
+    for size in candidates:
+        a = to_limbs(random_operand(size * LIMB_DIGITS, generator))
+        b = to_limbs(random_operand(size * LIMB_DIGITS, generator))
+        if (time_function(lambda: multiply_limbs(a, b, thresholds), repeat).median <=
+                time_function(lambda: parallel_multiply_limbs(a, b, workers, parallel_thresholds), repeat).median):
+            cutoff = size
+    return cutoff
+
+def tune_thresholds(repeat, generator, workers):
+    """
+    parallel_cutoff is only measured with more than one worker,
+    otherwise parallel_multiply_limbs never starts a worker and it
+    keeps its current value
+
+    Args:
+        workers - the number of processes to tune parallel_cutoff for
+
+    Returns:
+        A dictionary like DEFAULT_THRESHOLDS, measured on this host
+    """
+    measured = {}
+    measured['schoolbook_cutoff'] = tune_schoolbook_cutoff([8, 12, 16, 24, 32, 48, 64, 96, 128, 192, 256],
+                                                           repeat, generator)
+    measured['toom3_cutoff'] = tune_toom3_cutoff([100, 150, 200, 300, 400, 600, 800, 1200],
+                                                 measured['schoolbook_cutoff'], repeat, generator)
+    if numpy is not None:
+        measured['transform_cutoff'] = tune_transform_cutoff([16, 24, 32, 48, 64, 96, 128, 192, 256, 384, 512],
+                                                             measured['schoolbook_cutoff'],
+                                                             measured['toom3_cutoff'], repeat, generator)
+    if workers > 1:
+        measured['parallel_cutoff'] = tune_parallel_cutoff([500, 1000, 2000, 4000, 8000, 16000],
+                                                           dict(THRESHOLDS, **measured), workers, repeat, generator)
+    return measured
+
+def print_timing(size, name, timing):
+    print('{:>9} digits  {:<12} best {:12.6f} ms  median {:12.6f} ms  stdev {:6.2f}%  ({}x{})'.format(
+        size, name, timing.best * 1e3, timing.median * 1e3,
+        100 * timing.stdev / timing.mean if timing.mean else 0.0, timing.repeat, timing.number))
+    sys.stdout.flush()
+
+def beats(timing, other_timing):
+    """
+    Returns:
+        True if timing is faster than other_timing by more than the
+        noise of either, their stdev
+    """
+    return other_timing.median - timing.median > max(timing.stdev, other_timing.stdev)
+
+def print_crossovers(sizes, algorithms, timings):
+    """
+    Print the smallest size from which each algorithm beats each other
+    algorithm at all measured larger sizes, see beats
+    """
+    for name in algorithms:
+        for other in algorithms:
+            if name == other:
+                continue
+            measured = [size for size in sizes if (size, name) in timings and (size, other) in timings]
+            wins = [beats(timings[(size, name)], timings[(size, other)]) for size in measured]
+            if not wins or not wins[-1]:
+                continue
+            crossover = measured[-1]
+            for size, win in reversed(list(zip(measured, wins))):
+                if not win:
+                    break
+                crossover = size
+            print('{} beats {} from {} digits'.format(name, other, crossover))
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the multiplication algorithms and tune their thresholds')
+    parser.add_argument('--min-digits', type=int, default=10,
+                        help='smallest operand size in decimal digits')
+    parser.add_argument('--max-digits', type=int, default=1000000,
+                        help='largest operand size in decimal digits')
+    parser.add_argument('--steps', type=int, default=3,
+                        help='number of operand sizes per decade')
+    parser.add_argument('-r', '--repeat', type=int, default=5,
+                        help='number of timed runs per algorithm and size')
+    parser.add_argument('--time-limit', type=float, default=10.0,
+                        help='seconds per multiplication after which larger sizes are skipped')
+    parser.add_argument('-a', '--algorithm', action='append', choices=list(multiplication_algorithms()),
+                        help='algorithm to time, all by default')
+    parser.add_argument('--tune', action='store_true',
+                        help='measure the thresholds of this host and write them to --output')
+    parser.add_argument('-o', '--output', default=THRESHOLDS_FILE,
+                        help='thresholds file loaded by the karatsuba module')
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count() or 1,
+                        help='number of processes of the parallel algorithm, and to tune parallel_cutoff for')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='seed of the random operands')
+    args = parser.parse_args()
+
+    if hasattr(sys, 'set_int_max_str_digits'):
+        sys.set_int_max_str_digits(0)
+    generator = random.Random(args.seed)
+
+    if args.tune:
+        measured = tune_thresholds(args.repeat, generator, args.workers)
+        save_thresholds(measured, args.output)
+        for name, value in sorted(measured.items()):
+            print('{} = {} limbs (was {})'.format(name, value, THRESHOLDS[name]))
+        print('Written to', args.output)
+        return
+
+    algorithms = multiplication_algorithms(args.workers)
+    if args.algorithm:
+        algorithms = collections.OrderedDict((name, algorithms[name]) for name in args.algorithm)
+    sizes = operand_sizes(args.min_digits, args.max_digits, args.steps)
+    timings = sweep(sizes, algorithms, args.repeat, args.time_limit, generator, report=print_timing)
+    print_crossovers(sizes, algorithms, timings)
+
+if __name__ == '__main__':
+    main()
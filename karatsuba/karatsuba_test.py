@@ -4,234 +4,265 @@
 Standard python import statements
 """
 import unittest
-import math
+import random
 import sys
+import tempfile
+import os
+import concurrent.futures
+import unittest.mock
 
-def is_multiple_of_2(x):
-    """
-    Returns True if x is an even multiple of 2, False otherwise
-    """
-    return (x % 2 == 0)
-
-def is_power_of_2(x):
-    """
-    Returns True if x is a power of 2, False otherwise
-    """
-    assert(x > 0)
-    return (x & (x - 1) == 0)
-
-def lengthen(x, length_to_extend_to):
-    """
-    Multiply x by 10 until its length is equal to
-    length_to_extend_to.
-
-    Returns:
-        A list with 2 elements:
-            1. The new value of x as a string
-            2. How much the length of x increased by
-    """
-    assert(type(x) == str)
-    length_of_x = len(x)
-    assert(length_of_x <= length_to_extend_to)
-    new_x_length = length_of_x
-    x_multiplicand = 1
-    while new_x_length != length_to_extend_to:
-        new_x_length = new_x_length + 1
-        x_multiplicand = x_multiplicand * 10
-
-    return [str(int(x) * x_multiplicand), new_x_length - length_of_x]
-
-def increase_to_next_power_of_2(x):
-    """
-    Increment x until it is a power of 2
-
-    Returns:
-        The incremented value of x, now a power of 2
-    """
-    new_x = x
-    while(is_power_of_2(new_x) is False):
-        new_x = new_x + 1
-
-    return new_x
-
-def _karatsuba(x, y):
-    assert(type(x) == str)
-    assert(type(y) == str)
-
-    length_of_x = len(x)
-    length_of_y = len(y)
-
-    assert(length_of_x == length_of_y)
-    # print(length_of_x)
-    # print(length_of_y)
-
-    result = 0
-
-    if((length_of_x == 1) or (length_of_y == 1)):
-        result = int(x) * int(y)
-        print('result = ', result, '\n')
-    else:
-
-        max_length = max(length_of_x, length_of_y)
-        max_length = increase_to_next_power_of_2(max_length)
-        print('max_length = ', max_length)
-
-        [x, x_multiplicand] = lengthen(x, max_length)
-        [y, y_multiplicand] = lengthen(y, max_length)
-
-        x_multiplicand = x_multiplicand * 10
-        y_multiplicand = y_multiplicand * 10
-
-        if x_multiplicand == 0:
-            x_multiplicand = 1
-
-        if y_multiplicand == 0:
-            y_multiplicand = 1
-
-        print('new x 1 = ', x)
-        print('new y 1 = ', y)
-
-        # m = min(new_x_length, new_y_length)
-        m = max_length
-        m2 = int(math.floor(int(m)/2))
-
-        print('m2 = ', m2)
-
-        a = x[ : m2]
-        b = x[   m2 : ]
-
-        c = y[ : m2]
-        d = y[   m2 : ]
-
-        print('a = ', a)
-        print('b = ', b)
-        print('c = ', c)
-        print('d = ', d)
-
-        a_c = _karatsuba(a, c)
-        a_d = _karatsuba(a, d)
-        b_c = _karatsuba(b, c)
-        b_d = _karatsuba(b, d)
-        print('\na_c = ', a_c)
-        print('a_d = ',   a_d)
-        print('b_c = ',   b_c)
-        print('b_d = ',   b_d)
-
-        # first_term = math.pow(10, m2 * 2) * int(a_c)
-        first_term = int(karatsuba(str(int(math.pow(10, m2 * 2))), a_c))
-        print('first_term = ', first_term, ', m2 = ', m2)
-        second_term = math.pow(10, m2) * (int(a_d) + int(b_c))
-        print('second_term = ', second_term, ', m2 = ', m2)
-        result = first_term + second_term + int(b_d)
-        print('result = ', result, ', m2 = ', m2)
-
-        result = int(int(result) / (x_multiplicand * y_multiplicand))
-
-    return str(result)
-
-def karatsuba(x, y):
-
-    assert(type(x) == str)
-    assert(type(y) == str)
-
-    length_of_x = len(x)
-    length_of_y = len(y)
-
-    max_length = max(length_of_x, length_of_y)
-    max_length = increase_to_next_power_of_2(max_length)
-    print('max_length = ', max_length)
-
-    [x, x_multiplicand] = lengthen(x, max_length)
-    [y, y_multiplicand] = lengthen(y, max_length)
-
-    x_multiplicand = x_multiplicand * 10
-    y_multiplicand = y_multiplicand * 10
-
-    if x_multiplicand == 0:
-        x_multiplicand = 1
-
-    if y_multiplicand == 0:
-        y_multiplicand = 1
-
-    print('new x 2 = ', x, ', x_multiplicand = ', x_multiplicand)
-    print('new y 2 = ', y, ', y_multiplicand = ', y_multiplicand)
-
-    result = _karatsuba(x, y)
-    result = int(int(result) / (x_multiplicand * y_multiplicand))
-    return str(result)
+"""
+Custom python import statements
+"""
+from karatsuba.karatsuba import *
 
 class KaratsubaTest(unittest.TestCase):
     """
     Tests of the karatsuba integer multiplication algorithm.
     """
 
-    # def test_is_multiple_of_2(self):
-        # self.assertEqual(True, is_multiple_of_2(2))
-        # self.assertEqual(False, is_multiple_of_2(3))
-        # self.assertEqual(True, is_multiple_of_2(4))
-        # self.assertEqual(True, is_multiple_of_2(6))
-        # self.assertEqual(True, is_multiple_of_2(8))
-        # self.assertEqual(True, is_multiple_of_2(10))
-        # self.assertEqual(False, is_multiple_of_2(11))
-        # self.assertEqual(True, is_multiple_of_2(100000))
-
-    # def test_lengthen(self):
-        # self.assertEqual(['1',   0],   lengthen('1', 1))
-        # self.assertEqual(['10',  1],  lengthen('1', 2))
-        # self.assertEqual(['100', 2], lengthen('1', 3))
-        # self.assertEqual(['123', 0], lengthen('123', 3))
-
-    # def test_is_power_of_2(self):
-        # self.assertEqual(True,  is_power_of_2(1))
-        # self.assertEqual(True,  is_power_of_2(2))
-        # self.assertEqual(False, is_power_of_2(3))
-        # self.assertEqual(True,  is_power_of_2(4))
-        # self.assertEqual(False, is_power_of_2(5))
-        # self.assertEqual(False, is_power_of_2(6))
-        # self.assertEqual(False, is_power_of_2(7))
-        # self.assertEqual(True,  is_power_of_2(8))
-        # self.assertEqual(True,  is_power_of_2(16))
-        # self.assertEqual(False, is_power_of_2(17))
-        # self.assertEqual(True,  is_power_of_2(32))
-        # self.assertEqual(True,  is_power_of_2(64))
-        # self.assertEqual(False, is_power_of_2(65))
-
-    # def test_increase_to_next_power_of_2(self):
-        # self.assertEqual(1, increase_to_next_power_of_2(1))
-        # self.assertEqual(2, increase_to_next_power_of_2(2))
-        # self.assertEqual(4, increase_to_next_power_of_2(3))
-        # self.assertEqual(4, increase_to_next_power_of_2(4))
-        # self.assertEqual(8, increase_to_next_power_of_2(5))
-        # self.assertEqual(8, increase_to_next_power_of_2(6))
-        # self.assertEqual(8, increase_to_next_power_of_2(7))
-        # self.assertEqual(8, increase_to_next_power_of_2(8))
-
-    # def test_karatsuba_small_1(self):
-        # self.assertEqual('1', karatsuba('1', '1'))
+    def test_is_multiple_of_2(self):
+        self.assertEqual(True, is_multiple_of_2(2))
+        self.assertEqual(False, is_multiple_of_2(3))
+        self.assertEqual(True, is_multiple_of_2(4))
+        self.assertEqual(True, is_multiple_of_2(6))
+        self.assertEqual(True, is_multiple_of_2(8))
+        self.assertEqual(True, is_multiple_of_2(10))
+        self.assertEqual(False, is_multiple_of_2(11))
+        self.assertEqual(True, is_multiple_of_2(100000))
+
+    def test_lengthen(self):
+        self.assertEqual(['1',   0],   lengthen('1', 1))
+        self.assertEqual(['10',  1],  lengthen('1', 2))
+        self.assertEqual(['100', 2], lengthen('1', 3))
+        self.assertEqual(['123', 0], lengthen('123', 3))
+
+    def test_is_power_of_2(self):
+        self.assertEqual(True,  is_power_of_2(1))
+        self.assertEqual(True,  is_power_of_2(2))
+        self.assertEqual(False, is_power_of_2(3))
+        self.assertEqual(True,  is_power_of_2(4))
+        self.assertEqual(False, is_power_of_2(5))
+        self.assertEqual(False, is_power_of_2(6))
+        self.assertEqual(False, is_power_of_2(7))
+        self.assertEqual(True,  is_power_of_2(8))
+        self.assertEqual(True,  is_power_of_2(16))
+        self.assertEqual(False, is_power_of_2(17))
+        self.assertEqual(True,  is_power_of_2(32))
+        self.assertEqual(True,  is_power_of_2(64))
+        self.assertEqual(False, is_power_of_2(65))
+
+    def test_increase_to_next_power_of_2(self):
+        self.assertEqual(1, increase_to_next_power_of_2(1))
+        self.assertEqual(2, increase_to_next_power_of_2(2))
+        self.assertEqual(4, increase_to_next_power_of_2(3))
+        self.assertEqual(4, increase_to_next_power_of_2(4))
+        self.assertEqual(8, increase_to_next_power_of_2(5))
+        self.assertEqual(8, increase_to_next_power_of_2(6))
+        self.assertEqual(8, increase_to_next_power_of_2(7))
+        self.assertEqual(8, increase_to_next_power_of_2(8))
+
+    def test_karatsuba_small_0(self):
+        self.assertEqual('1', karatsuba('1', '1'))
 
     def test_karatsuba_small_1(self):
         self.assertEqual('100', karatsuba('10', '10'))
 
-    # def test_karatsuba_small_2(self):
-        # self.assertEqual('4', karatsuba('2', '2'))
-
-    # def test_karatsuba_medium_1(self):
-        # self.assertEqual('408', karatsuba('12', '34'))
-
-    # def test_karatsuba_medium_2(self):
-        # self.assertEqual('56088', karatsuba('123', '456'))
-
-    # def test_karatsuba_medium_3(self):
-        # self.assertEqual('5635678', karatsuba('1234', '4567'))
-
-    # def test_karatsuba_medium_4(self):
-        # self.assertEqual('152415765279684', karatsuba('12345678', '12345678'))
-
-    # def test_karatsuba_large(self):
-        # operand1 = '3141592653589793238462643383279502884197169399375105820974944592'
-        # operand2 = '2718281828459045235360287471352662497757247093699959574966967627'
-        # expected_result = '8539734222673567065463550869546574495034888535765114961879601127067743044893204848617875072216249073013374895871952806582723184'
-        # self.assertEqual(expected_result, karatsuba(operand1, operand2))
+    def test_karatsuba_small_2(self):
+        self.assertEqual('4', karatsuba('2', '2'))
+
+    def test_karatsuba_medium_1(self):
+        self.assertEqual('408', karatsuba('12', '34'))
+
+    def test_karatsuba_medium_2(self):
+        self.assertEqual('56088', karatsuba('123', '456'))
+
+    def test_karatsuba_medium_3(self):
+        self.assertEqual('5635678', karatsuba('1234', '4567'))
+
+    def test_karatsuba_medium_4(self):
+        self.assertEqual('152415765279684', karatsuba('12345678', '12345678'))
+
+    def test_karatsuba_large(self):
+        operand1 = '3141592653589793238462643383279502884197169399375105820974944592'
+        operand2 = '2718281828459045235360287471352662497757247093699959574966967627'
+        expected_result = '8539734222673567065463550869546574495034888535765114961879601127067743044893204848617875072216249073013374895871952806582723184'
+        self.assertEqual(expected_result, karatsuba(operand1, operand2))
+        for cutoff in (1, 2, 3):
+            self.assertEqual(expected_result, karatsuba(operand1, operand2, cutoff=cutoff))
+
+    def test_karatsuba_zeros(self):
+        self.assertEqual('0', karatsuba('0', '12345678901234567890'))
+        self.assertEqual('0', karatsuba('000', '0'))
+        self.assertEqual('1000000000000000000', karatsuba('1000000000', '000001000000000'))
+        self.assertRaises(ValueError, karatsuba, '-12', '34')
+        self.assertRaises(ValueError, karatsuba, '12', 34)
+
+    def test_karatsuba_random(self):
+        """
+        Compare to Python ints for operands with many zero limbs and
+        unbalanced lengths, with cutoffs small enough that every path
+        of karatsuba_multiply is taken
+        """
+        generator = random.Random(2718)
+        for run in range(50):
+            digits = [generator.choice('0123456789' if run % 2 else '0000000009')
+                      for digit in range(generator.randint(1, 2000))]
+            x = ''.join(digits).lstrip('0') or '0'
+            y = str(generator.getrandbits(generator.randint(1, 6000)))
+            product = karatsuba_multiply(to_limbs(x), to_limbs(y), cutoff=generator.randint(1, 8))
+            self.assertEqual(str(int(x) * int(y)), from_limbs(product))
+
+    def test_limbs(self):
+        limbs = to_limbs('1234567890123456789')
+        self.assertEqual([123456789, 234567890, 1], limbs.tolist())
+        self.assertEqual('1234567890123456789', from_limbs(limbs))
+        self.assertEqual(0, len(to_limbs('000000000000')))
+        self.assertEqual('0', from_limbs(to_limbs('0')))
+
+    def test_karatsuba_30000_digits(self):
+        if hasattr(sys, 'set_int_max_str_digits'):
+            self.addCleanup(sys.set_int_max_str_digits, sys.get_int_max_str_digits())
+            sys.set_int_max_str_digits(0)
+        x = str(random.Random(31415).getrandbits(99658))
+        y = str(random.Random(27182).getrandbits(99658))
+        self.assertEqual(str(int(x) * int(y)), karatsuba(x, y))
+
+class ToomCookTest(unittest.TestCase):
+    def test_toom3_large(self):
+        operand1 = to_limbs('3141592653589793238462643383279502884197169399375105820974944592')
+        operand2 = to_limbs('2718281828459045235360287471352662497757247093699959574966967627')
+        expected_result = '8539734222673567065463550869546574495034888535765114961879601127067743044893204848617875072216249073013374895871952806582723184'
+        for cutoff in (2, 3, 4):
+            self.assertEqual(expected_result, from_limbs(toom3_multiply(operand1, operand2, cutoff)))
+
+    def test_toom3_random(self):
+        """
+        Compare to Python ints, with evaluations at -1 and -2 of either
+        sign and operands of unbalanced lengths and with zero parts
+        """
+        if hasattr(sys, 'set_int_max_str_digits'):
+            self.addCleanup(sys.set_int_max_str_digits, sys.get_int_max_str_digits())
+            sys.set_int_max_str_digits(0)
+        generator = random.Random(3141)
+        for run in range(50):
+            x = generator.getrandbits(generator.randint(1, 6000))
+            y = generator.getrandbits(generator.randint(1, 6000))
+            if run % 4 == 0:
+                x >>= x.bit_length() // 2
+                x <<= x.bit_length()
+            a, b = to_limbs(str(x)), to_limbs(str(y))
+            self.assertEqual(str(x * y), from_limbs(toom3_multiply(a, b, cutoff=generator.randint(2, 6))))
+            thresholds = dict(DEFAULT_THRESHOLDS, schoolbook_cutoff=generator.randint(1, 6),
+                              toom3_cutoff=generator.randint(3, 40), transform_cutoff=sys.maxsize)
+            self.assertEqual(str(x * y), from_limbs(multiply_limbs(a, b, thresholds)))
+
+    def test_signed_limbs(self):
+        self.assertEqual((True, to_limbs('999999999')), signed_subtract((False, to_limbs('1')),
+                                                                         (False, to_limbs('1000000000'))))
+        self.assertEqual((False, to_limbs('0')), signed_add((True, to_limbs('5')), (False, to_limbs('5'))))
+        self.assertEqual((False, to_limbs('0')), signed_subtract((False, to_limbs('0')), (False, to_limbs('0'))))
+        self.assertEqual(to_limbs('41152263374485596707818930041'),
+                         divide_limbs_exactly(to_limbs('123456790123456790123456790123'), 3))
+        self.assertEqual(-1, compare_limbs(to_limbs('999999999'), to_limbs('1000000000')))
+
+@unittest.skipIf(numpy is None, 'requires numpy')
+class TransformTest(unittest.TestCase):
+    def setUp(self):
+        if hasattr(sys, 'set_int_max_str_digits'):
+            self.addCleanup(sys.set_int_max_str_digits, sys.get_int_max_str_digits())
+            sys.set_int_max_str_digits(0)
+
+    def test_transforms_random(self):
+        generator = random.Random(2718)
+        for run in range(50):
+            x = generator.getrandbits(generator.randint(1, 30000))
+            y = generator.getrandbits(generator.randint(1, 30000))
+            if run % 5 == 0:
+                x, y = 10 ** generator.randint(1, 3000) - 1, 10 ** generator.randint(1, 3000) - 1
+            a, b = to_limbs(str(x)), to_limbs(str(y))
+            self.assertEqual(str(x * y), from_limbs(fft_multiply(a, b)))
+            self.assertEqual(str(x * y), from_limbs(ntt_multiply(a, b)))
+            thresholds = dict(DEFAULT_THRESHOLDS, schoolbook_cutoff=4, toom3_cutoff=8,
+                              transform_cutoff=generator.randint(4, 200))
+            self.assertEqual(str(x * y), from_limbs(multiply_limbs(a, b, thresholds)))
+
+    def test_transform_zero(self):
+        self.assertEqual('0', from_limbs(transform_multiply(to_limbs('0'), to_limbs('123'))))
+        self.assertEqual('369', from_limbs(transform_multiply(to_limbs('3'), to_limbs('123'))))
+
+    def test_propagate_carries(self):
+        """
+        A carry out of the lowest digit ripples through all 999s
+        """
+        coefficients = numpy.array([1500, 999, 999, 998, 999, 2997], dtype=numpy.int64)
+        digits = propagate_carries(coefficients, 1000)
+        self.assertEqual([500, 0, 0, 999, 999, 997, 2], digits.tolist()[:7])
+        self.assertFalse(digits[7:].any())
+
+    def test_ntt_inverse(self):
+        values = numpy.arange(16, dtype=numpy.uint64) * 12345
+        self.assertEqual(values.tolist(), ntt(ntt(values), invert=True).tolist())
+
+class ParallelTest(unittest.TestCase):
+    def setUp(self):
+        if hasattr(sys, 'set_int_max_str_digits'):
+            self.addCleanup(sys.set_int_max_str_digits, sys.get_int_max_str_digits())
+            sys.set_int_max_str_digits(0)
+        #Counts the worker pools, which run in this process
+        patcher = unittest.mock.patch('concurrent.futures.ProcessPoolExecutor',
+                                      wraps=concurrent.futures.ProcessPoolExecutor)
+        self.process_pool = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_parallel_random(self):
+        """
+        With a low parallel_cutoff even small operands are split over
+        the workers, also when their lengths are very different
+        """
+        generator = random.Random(1414)
+        thresholds = dict(DEFAULT_THRESHOLDS, parallel_cutoff=8, transform_cutoff=sys.maxsize)
+        for workers, x_bits, y_bits in [(2, 20000, 20000), (3, 60000, 3000), (4, 5000, 40000)]:
+            x, y = generator.getrandbits(x_bits), generator.getrandbits(y_bits)
+            product = parallel_multiply_limbs(to_limbs(str(x)), to_limbs(str(y)), workers, thresholds)
+            self.assertEqual(str(x * y), from_limbs(product))
+        self.assertEqual(3, self.process_pool.call_count)
+
+    @unittest.skipIf(numpy is None, 'requires numpy')
+    def test_parallel_transform(self):
+        generator = random.Random(1732)
+        x, y = generator.getrandbits(100000), generator.getrandbits(80000)
+        thresholds = dict(DEFAULT_THRESHOLDS, parallel_cutoff=100)
+        product = parallel_multiply_limbs(to_limbs(str(x)), to_limbs(str(y)), 2, thresholds)
+        self.assertEqual(str(x * y), from_limbs(product))
+        self.assertEqual(1, self.process_pool.call_count)
+
+    def test_karatsuba_workers(self):
+        operand1 = '3141592653589793238462643383279502884197169399375105820974944592' * 100
+        operand2 = '2718281828459045235360287471352662497757247093699959574966967627' * 100
+        thresholds = dict(THRESHOLDS, parallel_cutoff=200)
+        with unittest.mock.patch.dict(THRESHOLDS, thresholds):
+            self.assertEqual(karatsuba(operand1, operand2), karatsuba(operand1, operand2, workers=2))
+        self.assertEqual(1, self.process_pool.call_count)
+        self.assertEqual('408', karatsuba('12', '34', workers=2))
+        self.assertEqual(1, self.process_pool.call_count)
+
+class ThresholdsTest(unittest.TestCase):
+    def test_save_load(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            thresholds_file = os.path.join(tmp_dir, 'host', 'thresholds.json')
+            self.assertEqual(DEFAULT_THRESHOLDS, load_thresholds(thresholds_file))
+            save_thresholds({'schoolbook_cutoff' : 20}, thresholds_file)
+            self.assertEqual(20, load_thresholds(thresholds_file)['schoolbook_cutoff'])
+            self.assertEqual(['thresholds.json'], os.listdir(os.path.dirname(thresholds_file)))
+
+    def test_invalid_thresholds_ignored(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            thresholds_file = os.path.join(tmp_dir, 'thresholds.json')
+            for contents in ['{"schoolbook_cutoff": 0}', '{"schoolbook_cutoff": "64"}', '[64]', '{"schoolbook']:
+                with open(thresholds_file, 'w') as f:
+                    f.write(contents)
+                self.assertEqual(DEFAULT_THRESHOLDS, load_thresholds(thresholds_file))
 
 if __name__ == '__main__':
     unittest.main()
@@ -5,10 +5,25 @@ Standard python import statements
 """
 import unittest
 import os
+import argparse
+import collections
+import concurrent.futures
+import itertools
 
 test_configuration_data = {
     'base_dir' : os.path.dirname(os.path.realpath(__file__)),
-    'base_output_dir' : os.path.join(os.path.dirname(os.path.realpath(__file__)), 'build')
+    'base_output_dir' : os.path.join(os.path.dirname(os.path.realpath(__file__)), 'build'),
+    'result_cache_dir' : os.path.join(os.path.dirname(os.path.realpath(__file__)), 'build', 'result_cache'),
+    'use_result_cache' : True,
+    'inspect_cache_dir' : os.path.join(os.path.dirname(os.path.realpath(__file__)), 'build', 'inspect_cache'),
+    'use_build_cache' : True,
+    'qemu_pool_size' : 2,
+    'stress_iterations' : 100,
+    'stress_concurrency' : os.cpu_count() or 1,
+    'toolchain_timeout' : 60,
+    'qemu_timeout' : 60,
+    'batch_size' : 4096,
+    'trace_dir' : os.path.join(os.path.dirname(os.path.realpath(__file__)), 'build', 'traces'),
 }
 
 class ConfigurableTestLoader(unittest.TestLoader):
@@ -28,6 +43,190 @@ class ConfigurableTestLoader(unittest.TestLoader):
         for test_case in self.list_of_configurable_tests:
             test_case.config_data = test_configuration_data
 
+class SerializableTestResult(unittest.TestResult):
+    """
+    Test result which records each outcome as a picklable
+    (test id, kind, text) tuple so it can be sent back from a worker
+    process
+    """
+    def __init__(self):
+        super(SerializableTestResult, self).__init__()
+        self.buffer = True
+        self.outcomes = []
+
+    def addSuccess(self, test):
+        super(SerializableTestResult, self).addSuccess(test)
+        self.outcomes.append((test.id(), 'success', None))
+
+    def addError(self, test, err):
+        super(SerializableTestResult, self).addError(test, err)
+        self.outcomes.append((test.id(), 'error', self.errors[-1][1]))
+
+    def addFailure(self, test, err):
+        super(SerializableTestResult, self).addFailure(test, err)
+        self.outcomes.append((test.id(), 'failure', self.failures[-1][1]))
+
+    def addSubTest(self, test, subtest, err):
+        super(SerializableTestResult, self).addSubTest(test, subtest, err)
+        if err is None:
+            return
+        if issubclass(err[0], test.failureException):
+            self.outcomes.append((test.id(), 'failure', self.failures[-1][1]))
+        else:
+            self.outcomes.append((test.id(), 'error', self.errors[-1][1]))
+
+    def addSkip(self, test, reason):
+        super(SerializableTestResult, self).addSkip(test, reason)
+        self.outcomes.append((test.id(), 'skip', reason))
+
+    def addExpectedFailure(self, test, err):
+        super(SerializableTestResult, self).addExpectedFailure(test, err)
+        self.outcomes.append((test.id(), 'expected_failure', self.expectedFailures[-1][1]))
+
+    def addUnexpectedSuccess(self, test):
+        super(SerializableTestResult, self).addUnexpectedSuccess(test)
+        self.outcomes.append((test.id(), 'unexpected_success', None))
+
+class MergedTestResult(unittest.TextTestResult):
+    """
+    Text test result which accepts the already formatted tracebacks
+    produced by SerializableTestResult in a worker process
+    """
+    def _exc_info_to_string(self, err, test):
+        if isinstance(err, str):
+            return err
+        return super(MergedTestResult, self)._exc_info_to_string(err, test)
+
+    def replay(self, test, outcomes):
+        #Fixture errors are not counted as tests run, as in the serial runner
+        counted = not isinstance(test, ReplayedTest)
+        if counted:
+            self.startTest(test)
+        for kind, payload in outcomes:
+            if kind == 'success':
+                self.addSuccess(test)
+            elif kind == 'error':
+                self.addError(test, payload)
+            elif kind == 'failure':
+                self.addFailure(test, payload)
+            elif kind == 'skip':
+                self.addSkip(test, payload)
+            elif kind == 'expected_failure':
+                self.addExpectedFailure(test, payload)
+            elif kind == 'unexpected_success':
+                self.addUnexpectedSuccess(test)
+        if counted:
+            self.stopTest(test)
+
+class ReplayedTest(object):
+    """
+    Stands in for a test which only exists in a worker process, e.g. the
+    setUpClass of a test class whose fixture failed
+    """
+    def __init__(self, description):
+        self.description = description
+
+    def id(self):
+        return self.description
+
+    def shortDescription(self):
+        return None
+
+    def __str__(self):
+        return self.description
+
+#Per process list of discovered tests, populated by init_parallel_worker
+worker_tests = None
+
+def init_parallel_worker(configuration_data):
+    """
+    Discover the tests again in a worker process and push the
+    configuration data to them, exactly as the serial runner does
+    """
+    global worker_tests
+    test_configuration_data.update(configuration_data)
+    loader = ConfigurableTestLoader()
+    worker_tests = flatten_test_suite(loader.discover('.', pattern='*test.py'))
+    loader.send_config_data()
+
+def run_tests_in_worker(test_indices, test_ids):
+    """
+    Run the tests of one test class as a unittest.TestSuite, so that its
+    setUpClass and tearDownClass, and setUpModule and tearDownModule of
+    its module, run around them as in the serial runner
+
+    Returns:
+        The outcomes recorded by a SerializableTestResult
+    """
+    tests = [worker_tests[test_index] for test_index in test_indices]
+    assert([test.id() for test in tests] == test_ids)
+    result = SerializableTestResult()
+    unittest.TestSuite(tests)(result)
+    return result.outcomes
+
+class ParallelTestSuite(object):
+    """
+    Runs the test classes of a test suite in a process pool, each class
+    as a whole in one worker, and merges the results back in discovery
+    order, so the report does not depend on which worker finished first.
+
+    Class fixtures run once per class as in the serial runner. Module
+    fixtures run once per test class instead of once per module, since
+    the classes of a module may run in different workers.
+
+    Output printed by a test is buffered in the worker and only shown
+    alongside a failure or error.
+    """
+    def __init__(self, test_suite, jobs):
+        self.tests = flatten_test_suite(test_suite)
+        self.jobs = jobs
+
+    def __call__(self, result):
+        indices = [list(class_indices) for test_class, class_indices in
+                   itertools.groupby(range(len(self.tests)), key=lambda index: type(self.tests[index]))]
+        with concurrent.futures.ProcessPoolExecutor(max_workers=self.jobs,
+                                                    initializer=init_parallel_worker,
+                                                    initargs=(test_configuration_data,)) as executor:
+            outcomes = executor.map(run_tests_in_worker,
+                                    indices,
+                                    [[self.tests[index].id() for index in class_indices]
+                                     for class_indices in indices])
+            for class_indices, class_outcomes in zip(indices, outcomes):
+                tests = {self.tests[index].id() : self.tests[index] for index in class_indices}
+                outcomes_by_test = collections.OrderedDict()
+                for test_id, kind, payload in class_outcomes:
+                    outcomes_by_test.setdefault(test_id, []).append((kind, payload))
+                for test_id, test_outcomes in outcomes_by_test.items():
+                    result.replay(tests.get(test_id) or ReplayedTest(test_id), test_outcomes)
+        return result
+
+def flatten_test_suite(test_suite):
+    """
+    Returns:
+        A list of the individual test cases in test_suite, in run order
+    """
+    tests = []
+    for test in test_suite:
+        if isinstance(test, unittest.TestSuite):
+            tests.extend(flatten_test_suite(test))
+        else:
+            tests.append(test)
+    return tests
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Run all unit tests in all subdirectories')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='number of worker processes to run individual tests in')
+    parser.add_argument('--stress-iterations', type=int,
+                        default=test_configuration_data['stress_iterations'],
+                        help='number of times stress tests run their guest')
+    parser.add_argument('--qemu-timeout', type=float,
+                        default=test_configuration_data['qemu_timeout'],
+                        help='seconds after which a hung qemu run is killed')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='run every test and toolchain step even if its result is cached')
+    return parser.parse_args()
+
 def create_test_base_output_dir():
     output_dir = test_configuration_data['base_output_dir']
     if not os.path.exists(output_dir):
@@ -50,11 +249,20 @@ if __name__ == '__main__':
     """
     Run all unit tests in all subdirectories
     """
+    args = parse_args()
+    test_configuration_data['use_result_cache'] = not args.no_cache
+    test_configuration_data['use_build_cache'] = not args.no_cache
+    test_configuration_data['stress_iterations'] = args.stress_iterations
+    test_configuration_data['qemu_timeout'] = args.qemu_timeout
     create_test_base_output_dir()
     loader = ConfigurableTestLoader()
     test_suites = loader.discover('.', pattern='*test.py')
     print_test_names(test_suites)
     loader.print_configurable_tests()
     loader.send_config_data()
-    test_runner = unittest.TextTestRunner()
-    test_runner.run(test_suites)
+    if args.jobs > 1:
+        test_runner = unittest.TextTestRunner(resultclass=MergedTestResult)
+        test_runner.run(ParallelTestSuite(test_suites, args.jobs))
+    else:
+        test_runner = unittest.TextTestRunner()
+        test_runner.run(test_suites)